@@ -14,6 +14,13 @@ jwt = JWTManager()
 def create_app(config_name='default'):
     app = Flask(__name__)
     app.config.from_object(config[config_name])
+
+    if app.config['TRUSTED_PROXIES']:
+        # request.remote_addr becomes the client address the proxies report
+        from werkzeug.middleware.proxy_fix import ProxyFix
+        app.wsgi_app = ProxyFix(
+            app.wsgi_app, x_for=app.config['TRUSTED_PROXIES'], x_proto=app.config['TRUSTED_PROXIES']
+        )
     
     # Initialize 
     CORS(app, resources={r"/api/*": {"origins": "*"}})
@@ -21,17 +28,68 @@ def create_app(config_name='default'):
     migrate.init_app(app, db)
     jwt.init_app(app)
     
+    from app.utils.geo import station_index
+    station_index.cell_size = app.config['STATION_INDEX_CELL_SIZE']
+    station_index.ttl = app.config['STATION_INDEX_TTL']
+
+    from app.utils.catalog import service_catalog
+    service_catalog.ttl = app.config['LAYANAN_CATALOG_TTL']
+
+    from app.utils.search import laporan_index
+    laporan_index.ttl = app.config['LAPORAN_INDEX_TTL']
+
+    from app.utils.identity import configure_identity
+    configure_identity(app)
+
+    from app.utils.hashing import configure_hashing
+    configure_hashing(app)
+
+    from app.utils.revocation import configure_revocation
+    configure_revocation(app)
+
+    from app.utils.ratelimit import configure_rate_limits
+    configure_rate_limits(app)
+
+    from app.utils.telemetry import configure_telemetry
+    configure_telemetry(app)
+
+    from app.utils.idempotency import idempotency_store
+    idempotency_store.max_entries = app.config['IDEMPOTENCY_MAX_KEYS']
+    idempotency_store.ttl = app.config['IDEMPOTENCY_TTL']
+    
     # Register blueprints
     from app.routes.auth import auth_bp
     from app.routes.kendaraan import kendaraan_bp
     from app.routes.stasiun import stasiun_bp
     from app.routes.transaksi import transaksi_bp
     from app.routes.layanan import layanan_bp # <--- FIX: Hapus tanda #
+    from app.routes.telemetri import telemetri_bp
+    from app.routes.analitik import analitik_bp
     
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(kendaraan_bp, url_prefix='/api/kendaraan')
     app.register_blueprint(stasiun_bp, url_prefix='/api/stasiun')
     app.register_blueprint(transaksi_bp, url_prefix='/api/transaksi')
     app.register_blueprint(layanan_bp, url_prefix='/api/layanan') # <--- FIX: Hapus tanda #
+    app.register_blueprint(telemetri_bp, url_prefix='/api/telemetri')
+    app.register_blueprint(analitik_bp, url_prefix='/api/analitik')
+
+    from app.cli import register_commands
+    register_commands(app)
+
+    from app.utils.sweeper import start_sweeper
+    start_sweeper(app)
+
+    from app.utils.telemetry import start_telemetry_flusher
+    start_telemetry_flusher(app)
+
+    from app.utils.rollup import start_rollup_job
+    start_rollup_job(app)
+
+    from app.utils.archive import start_archiver
+    start_archiver(app)
+
+    from app.utils.maintenance import start_maintenance_job
+    start_maintenance_job(app)
 
     return app
\ No newline at end of file
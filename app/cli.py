@@ -0,0 +1,149 @@
+import json
+import time
+
+import click
+
+
+def register_commands(app):
+    """Attach maintenance commands to ``flask <command>``"""
+
+    @app.cli.command('reconcile-availability')
+    @click.option('--dry-run', is_flag=True, help='Report drift without rewriting the counters.')
+    def reconcile_availability_command(dry_run):
+        """Recompute station availability counters from the kendaraan table."""
+        from app.utils.availability import reconcile_availability
+
+        drift = reconcile_availability(fix=not dry_run)
+        for entry in drift:
+            click.echo(json.dumps(entry))
+        action = 'found' if dry_run else 'fixed'
+        click.echo(f'{len(drift)} station counter(s) {action} with drift')
+
+    @app.cli.command('reprice-transactions')
+    @click.option('--since', type=click.DateTime(), default=None, help='Only rides started on/after this date.')
+    @click.option('--until', type=click.DateTime(), default=None, help='Only rides started before this date.')
+    @click.option('--batch-size', type=int, default=5000, show_default=True)
+    @click.option('--dry-run', is_flag=True, help='Count changes without writing them.')
+    def reprice_transactions_command(since, until, batch_size, dry_run):
+        """Recompute ride charges and totals of finished transactions with the current tariffs."""
+        from app.utils.pricing import reprice_transactions
+
+        started = time.perf_counter()
+        changed = reprice_transactions(since=since, until=until, batch_size=batch_size, dry_run=dry_run)
+        elapsed = time.perf_counter() - started
+        action = 'would change' if dry_run else 'changed'
+        click.echo(f'{changed} transaction total(s) {action} in {elapsed:.2f}s')
+
+    @app.cli.command('recompute-totals')
+    @click.option('--batch-size', type=int, default=5000, show_default=True)
+    @click.option('--dry-run', is_flag=True, help='Count repairs without writing them.')
+    def recompute_totals_command(batch_size, dry_run):
+        """Backfill missing line-item prices and rebuild total_biaya from the line items."""
+        from app.utils.pricing import repair_line_items
+
+        started = time.perf_counter()
+        report = repair_line_items(batch_size=batch_size, dry_run=dry_run)
+        report['elapsed_seconds'] = round(time.perf_counter() - started, 3)
+        report['dry_run'] = dry_run
+        click.echo(json.dumps(report))
+
+    @app.cli.command('sweep-rentals')
+    @click.option('--max-hours', type=float, default=None, help='Override RENTAL_MAX_DURATION_HOURS.')
+    @click.option('--batch-size', type=int, default=None, help='Override RENTAL_SWEEPER_BATCH_SIZE.')
+    @click.option('--bike-action', type=click.Choice(['free', 'quarantine']), default=None,
+                  help='Override RENTAL_SWEEPER_BIKE_ACTION.')
+    def sweep_rentals_command(max_hours, batch_size, bike_action):
+        """Close ONGOING rentals that have run past the maximum duration."""
+        from app.utils.sweeper import sweep_stale_rentals
+
+        report = sweep_stale_rentals(
+            max_hours if max_hours is not None else app.config['RENTAL_MAX_DURATION_HOURS'],
+            batch_size=batch_size or app.config['RENTAL_SWEEPER_BATCH_SIZE'],
+            bike_action=bike_action or app.config['RENTAL_SWEEPER_BIKE_ACTION']
+        )
+        click.echo(json.dumps(report))
+
+    @app.cli.command('rebuild-maintenance-queue')
+    def rebuild_maintenance_queue_command():
+        """Rescore every kendaraan for the maintenance queue in one aggregate pass."""
+        from app.utils.maintenance import rebuild_priorities
+
+        click.echo(json.dumps(rebuild_priorities()))
+
+    @app.cli.command('refresh-rollups')
+    @click.option('--full', is_flag=True, help='Rebuild every day instead of only days changed since the watermark.')
+    @click.option('--lag', type=int, default=None, help='Override ROLLUP_LAG_SECONDS.')
+    def refresh_rollups_command(full, lag):
+        """Update the daily analytics rollup from transactions changed since the watermark."""
+        from app.utils.rollup import refresh_rollups
+
+        report = refresh_rollups(full=full, lag_seconds=lag if lag is not None else app.config['ROLLUP_LAG_SECONDS'])
+        click.echo(json.dumps(report))
+
+    @app.cli.command('archive-transactions')
+    @click.option('--older-than-days', type=int, default=None, help='Override ARCHIVE_AFTER_DAYS.')
+    @click.option('--batch-size', type=int, default=None, help='Override ARCHIVE_BATCH_SIZE.')
+    @click.option('--dry-run', is_flag=True, help='Count eligible rows without moving them.')
+    def archive_transactions_command(older_than_days, batch_size, dry_run):
+        """Move old SELESAI transactions into the archive tables in batches."""
+        from app.utils.archive import archive_transactions
+
+        report = archive_transactions(
+            older_than_days if older_than_days is not None else app.config['ARCHIVE_AFTER_DAYS'],
+            batch_size=batch_size or app.config['ARCHIVE_BATCH_SIZE'],
+            dry_run=dry_run
+        )
+        click.echo(json.dumps(report))
+
+    @app.cli.command('purge-idempotency-keys')
+    def purge_idempotency_keys_command():
+        """Delete stored Idempotency-Key responses older than IDEMPOTENCY_TTL."""
+        from app.utils.idempotency import purge_expired_keys
+
+        click.echo(f'{purge_expired_keys()} expired idempotency key(s) deleted')
+
+    @app.cli.command('bench-hash')
+    @click.option('--costs', default='100000,260000,600000', show_default=True,
+                  help='Comma-separated PBKDF2 iteration counts.')
+    @click.option('--seconds', type=float, default=1.0, show_default=True)
+    def bench_hash_command(costs, seconds):
+        """Measure password hashes per second at each PBKDF2 cost."""
+        from app.utils.hashing import benchmark
+
+        methods = [f'pbkdf2:sha256:{int(cost)}' for cost in costs.split(',')]
+        for result in benchmark(methods, seconds=seconds):
+            click.echo(json.dumps(result))
+
+    @app.cli.command('import-users')
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--format', 'fmt', type=click.Choice(['csv', 'ndjson']), default=None,
+                  help='Defaults to the file extension.')
+    @click.option('--chunk-size', type=int, default=None, help='Override BULK_IMPORT_CHUNK_SIZE.')
+    def import_users_command(path, fmt, chunk_size):
+        """Bulk-create users from a CSV or NDJSON file."""
+        from app.utils.onboarding import import_users_from_stream
+
+        fmt = fmt or ('ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv')
+        with open(path, 'rb') as stream:
+            report = import_users_from_stream(
+                stream, fmt, chunk_size=chunk_size or app.config['BULK_IMPORT_CHUNK_SIZE']
+            )
+        for error in report['errors']:
+            click.echo(json.dumps(error))
+        click.echo(f"{report['created']} created, {report['failed']} failed in {report['elapsed_seconds']}s")
+
+    @app.cli.command('purge-revoked-tokens')
+    def purge_revoked_tokens_command():
+        """Delete blocklist entries for tokens that have already expired."""
+        from app.utils.revocation import purge_expired_tokens
+
+        click.echo(f'{purge_expired_tokens()} expired blocklist entr(y/ies) deleted')
+
+    @app.cli.command('bench-revocation')
+    @click.option('--revoked', type=int, default=100000, show_default=True)
+    @click.option('--checks', type=int, default=1000000, show_default=True)
+    def bench_revocation_command(revoked, checks):
+        """Measure the per-request cost of the token revocation check."""
+        from app.utils.revocation import benchmark
+
+        click.echo(json.dumps(benchmark(revoked=revoked, checks=checks)))
@@ -1,15 +1,31 @@
 from .user import User
-from .kendaraan import Kendaraan, LogLaporan  # FIXED: Import LogLaporan instead of LogPemeliharaan
-from .stasiun import Stasiun
+from .kendaraan import Kendaraan, LogLaporan, StatusKendaraan  # FIXED: Import LogLaporan instead of LogPemeliharaan
+from .stasiun import Stasiun, KetersediaanStasiun
 from .transaksi import Transaksi
 from .layanan import Layanan, TransaksiLayanan
+from .idempotency import IdempotencyKey
+from .token import TokenBlocklist
+from .pemeliharaan import PrioritasPemeliharaan
+from .telemetri import TelemetriKendaraan
+from .rekap import RekapHarian, RekapWatermark
+from .arsip import TransaksiArsip, TransaksiLayananArsip
 
 __all__ = [
     'User',
     'Kendaraan',
     'LogLaporan',  
+    'StatusKendaraan',
     'Stasiun',
+    'KetersediaanStasiun',
     'Transaksi',
     'Layanan',
-    'TransaksiLayanan'
+    'TransaksiLayanan',
+    'IdempotencyKey',
+    'TokenBlocklist',
+    'PrioritasPemeliharaan',
+    'TelemetriKendaraan',
+    'RekapHarian',
+    'RekapWatermark',
+    'TransaksiArsip',
+    'TransaksiLayananArsip'
 ]
\ No newline at end of file
@@ -0,0 +1,44 @@
+from app import db
+from datetime import datetime
+from app.models.transaksi import Transaksi
+
+class TransaksiArsip(db.Model):
+    """Cold copy of finished transaksi rows moved out by app.utils.archive.
+
+    Same columns as transaksi (and the same transaksi_id) plus
+    diarsipkan_pada; no foreign keys, so archived history never blocks
+    deleting a user, bike or station.
+    """
+    __tablename__ = 'transaksi_arsip'
+    __table_args__ = (
+        db.Index('ix_transaksi_arsip_user_waktu', 'user_nrp', 'waktu_mulai'),
+    )
+    
+    transaksi_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    user_nrp = db.Column(db.String(50), nullable=False)
+    kendaraan_id = db.Column(db.Integer)
+    stasiun_ambil_id = db.Column(db.Integer)
+    stasiun_kembali_id = db.Column(db.Integer)
+    waktu_mulai = db.Column(db.DateTime, index=True)
+    waktu_selesai = db.Column(db.DateTime)
+    waktu_pembayaran = db.Column(db.DateTime)
+    status_transaksi = db.Column(db.String(50))
+    payment_gateway_ref = db.Column(db.String(100))
+    biaya_sewa = db.Column(db.Numeric(10, 2))
+    total_biaya = db.Column(db.Numeric(10, 2))
+    deposit_dipegang = db.Column(db.Numeric(10, 2))
+    waktu_diperbarui = db.Column(db.DateTime)
+    diarsipkan_pada = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # Archived rows serialize exactly like hot ones
+    to_dict = Transaksi.to_dict
+
+
+class TransaksiLayananArsip(db.Model):
+    """Service lines of archived transaksi rows"""
+    __tablename__ = 'transaksi_layanan_arsip'
+    
+    transaksi_layanan_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    transaksi_id = db.Column(db.Integer, nullable=False, index=True)
+    layanan_id = db.Column(db.Integer, nullable=False)
+    harga = db.Column(db.Numeric(10, 2))
@@ -0,0 +1,13 @@
+from app import db
+from datetime import datetime
+
+class IdempotencyKey(db.Model):
+    """Stored response for a write request, replayed when its key is retried"""
+    __tablename__ = 'idempotency_key'
+    
+    key = db.Column(db.String(255), primary_key=True)
+    request_hash = db.Column(db.String(64), nullable=False)
+    status_code = db.Column(db.Integer, nullable=False)
+    mimetype = db.Column(db.String(100))
+    body = db.Column(db.LargeBinary)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
@@ -1,13 +1,51 @@
+import enum
 from app import db
 from datetime import datetime
+from sqlalchemy import func, literal_column
+from sqlalchemy.types import TypeDecorator
+
+class StatusKendaraan(enum.IntEnum):
+    """Vehicle status, stored as a small-int code and exposed by name"""
+    TERSEDIA = 1
+    DISEWA = 2
+    KARANTINA = 3
+    RUSAK = 4
+    PERBAIKAN = 5
+
+    @classmethod
+    def parse(cls, value):
+        """Accept a member, its code or its name in any casing ('Tersedia')"""
+        if isinstance(value, cls):
+            return value
+        if isinstance(value, int) and not isinstance(value, bool):
+            return cls(value)
+        if isinstance(value, str) and value.strip().upper() in cls.__members__:
+            return cls[value.strip().upper()]
+        raise ValueError(f"Invalid status '{value}', use one of {', '.join(cls.__members__)}")
+
+class StatusKendaraanType(TypeDecorator):
+    """SMALLINT column that binds any StatusKendaraan.parse() input and loads members"""
+    impl = db.SmallInteger
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        return None if value is None else int(StatusKendaraan.parse(value))
+
+    def process_result_value(self, value, dialect):
+        return None if value is None else StatusKendaraan(value)
 
 class Kendaraan(db.Model):
     __tablename__ = 'kendaraan'
+    # Serves per-station availability counts and status filters from the index alone
+    __table_args__ = (
+        db.Index('ix_kendaraan_stasiun_status', 'stasiun_id', 'status'),
+    )
     
     kendaraan_id = db.Column(db.Integer, primary_key=True)
     merk = db.Column(db.String(50))
     tipe = db.Column(db.String(50))
-    status = db.Column(db.String(50), default='Tersedia')
+    status = db.Column(StatusKendaraanType, nullable=False, default=StatusKendaraan.TERSEDIA,
+                       server_default=str(int(StatusKendaraan.TERSEDIA)))
     stasiun_id = db.Column(db.Integer, db.ForeignKey('stasiun.stasiun_id'))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
@@ -21,11 +59,16 @@ class Kendaraan(db.Model):
             'kendaraan_id': self.kendaraan_id,
             'merk': self.merk,
             'tipe': self.tipe,
-            'status': self.status,
+            'status': self.status.name if self.status is not None else None,
             'stasiun_id': self.stasiun_id,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
+def laporan_tsvector(column):
+    """to_tsvector() over the report text, shared by ix_log_laporan_fts and
+    app/utils/search.py so queries match the indexed expression exactly"""
+    return func.to_tsvector(literal_column("'simple'::regconfig"), func.coalesce(column, literal_column("''")))
+
 class LogLaporan(db.Model):
     __tablename__ = 'log_laporan'
     
@@ -39,6 +82,12 @@ class LogLaporan(db.Model):
     tanggal_pemeliharaan = db.Column(db.DateTime)
     status = db.Column(db.String(50), default='Dilaporkan')
 
+    # Full-text index for report search; PostgreSQL only, other databases
+    # use the in-process inverted index in app/utils/search.py
+    __table_args__ = (
+        db.Index('ix_log_laporan_fts', laporan_tsvector(laporan), postgresql_using='gin').ddl_if(dialect='postgresql'),
+    )
+
     # ADDED: Missing relationships
     user = db.relationship('User', backref='log_laporan_list', lazy=True)
     
@@ -51,4 +100,4 @@ class LogLaporan(db.Model):
             'laporan': self.laporan,
             'tanggal_pemeliharaan': self.tanggal_pemeliharaan.isoformat() if self.tanggal_pemeliharaan else None,  # FIXED: Convert to isoformat
             'status': self.status,
-        }
\ No newline at end of file
+        }
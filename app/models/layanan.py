@@ -26,8 +26,11 @@ class TransaksiLayanan(db.Model):
     __tablename__ = 'transaksi_layanan'
     
     transaksi_layanan_id = db.Column(db.Integer, primary_key=True)
-    transaksi_id = db.Column(db.Integer, db.ForeignKey('transaksi.transaksi_id'), nullable=False)
+    transaksi_id = db.Column(db.Integer, db.ForeignKey('transaksi.transaksi_id'), nullable=False, index=True)
     layanan_id = db.Column(db.Integer, db.ForeignKey('layanan.layanan_id'), nullable=False)
+    # Price charged when the service was added (tariff surcharge included), so
+    # later catalog price changes never rewrite old bills
+    harga = db.Column(db.Numeric(10, 2), nullable=True)
 
     # Relationships
     transaksi = db.relationship('Transaksi', back_populates='layanan_details')
@@ -38,4 +41,5 @@ class TransaksiLayanan(db.Model):
             'transaksi_layanan_id': self.transaksi_layanan_id,
             'transaksi_id': self.transaksi_id,
             'layanan_id': self.layanan_id,
+            'harga': float(self.harga) if self.harga is not None else None,
         }
\ No newline at end of file
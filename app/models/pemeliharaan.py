@@ -0,0 +1,25 @@
+from app import db
+from datetime import datetime
+
+class PrioritasPemeliharaan(db.Model):
+    """Materialized maintenance score per kendaraan, read top-K by skor"""
+    __tablename__ = 'prioritas_pemeliharaan'
+    
+    kendaraan_id = db.Column(db.Integer, db.ForeignKey('kendaraan.kendaraan_id', ondelete='CASCADE'), primary_key=True)
+    skor = db.Column(db.Float, nullable=False, default=0, index=True)
+    laporan_terbuka = db.Column(db.Integer, nullable=False, default=0)
+    laporan_tertua = db.Column(db.DateTime)
+    perjalanan_terakhir = db.Column(db.Integer, nullable=False, default=0)
+    pemeliharaan_terakhir = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'kendaraan_id': self.kendaraan_id,
+            'skor': self.skor,
+            'laporan_terbuka': self.laporan_terbuka,
+            'laporan_tertua': self.laporan_tertua.isoformat() if self.laporan_tertua else None,
+            'perjalanan_terakhir': self.perjalanan_terakhir,
+            'pemeliharaan_terakhir': self.pemeliharaan_terakhir.isoformat() if self.pemeliharaan_terakhir else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
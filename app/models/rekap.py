@@ -0,0 +1,31 @@
+from app import db
+from datetime import datetime
+
+class RekapHarian(db.Model):
+    """Daily rollup of finished rides per pickup stasiun and kendaraan tipe.
+
+    Maintained by app.utils.rollup from transaksi; analytics reads only this
+    table. stasiun_id 0 and tipe '' stand for rides without a pickup station
+    or bike type. There is no foreign key so history survives deletes.
+    """
+    __tablename__ = 'rekap_harian'
+    __table_args__ = (
+        db.Index('ix_rekap_harian_stasiun_tanggal', 'stasiun_id', 'tanggal'),
+    )
+    
+    tanggal = db.Column(db.Date, primary_key=True)
+    stasiun_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    tipe = db.Column(db.String(50), primary_key=True)
+    jumlah_perjalanan = db.Column(db.Integer, nullable=False, default=0)
+    total_menit = db.Column(db.Float, nullable=False, default=0)
+    pendapatan = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    pendapatan_layanan = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class RekapWatermark(db.Model):
+    """How far each rollup has consumed transaksi.waktu_diperbarui"""
+    __tablename__ = 'rekap_watermark'
+    
+    nama = db.Column(db.String(50), primary_key=True)
+    nilai = db.Column(db.DateTime, nullable=False)
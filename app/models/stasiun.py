@@ -9,8 +9,8 @@ class Stasiun(db.Model):
     alamat = db.Column(db.String(255))
     status = db.Column(db.String(50), default='Aktif')
 
-    latitude = db.Column(db.Integer)
-    longtitude = db.Column(db.Integer)
+    latitude = db.Column(db.Float)
+    longtitude = db.Column(db.Float)
     
     # Relationships - FIXED
     kendaraan_list = db.relationship('Kendaraan', back_populates='stasiun', lazy=True)
@@ -23,4 +23,21 @@ class Stasiun(db.Model):
             'status': self.status,
             'latitude': self.latitude,
             'longtitude': self.longtitude,
-        }
\ No newline at end of file
+        }
+
+class KetersediaanStasiun(db.Model):
+    """Denormalized per-station bike counters, maintained write-through"""
+    __tablename__ = 'ketersediaan_stasiun'
+    
+    stasiun_id = db.Column(db.Integer, db.ForeignKey('stasiun.stasiun_id', ondelete='CASCADE'), primary_key=True)
+    tersedia = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'stasiun_id': self.stasiun_id,
+            'tersedia': self.tersedia,
+            'total': self.total,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
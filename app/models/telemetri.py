@@ -0,0 +1,26 @@
+from app import db
+from datetime import datetime
+
+class TelemetriKendaraan(db.Model):
+    """Position/battery history, written in bulk by app/utils/telemetry.py"""
+    __tablename__ = 'telemetri_kendaraan'
+    __table_args__ = (
+        db.Index('ix_telemetri_kendaraan_waktu', 'kendaraan_id', 'waktu'),
+    )
+    
+    telemetri_id = db.Column(db.BigInteger().with_variant(db.Integer, 'sqlite'), primary_key=True)
+    kendaraan_id = db.Column(db.Integer, db.ForeignKey('kendaraan.kendaraan_id', ondelete='CASCADE'), nullable=False)
+    waktu = db.Column(db.DateTime, nullable=False)
+    latitude = db.Column(db.Float, nullable=False)
+    longitude = db.Column(db.Float, nullable=False)
+    baterai = db.Column(db.SmallInteger)  # percent, NULL when the bike did not report it
+    
+    def to_dict(self):
+        return {
+            'telemetri_id': self.telemetri_id,
+            'kendaraan_id': self.kendaraan_id,
+            'waktu': self.waktu.isoformat() if self.waktu else None,
+            'latitude': self.latitude,
+            'longitude': self.longitude,
+            'baterai': self.baterai
+        }
@@ -0,0 +1,13 @@
+from app import db
+from datetime import datetime
+
+class TokenBlocklist(db.Model):
+    """Revoked JWTs, kept until they would have expired anyway"""
+    __tablename__ = 'token_blocklist'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    jti = db.Column(db.String(36), nullable=False, unique=True)
+    token_type = db.Column(db.String(10), nullable=False)
+    nrp = db.Column(db.String(50), db.ForeignKey('user.nrp'), index=True)
+    expires_at = db.Column(db.DateTime, index=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
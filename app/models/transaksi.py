@@ -3,24 +3,33 @@ from datetime import datetime
 
 class Transaksi(db.Model):
     __tablename__ = 'transaksi'
+    __table_args__ = (
+        # Per-user history (/my-rentals) without a sort
+        db.Index('ix_transaksi_user_waktu', 'user_nrp', 'waktu_mulai'),
+    )
     
     transaksi_id = db.Column(db.Integer, primary_key=True)
     user_nrp = db.Column(db.String(50), db.ForeignKey('user.nrp'), nullable=False)
-    kendaraan_id = db.Column(db.Integer, db.ForeignKey('kendaraan.kendaraan_id'))
+    kendaraan_id = db.Column(db.Integer, db.ForeignKey('kendaraan.kendaraan_id'), index=True)
 
     # FIXED: Should reference stasiun table, not user table
     stasiun_ambil_id = db.Column(db.Integer, db.ForeignKey('stasiun.stasiun_id'))
     stasiun_kembali_id = db.Column(db.Integer, db.ForeignKey('stasiun.stasiun_id'))
 
-    waktu_mulai = db.Column(db.DateTime, default=datetime.utcnow)
+    waktu_mulai = db.Column(db.DateTime, default=datetime.utcnow, index=True)
     waktu_selesai = db.Column(db.DateTime, nullable=True)  # FIXED: Should be nullable
     waktu_pembayaran = db.Column(db.DateTime, nullable=True)  # FIXED: Should be nullable
 
     status_transaksi = db.Column(db.String(50), default='ONGOING')
     payment_gateway_ref = db.Column(db.String(100))
     
+    # Ride charge line; total_biaya = biaya_sewa + SUM(transaksi_layanan.harga),
+    # see app.utils.pricing.recompute_totals
+    biaya_sewa = db.Column(db.Numeric(10, 2), nullable=True)
     total_biaya = db.Column(db.Numeric(10, 2))
     deposit_dipegang = db.Column(db.Numeric(10, 2))
+    # Bumped by every ORM/Core UPDATE; the daily rollup job reads changes past its watermark
+    waktu_diperbarui = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, index=True)
     
     # Relationships
     user = db.relationship('User', back_populates='transaksi_list')
@@ -39,6 +48,7 @@ class Transaksi(db.Model):
             'waktu_pembayaran': self.waktu_pembayaran.isoformat() if self.waktu_pembayaran else None,
             'status_transaksi': self.status_transaksi,
             'payment_gateway_ref': self.payment_gateway_ref,
+            'biaya_sewa': float(self.biaya_sewa) if self.biaya_sewa is not None else None,
             'total_biaya': float(self.total_biaya) if self.total_biaya else None,  # FIXED: Convert to float
             'deposit_dipegang': float(self.deposit_dipegang) if self.deposit_dipegang else None  # FIXED: Convert to float
         }   
\ No newline at end of file
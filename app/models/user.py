@@ -1,5 +1,4 @@
 from app import db
-from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
 
 class User(db.Model):
@@ -17,10 +16,17 @@ class User(db.Model):
     transaksi_list = db.relationship('Transaksi', back_populates='user', lazy=True)
     
     def set_password(self, password):
-        self.password = generate_password_hash(password)
+        # Hashing runs on the bounded pool in app.utils.hashing (may raise HashingBusy)
+        from app.utils.hashing import hash_password
+        self.password = hash_password(password)
     
     def check_password(self, password):
-        return check_password_hash(self.password, password)
+        from app.utils.hashing import verify_password
+        return verify_password(self.password, password)
+    
+    def password_needs_rehash(self):
+        from app.utils.hashing import needs_rehash
+        return needs_rehash(self.password)
     
     def to_dict(self):
         return {
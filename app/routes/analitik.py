@@ -0,0 +1,94 @@
+from datetime import date, timedelta
+
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import jwt_required
+from sqlalchemy import func
+from app import db
+from app.models.rekap import RekapHarian
+from app.utils.helpers import admin_required
+from app.utils.rollup import get_watermark
+
+analitik_bp = Blueprint('analitik', __name__)
+
+GROUP_COLUMNS = {
+    'tanggal': RekapHarian.tanggal,
+    'stasiun': RekapHarian.stasiun_id,
+    'tipe': RekapHarian.tipe,
+}
+
+
+@analitik_bp.route('/rekap', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_rekap():
+    """Rides, minutes and revenue from the daily rollup.
+
+    ?dari=YYYY-MM-DD&sampai=YYYY-MM-DD (inclusive, default the last 30 days),
+    optional stasiun_id and tipe filters, and group_by as a comma list of
+    tanggal, stasiun and tipe (default tanggal; empty for one total row).
+    """
+    try:
+        sampai = date.fromisoformat(request.args['sampai']) if request.args.get('sampai') else date.today()
+        dari = date.fromisoformat(request.args['dari']) if request.args.get('dari') else sampai - timedelta(days=29)
+    except ValueError:
+        return jsonify({'message': 'dari and sampai must be YYYY-MM-DD'}), 400
+    if dari > sampai:
+        return jsonify({'message': 'dari must not be after sampai'}), 400
+    max_days = current_app.config['ANALYTICS_MAX_RANGE_DAYS']
+    if (sampai - dari).days + 1 > max_days:
+        return jsonify({'message': f'Range is limited to {max_days} days'}), 400
+
+    group_by = list(dict.fromkeys(name for name in request.args.get('group_by', 'tanggal').split(',') if name))
+    unknown = [name for name in group_by if name not in GROUP_COLUMNS]
+    if unknown:
+        return jsonify({'message': f"Unknown group_by: {', '.join(unknown)}"}), 400
+    groups = [GROUP_COLUMNS[name] for name in group_by]
+
+    rides = func.coalesce(func.sum(RekapHarian.jumlah_perjalanan), 0)
+    minutes = func.coalesce(func.sum(RekapHarian.total_menit), 0)
+    query = db.session.query(
+        *groups,
+        rides,
+        minutes,
+        func.coalesce(func.sum(RekapHarian.pendapatan), 0),
+        func.coalesce(func.sum(RekapHarian.pendapatan_layanan), 0)
+    ).filter(RekapHarian.tanggal.between(dari, sampai))
+
+    stasiun_id = request.args.get('stasiun_id', type=int)
+    if stasiun_id is not None:
+        query = query.filter(RekapHarian.stasiun_id == stasiun_id)
+    if request.args.get('tipe'):
+        query = query.filter(RekapHarian.tipe == request.args['tipe'])
+    if groups:
+        query = query.group_by(*groups).order_by(*groups)
+
+    data = []
+    for row in query:
+        keys = row[:len(groups)]
+        jumlah, menit, pendapatan, pendapatan_layanan = row[len(groups):]
+        item = {}
+        for name, value in zip(group_by, keys):
+            if name == 'tanggal':
+                item['tanggal'] = value.isoformat()
+            elif name == 'stasiun':
+                item['stasiun_id'] = value or None
+            else:
+                item['tipe'] = value or None
+        item.update({
+            'jumlah_perjalanan': int(jumlah),
+            'total_menit': round(float(menit), 1),
+            'rata_rata_menit': round(float(menit) / jumlah, 1) if jumlah else None,
+            'pendapatan': float(pendapatan),
+            'pendapatan_layanan': float(pendapatan_layanan)
+        })
+        data.append(item)
+
+    mark = get_watermark()
+    return jsonify({
+        'dari': dari.isoformat(),
+        'sampai': sampai.isoformat(),
+        'group_by': group_by,
+        'data': data,
+        # Rides changed after this instant are not in the rollup yet
+        'watermark': mark.nilai.isoformat() if mark else None
+    }), 200
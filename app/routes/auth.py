@@ -1,10 +1,25 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, create_access_token, get_jwt_identity
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import jwt_required, create_access_token, create_refresh_token, get_jwt
 from app import db
 from app.models.user import User
+from app.utils.identity import current_user
+from app.utils.helpers import admin_required
+from app.utils.onboarding import import_users_from_stream
+from app.utils.revocation import revocation_list
+from app.utils.hashing import HashingBusy
+from concurrent.futures import TimeoutError as HashingTimeout
 
 auth_bp = Blueprint('auth', __name__)
 
+@auth_bp.errorhandler(HashingBusy)
+@auth_bp.errorhandler(HashingTimeout)
+def hashing_unavailable(e):
+    # Fail fast instead of queueing more CPU-bound work behind a full pool
+    db.session.rollback()
+    response = jsonify({'message': 'Server is busy, please retry shortly'})
+    response.headers['Retry-After'] = '1'
+    return response, 503
+
 @auth_bp.route('/register', methods=['POST'])
 def register():
     data = request.get_json()
@@ -29,6 +44,22 @@ def register():
     
     return jsonify({'message': 'User registered successfully'}), 201
 
+@auth_bp.route('/bulk-import', methods=['POST'])
+@jwt_required()
+@admin_required
+def bulk_import_users():
+    """(Admin) Create many users from a CSV (with header) or NDJSON request body"""
+    content_type = (request.mimetype or '').lower()
+    fmt = request.args.get('format') or ('ndjson' if 'ndjson' in content_type else 'csv')
+    if fmt not in ('csv', 'ndjson'):
+        return jsonify({'message': "format must be 'csv' or 'ndjson'"}), 400
+    
+    report = import_users_from_stream(
+        request.stream, fmt, chunk_size=current_app.config['BULK_IMPORT_CHUNK_SIZE']
+    )
+    
+    return jsonify(dict(report, message=f"{report['created']} user(s) imported")), 200
+
 @auth_bp.route('/login', methods=['POST'])
 def login():
     data = request.get_json()
@@ -38,19 +69,44 @@ def login():
     user = User.query.filter_by(nrp=nrp).first()
     
     if user and user.check_password(password):
-        access_token = create_access_token(identity=nrp)
+        # Transparently upgrade hashes made with an older method or cost
+        if user.password_needs_rehash():
+            user.set_password(password)
+            db.session.commit()
+        
+        # Role travels in the token so admin checks need no User query
+        claims = {'role': user.role}
         return jsonify({
-            'access_token': access_token,
+            'access_token': create_access_token(identity=nrp, additional_claims=claims),
+            'refresh_token': create_refresh_token(identity=nrp, additional_claims=claims),
             'user': user.to_dict()
         }), 200
     
     return jsonify({'message': 'Invalid credentials'}), 401
 
+@auth_bp.route('/refresh', methods=['POST'])
+@jwt_required(refresh=True)
+def refresh():
+    # Re-read the role so a changed role is picked up at the next refresh
+    user = current_user()
+    if not user:
+        return jsonify({'message': 'User not found'}), 404
+    
+    access_token = create_access_token(identity=user.nrp, additional_claims={'role': user.role})
+    return jsonify({'access_token': access_token}), 200
+
+@auth_bp.route('/logout', methods=['POST'])
+@jwt_required(verify_type=False)
+def logout():
+    """Revoke the token used for this request (access or refresh)"""
+    token = get_jwt()
+    revocation_list.revoke(token)
+    return jsonify({'message': f"{token['type'].capitalize()} token revoked"}), 200
+
 @auth_bp.route('/profile', methods=['GET'])
 @jwt_required()
 def profile():
-    current_user_nrp = get_jwt_identity()
-    user = User.query.filter_by(nrp=current_user_nrp).first()
+    user = current_user()
     
     if user:
         return jsonify({'user': user.to_dict()}), 200
@@ -1,17 +1,65 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from datetime import datetime
+from sqlalchemy import insert, update, delete, func
+from sqlalchemy.exc import IntegrityError
 from app import db
-from app.models.kendaraan import Kendaraan, LogLaporan  # FIXED: Import LogLaporan instead of LogPemeliharaan
-from app.models.user import User
+from app.models.kendaraan import Kendaraan, LogLaporan, StatusKendaraan  # FIXED: Import LogLaporan instead of LogPemeliharaan
+from app.utils.helpers import admin_required, paginate_keyset, page_meta
+from app.utils.identity import current_user
 from app.models.stasiun import Stasiun
+from app.utils.availability import record_bike_change, accumulate_bike_change, record_availability_deltas
+from app.utils.status_kendaraan import parse_status, check_transition, check_move, IllegalTransition
+from app.utils.search import search_laporan, laporan_index
+from app.utils.maintenance import refresh_priorities, forget_priorities, top_priorities
 
 kendaraan_bp = Blueprint('kendaraan', __name__)
 
+def _batch_items(data, key):
+    """Return (items, error_response) for a batch request body"""
+    items = (data or {}).get(key)
+    if not isinstance(items, list) or not items:
+        return None, (jsonify({'message': f'{key} must be a non-empty list'}), 400)
+    limit = current_app.config['KENDARAAN_BATCH_MAX']
+    if len(items) > limit:
+        return None, (jsonify({'message': f'At most {limit} items per batch'}), 400)
+    return items, None
+
+def _is_id(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def _check_batch_fields(items, key, id_required=False):
+    """Return a 400 response for the first item with a mistyped field.
+
+    ``kendaraan_id`` (when required) and ``stasiun_id`` must be integers and
+    ``status`` a known StatusKendaraan; items that are not objects are left
+    to the per-item results.
+    """
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            continue
+        if id_required and not _is_id(item.get('kendaraan_id')):
+            return jsonify({'message': f'{key}[{index}].kendaraan_id must be an integer'}), 400
+        if item.get('stasiun_id') is not None and not _is_id(item['stasiun_id']):
+            return jsonify({'message': f'{key}[{index}].stasiun_id must be an integer or null'}), 400
+        if 'status' in item:
+            try:
+                parse_status(item['status'])
+            except ValueError as e:
+                return jsonify({'message': f'{key}[{index}].status: {str(e)}'}), 400
+    return None
+
+def _existing_stasiun_ids(stasiun_ids):
+    """Validate every referenced station with a single IN query"""
+    stasiun_ids = {i for i in stasiun_ids if i is not None}
+    if not stasiun_ids:
+        return set()
+    rows = db.session.query(Stasiun.stasiun_id).filter(Stasiun.stasiun_id.in_(stasiun_ids)).all()
+    return {stasiun_id for stasiun_id, in rows}
+
 @kendaraan_bp.route('/', methods=['GET'])
 @jwt_required()
 def get_all_kendaraan():
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
     status = request.args.get('status')
     stasiun_id = request.args.get('stasiun_id', type=int)
 
@@ -25,27 +73,29 @@ def get_all_kendaraan():
     # =======================================================================
     
     if status:
-        query = query.filter(Kendaraan.status == status)
+        try:
+            query = query.filter(Kendaraan.status == parse_status(status))
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
     if stasiun_id:
         query = query.filter(Kendaraan.stasiun_id == stasiun_id)
 
-    
-
-    kendaraan_list = query.paginate(
-        page=page, per_page=per_page, error_out=False
-    )
+    try:
+        kendaraan_list = paginate_keyset(
+            query, [Kendaraan.kendaraan_id], key=lambda row: [row[0].kendaraan_id]
+        )
+    except ValueError:
+        return jsonify({'message': 'Invalid cursor'}), 400
 
     results = []
-    for kendaraan_obj, stasiun_nama in kendaraan_list.items:
+    for kendaraan_obj, stasiun_nama in kendaraan_list['items']:
         kendaraan_dict = kendaraan_obj.to_dict()
         kendaraan_dict['stasiun_nama'] = stasiun_nama
         results.append(kendaraan_dict)
     
     return jsonify({
         'kendaraan': results,
-        'total': kendaraan_list.total,
-        'pages': kendaraan_list.pages,
-        'current_page': page
+        **page_meta(kendaraan_list)
     }), 200
 
 @kendaraan_bp.route('/<int:kendaraan_id>', methods=['GET'])
@@ -56,24 +106,27 @@ def get_kendaraan(kendaraan_id):
 
 @kendaraan_bp.route('/', methods=['POST'])
 @jwt_required()
+@admin_required
 def create_kendaraan():
-    current_user_nrp = get_jwt_identity()
-    user = User.query.filter_by(nrp=current_user_nrp).first()
-    
-    if not user or user.role != 'admin':
-        return jsonify({'message': 'Admin access required'}), 403
-    
     data = request.get_json()
     
-    # FIXED: Changed default status to 'Tersedia' to match model
+    try:
+        status = check_transition(None, data.get('status', StatusKendaraan.TERSEDIA), manual=True)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
     kendaraan = Kendaraan(
         merk=data.get('merk'),
         tipe=data.get('tipe'),
-        status=data.get('status', 'Tersedia'),
+        status=status,
         stasiun_id=data.get('stasiun_id')
     )
     
     db.session.add(kendaraan)
+    record_bike_change(None, None, kendaraan.stasiun_id, kendaraan.status)
+    db.session.flush()
+    # Idle days count from created_at, so a new bike belongs in the queue now
+    refresh_priorities([kendaraan.kendaraan_id])
     db.session.commit()
     
     return jsonify({
@@ -83,21 +136,30 @@ def create_kendaraan():
 
 @kendaraan_bp.route('/<int:kendaraan_id>', methods=['PUT'])
 @jwt_required()
+@admin_required
 def update_kendaraan(kendaraan_id):
-    current_user_nrp = get_jwt_identity()
-    user = User.query.filter_by(nrp=current_user_nrp).first()
-    
-    if not user or user.role != 'admin':
-        return jsonify({'message': 'Admin access required'}), 403
-    
     kendaraan = Kendaraan.query.get_or_404(kendaraan_id)
     data = request.get_json()
+    old_stasiun_id, old_status = kendaraan.stasiun_id, kendaraan.status
+    
+    if 'status' in data:
+        try:
+            kendaraan.status = check_transition(old_status, data['status'], manual=True)
+        except IllegalTransition as e:
+            return jsonify({'message': str(e)}), 409
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+    
+    try:
+        check_move(old_status, old_stasiun_id, data.get('stasiun_id', old_stasiun_id))
+    except IllegalTransition as e:
+        return jsonify({'message': str(e)}), 409
     
     kendaraan.merk = data.get('merk', kendaraan.merk)
     kendaraan.tipe = data.get('tipe', kendaraan.tipe)
-    kendaraan.status = data.get('status', kendaraan.status)
     kendaraan.stasiun_id = data.get('stasiun_id', kendaraan.stasiun_id)
     
+    record_bike_change(old_stasiun_id, old_status, kendaraan.stasiun_id, kendaraan.status)
     db.session.commit()
     
     return jsonify({
@@ -107,20 +169,201 @@ def update_kendaraan(kendaraan_id):
 
 @kendaraan_bp.route('/<int:kendaraan_id>', methods=['DELETE'])
 @jwt_required()
+@admin_required
 def delete_kendaraan(kendaraan_id):
-    current_user_nrp = get_jwt_identity()
-    user = User.query.filter_by(nrp=current_user_nrp).first()
-    
-    if not user or user.role != 'admin':
-        return jsonify({'message': 'Admin access required'}), 403
-    
     kendaraan = Kendaraan.query.get_or_404(kendaraan_id)
     
+    forget_priorities([kendaraan_id])
     db.session.delete(kendaraan)
+    record_bike_change(kendaraan.stasiun_id, kendaraan.status, None, None)
     db.session.commit()
     
     return jsonify({'message': 'Kendaraan deleted successfully'}), 200
 
+@kendaraan_bp.route('/batch', methods=['POST'])
+@jwt_required()
+@admin_required
+def batch_create_kendaraan():
+    items, error = _batch_items(request.get_json(silent=True), 'kendaraan')
+    if error:
+        return error
+    error = _check_batch_fields(items, 'kendaraan')
+    if error:
+        return error
+    
+    valid_stasiun = _existing_stasiun_ids(
+        item.get('stasiun_id') for item in items if isinstance(item, dict)
+    )
+    
+    results = [None] * len(items)
+    rows, positions = [], []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            results[index] = {'index': index, 'success': False, 'error': 'Item must be an object'}
+            continue
+        stasiun_id = item.get('stasiun_id')
+        if stasiun_id is not None and stasiun_id not in valid_stasiun:
+            results[index] = {'index': index, 'success': False, 'error': 'Station not found'}
+            continue
+        try:
+            status = check_transition(None, item.get('status', StatusKendaraan.TERSEDIA), manual=True)
+        except ValueError as e:
+            results[index] = {'index': index, 'success': False, 'error': str(e)}
+            continue
+        rows.append({
+            'merk': item.get('merk'),
+            'tipe': item.get('tipe'),
+            'status': status,
+            'stasiun_id': stasiun_id
+        })
+        positions.append(index)
+    
+    if rows:
+        new_ids = db.session.scalars(
+            insert(Kendaraan).returning(Kendaraan.kendaraan_id, sort_by_parameter_order=True),
+            rows
+        ).all()
+        deltas = {}
+        for index, row, kendaraan_id in zip(positions, rows, new_ids):
+            accumulate_bike_change(deltas, None, None, row['stasiun_id'], row['status'])
+            results[index] = {'index': index, 'success': True, 'kendaraan_id': kendaraan_id}
+        record_availability_deltas(deltas)
+        refresh_priorities(new_ids)
+        db.session.commit()
+    
+    return jsonify({
+        'message': f'{len(rows)} of {len(items)} kendaraan created',
+        'results': results
+    }), 200
+
+@kendaraan_bp.route('/batch', methods=['PUT'])
+@jwt_required()
+@admin_required
+def batch_update_kendaraan():
+    """Move bikes between stations and/or change their status in one transaction"""
+    items, error = _batch_items(request.get_json(silent=True), 'updates')
+    if error:
+        return error
+    error = _check_batch_fields(items, 'updates', id_required=True)
+    if error:
+        return error
+    
+    ids = [item.get('kendaraan_id') for item in items if isinstance(item, dict)]
+    current = {
+        kendaraan_id: (stasiun_id, status)
+        for kendaraan_id, stasiun_id, status in db.session.query(
+            Kendaraan.kendaraan_id, Kendaraan.stasiun_id, Kendaraan.status
+        ).filter(Kendaraan.kendaraan_id.in_(ids)).with_for_update().all()
+    }
+    valid_stasiun = _existing_stasiun_ids(
+        item.get('stasiun_id') for item in items if isinstance(item, dict)
+    )
+    
+    results = []
+    groups = {}
+    deltas = {}
+    seen = set()
+    for index, item in enumerate(items):
+        kendaraan_id = item.get('kendaraan_id') if isinstance(item, dict) else None
+        if kendaraan_id not in current:
+            results.append({'index': index, 'kendaraan_id': kendaraan_id, 'success': False, 'error': 'Vehicle not found'})
+            continue
+        if kendaraan_id in seen:
+            results.append({'index': index, 'kendaraan_id': kendaraan_id, 'success': False, 'error': 'Duplicate kendaraan_id in batch'})
+            continue
+        if 'stasiun_id' not in item and 'status' not in item:
+            results.append({'index': index, 'kendaraan_id': kendaraan_id, 'success': False, 'error': 'Nothing to update'})
+            continue
+        
+        old_stasiun_id, old_status = current[kendaraan_id]
+        new_stasiun_id = item.get('stasiun_id', old_stasiun_id)
+        if 'stasiun_id' in item and new_stasiun_id is not None and new_stasiun_id not in valid_stasiun:
+            results.append({'index': index, 'kendaraan_id': kendaraan_id, 'success': False, 'error': 'Station not found'})
+            continue
+        try:
+            new_status = check_transition(old_status, item['status'], manual=True) if 'status' in item else old_status
+            check_move(old_status, old_stasiun_id, new_stasiun_id)
+        except ValueError as e:
+            results.append({'index': index, 'kendaraan_id': kendaraan_id, 'success': False, 'error': str(e)})
+            continue
+        
+        seen.add(kendaraan_id)
+        # Bikes sharing the same target values are changed by one UPDATE ... IN (...)
+        changes = []
+        if 'stasiun_id' in item:
+            changes.append(('stasiun_id', new_stasiun_id))
+        if 'status' in item:
+            changes.append(('status', new_status))
+        changes = tuple(changes)
+        groups.setdefault(changes, []).append(kendaraan_id)
+        accumulate_bike_change(deltas, old_stasiun_id, old_status, new_stasiun_id, new_status)
+        results.append({'index': index, 'kendaraan_id': kendaraan_id, 'success': True})
+    
+    for changes, group_ids in groups.items():
+        db.session.execute(
+            update(Kendaraan)
+            .where(Kendaraan.kendaraan_id.in_(group_ids))
+            .values(dict(changes))
+            .execution_options(synchronize_session=False)
+        )
+    if groups:
+        record_availability_deltas(deltas)
+        db.session.commit()
+    
+    return jsonify({
+        'message': f'{len(seen)} of {len(items)} kendaraan updated',
+        'results': results
+    }), 200
+
+@kendaraan_bp.route('/batch', methods=['DELETE'])
+@jwt_required()
+@admin_required
+def batch_delete_kendaraan():
+    ids, error = _batch_items(request.get_json(silent=True), 'kendaraan_ids')
+    if error:
+        return error
+    if not all(_is_id(kendaraan_id) for kendaraan_id in ids):
+        return jsonify({'message': 'kendaraan_ids must be a list of integers'}), 400
+    
+    current = {
+        kendaraan_id: (stasiun_id, status)
+        for kendaraan_id, stasiun_id, status in db.session.query(
+            Kendaraan.kendaraan_id, Kendaraan.stasiun_id, Kendaraan.status
+        ).filter(Kendaraan.kendaraan_id.in_(ids)).with_for_update().all()
+    }
+    
+    results = []
+    deltas = {}
+    for kendaraan_id in ids:
+        if kendaraan_id in current:
+            stasiun_id, status = current.pop(kendaraan_id)
+            accumulate_bike_change(deltas, stasiun_id, status, None, None)
+            results.append({'kendaraan_id': kendaraan_id, 'success': True})
+        else:
+            results.append({'kendaraan_id': kendaraan_id, 'success': False, 'error': 'Vehicle not found'})
+    
+    deleted_ids = [r['kendaraan_id'] for r in results if r['success']]
+    if deleted_ids:
+        try:
+            forget_priorities(deleted_ids)
+            db.session.execute(
+                delete(Kendaraan)
+                .where(Kendaraan.kendaraan_id.in_(deleted_ids))
+                .execution_options(synchronize_session=False)
+            )
+            record_availability_deltas(deltas)
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            return jsonify({
+                'message': 'Some vehicles still have transactions or reports; nothing was deleted'
+            }), 409
+    
+    return jsonify({
+        'message': f'{len(deleted_ids)} of {len(ids)} kendaraan deleted',
+        'results': results
+    }), 200
+
 # FIXED: Changed from maintenance to laporan routes
 @kendaraan_bp.route('/<int:kendaraan_id>/laporan', methods=['GET'])
 @jwt_required()
@@ -128,8 +371,6 @@ def get_laporan_logs(kendaraan_id):
     # Check if kendaraan exists
     kendaraan = Kendaraan.query.get_or_404(kendaraan_id)
     
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
     status = request.args.get('status')
     
     query = LogLaporan.query.filter_by(kendaraan_id=kendaraan_id)
@@ -137,15 +378,16 @@ def get_laporan_logs(kendaraan_id):
     if status:
         query = query.filter(LogLaporan.status == status)
     
-    logs = query.paginate(
-        page=page, per_page=per_page, error_out=False
-    )
+    try:
+        logs = paginate_keyset(
+            query, [LogLaporan.log_laporan_id], key=lambda log: [log.log_laporan_id]
+        )
+    except ValueError:
+        return jsonify({'message': 'Invalid cursor'}), 400
     
     return jsonify({
-        'laporan_logs': [log.to_dict() for log in logs.items],
-        'total': logs.total,
-        'pages': logs.pages,
-        'current_page': page
+        'laporan_logs': [log.to_dict() for log in logs['items']],
+        **page_meta(logs)
     }), 200
 
 # routes/kendaraan.py
@@ -155,7 +397,7 @@ def get_laporan_logs(kendaraan_id):
 def create_laporan_log(kendaraan_id):
     # 1. Mendapatkan data user
     current_user_nrp = get_jwt_identity()
-    user = User.query.filter_by(nrp=current_user_nrp).first()
+    user = current_user()
     if not user:
         return jsonify({'message': 'User not found'}), 404
     
@@ -177,7 +419,9 @@ def create_laporan_log(kendaraan_id):
     
     # 5. Menyimpan ke database
     db.session.add(log)
+    refresh_priorities([kendaraan_id])
     db.session.commit() # <-- KEMUNGKINAN BESAR CRASH TERJADI DI SINI
+    laporan_index.add(log.log_laporan_id, log.laporan)
     
     return jsonify({
         'message': 'Laporan created successfully',
@@ -188,7 +432,7 @@ def create_laporan_log(kendaraan_id):
 @jwt_required()
 def update_laporan_log(log_laporan_id):
     current_user_nrp = get_jwt_identity()
-    user = User.query.filter_by(nrp=current_user_nrp).first()
+    user = current_user()
     
     if not user:
         return jsonify({'message': 'User not found'}), 404
@@ -213,7 +457,9 @@ def update_laporan_log(log_laporan_id):
         else:
             return jsonify({'message': 'Cannot update laporan that is already processed'}), 403
     
+    refresh_priorities([log.kendaraan_id])
     db.session.commit()
+    laporan_index.add(log.log_laporan_id, log.laporan)
     
     return jsonify({
         'message': 'Laporan updated successfully',
@@ -224,7 +470,7 @@ def update_laporan_log(log_laporan_id):
 @jwt_required()
 def delete_laporan_log(log_laporan_id):
     current_user_nrp = get_jwt_identity()
-    user = User.query.filter_by(nrp=current_user_nrp).first()
+    user = current_user()
     
     if not user:
         return jsonify({'message': 'User not found'}), 404
@@ -236,22 +482,75 @@ def delete_laporan_log(log_laporan_id):
         return jsonify({'message': 'Access denied'}), 403
     
     db.session.delete(log)
+    refresh_priorities([log.kendaraan_id])
     db.session.commit()
+    laporan_index.remove(log_laporan_id)
     
     return jsonify({'message': 'Laporan deleted successfully'}), 200
 
+# Bikes to fix first (for admin), highest maintenance score first
+@kendaraan_bp.route('/maintenance-queue', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_maintenance_queue():
+    limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+    stasiun_id = request.args.get('stasiun_id', type=int)
+    status = request.args.get('status')
+    if status:
+        try:
+            status = parse_status(status)
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+    
+    # Bikes are scored when created and when their reports change; ride
+    # counts and ages are refreshed by the MAINTENANCE_REBUILD_INTERVAL job
+    # or `flask rebuild-maintenance-queue`
+    results = []
+    for prioritas, kendaraan in top_priorities(limit, status=status or None, stasiun_id=stasiun_id):
+        item = prioritas.to_dict()
+        item['kendaraan'] = kendaraan.to_dict()
+        results.append(item)
+    
+    return jsonify({'maintenance_queue': results}), 200
+
+# Full-text search over laporan (for admin), best match first
+@kendaraan_bp.route('/laporan/search', methods=['GET'])
+@jwt_required()
+@admin_required
+def search_laporan_logs():
+    q = (request.args.get('q') or '').strip()
+    if not q:
+        return jsonify({'message': 'Query parameter q is required'}), 400
+    
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = min(max(request.args.get('per_page', 20, type=int), 1), 100)
+    
+    rows, has_more = search_laporan(
+        q,
+        status=request.args.get('status'),
+        kendaraan_id=request.args.get('kendaraan_id', type=int),
+        page=page,
+        per_page=per_page
+    )
+    
+    results = []
+    for log, score in rows:
+        log_dict = log.to_dict()
+        log_dict['score'] = round(score, 6)
+        results.append(log_dict)
+    
+    return jsonify({
+        'laporan_logs': results,
+        'query': q,
+        'current_page': page,
+        'has_more': has_more
+    }), 200
+
 # Get all laporan logs (for admin)
 @kendaraan_bp.route('/laporan', methods=['GET'])
 @jwt_required()
+@admin_required
 def get_all_laporan_logs():
-    current_user_nrp = get_jwt_identity()
-    user = User.query.filter_by(nrp=current_user_nrp).first()
-    
-    if not user or user.role != 'admin':
-        return jsonify({'message': 'Admin access required'}), 403
-    
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
     status = request.args.get('status')
     kendaraan_id = request.args.get('kendaraan_id', type=int)
     
@@ -262,13 +561,19 @@ def get_all_laporan_logs():
     if kendaraan_id:
         query = query.filter(LogLaporan.kendaraan_id == kendaraan_id)
     
-    logs = query.order_by(LogLaporan.tanggal_laporan.desc()).paginate(
-        page=page, per_page=per_page, error_out=False
-    )
+    # Newest first; log_laporan_id breaks ties between equal timestamps and
+    # undated reports sort last
+    try:
+        logs = paginate_keyset(
+            query,
+            [func.coalesce(LogLaporan.tanggal_laporan, datetime.min), LogLaporan.log_laporan_id],
+            key=lambda log: [(log.tanggal_laporan or datetime.min).isoformat(), log.log_laporan_id],
+            descending=True
+        )
+    except ValueError:
+        return jsonify({'message': 'Invalid cursor'}), 400
     
     return jsonify({
-        'laporan_logs': [log.to_dict() for log in logs.items],
-        'total': logs.total,
-        'pages': logs.pages,
-        'current_page': page
+        'laporan_logs': [log.to_dict() for log in logs['items']],
+        **page_meta(logs)
     }), 200
\ No newline at end of file
@@ -1,10 +1,14 @@
 # app/routes/layanan.py
 
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask import Blueprint, request, jsonify, Response
+from flask_jwt_extended import jwt_required
 from app import db
-from app.models.layanan import Layanan, TransaksiLayanan
-from app.models.user import User
+from app.models.layanan import Layanan
+from app.models.transaksi import Transaksi
+from app.utils.helpers import admin_required
+from app.utils.catalog import service_catalog
+from app.utils.identity import current_user
+from app.utils.pricing import attach_services, UnknownServices
 
 # Buat blueprint baru untuk layanan
 layanan_bp = Blueprint('layanan', __name__)
@@ -14,14 +18,17 @@ layanan_bp = Blueprint('layanan', __name__)
 @jwt_required()
 def get_all_layanan():
     try:
-        # Asumsi model Layanan punya kolom 'status' (boolean) untuk menandakan aktif/tidak
-        # Jika tidak ada, hapus .filter_by(status=True)
-        layanan_list = Layanan.query.filter_by(status=True).all()
+        # Katalog layanan aktif di-cache per proses; client mengirim
+        # If-None-Match dan mendapat 304 tanpa body jika katalog tidak berubah
+        body, etag = service_catalog.response_parts()
         
-        return jsonify({
-            'success': True,
-            'data': [l.to_dict() for l in layanan_list]
-        })
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            response = Response(body, mimetype='application/json')
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': 'Failed to fetch services', 'details': str(e)}), 500
@@ -29,13 +36,8 @@ def get_all_layanan():
 # Route untuk membuat layanan baru (hanya admin)
 @layanan_bp.route('/', methods=['POST'])
 @jwt_required()
+@admin_required
 def create_layanan():
-    current_user_nrp = get_jwt_identity()
-    user = User.query.filter_by(nrp=current_user_nrp).first()
-
-    if not user or user.role != 'admin':
-        return jsonify({'error': 'Admin access required'}), 403
-
     data = request.get_json()
     if not data or not data.get('nama_layanan') or 'harga' not in data:
         return jsonify({'error': 'Missing required fields: nama_layanan, harga'}), 400
@@ -50,6 +52,7 @@ def create_layanan():
         )
         db.session.add(new_layanan)
         db.session.commit()
+        service_catalog.invalidate()
 
         return jsonify({
             'success': True,
@@ -71,13 +74,21 @@ def add_service_to_transaction():
         return jsonify({'error': 'transaksi_id and layanan_id are required'}), 400
 
     try:
-        # Di sini Anda bisa menambahkan validasi lebih lanjut
-        # Misalnya, cek apakah transaksi dan layanan ada
-        transaksi_layanan = TransaksiLayanan(
+        # Sama dengan /api/transaksi/add-services: hanya transaksi aktif milik user
+        user = current_user()
+        transaksi = Transaksi.query.filter_by(
             transaksi_id=transaksi_id,
-            layanan_id=layanan_id
-        )
-        db.session.add(transaksi_layanan)
+            user_nrp=user.nrp if user else None,
+            status_transaksi='ONGOING'
+        ).with_for_update().first()
+        if not transaksi:
+            return jsonify({'error': 'Active transaction not found or does not belong to user'}), 404
+
+        try:
+            attach_services(transaksi, [int(layanan_id)])
+        except (UnknownServices, TypeError, ValueError):
+            db.session.rollback()
+            return jsonify({'error': 'Service not found or is not active'}), 404
         db.session.commit()
         return jsonify({'success': True, 'message': 'Service added to transaction'}), 201
     except Exception as e:
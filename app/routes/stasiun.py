@@ -1,17 +1,21 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required
+from sqlalchemy import func, select
 from app import db
-from app.models.stasiun import Stasiun
+from app.models.stasiun import Stasiun, KetersediaanStasiun
 from app.models.kendaraan import Kendaraan
-from app.models.user import User
+from app.utils.helpers import admin_required, paginate_keyset, page_meta
+from app.utils.geo import station_index
+from app.utils.availability import get_availability, init_counter
+from app.utils.status_kendaraan import parse_status
 
 stasiun_bp = Blueprint('stasiun', __name__)
 
+NEARBY_MAX_LIMIT = 100
+
 @stasiun_bp.route('/', methods=['GET'])
 @jwt_required()
 def get_all_stasiun():
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
     status = request.args.get('status')
     
     query = Stasiun.query
@@ -19,15 +23,16 @@ def get_all_stasiun():
     if status:
         query = query.filter(Stasiun.status == status)
     
-    stasiun_list = query.paginate(
-        page=page, per_page=per_page, error_out=False
-    )
+    try:
+        stasiun_list = paginate_keyset(
+            query, [Stasiun.stasiun_id], key=lambda s: [s.stasiun_id]
+        )
+    except ValueError:
+        return jsonify({'message': 'Invalid cursor'}), 400
     
     return jsonify({
-        'stasiun': [s.to_dict() for s in stasiun_list.items],
-        'total': stasiun_list.total,
-        'pages': stasiun_list.pages,
-        'current_page': page
+        'stasiun': [s.to_dict() for s in stasiun_list['items']],
+        **page_meta(stasiun_list)
     }), 200
 
 @stasiun_bp.route('/<int:stasiun_id>', methods=['GET'])
@@ -35,11 +40,8 @@ def get_all_stasiun():
 def get_stasiun(stasiun_id):
     stasiun = Stasiun.query.get_or_404(stasiun_id)
     
-    # FIXED: Changed status to match model default 'Tersedia'
-    available_bikes = Kendaraan.query.filter_by(
-        stasiun_id=stasiun_id, 
-        status='Tersedia'
-    ).count()
+    # O(1) lookup on the write-through counter instead of counting the fleet
+    available_bikes, _ = get_availability([stasiun_id]).get(stasiun_id, (0, 0))
     
     stasiun_data = stasiun.to_dict()
     stasiun_data['available_bikes'] = available_bikes
@@ -48,13 +50,8 @@ def get_stasiun(stasiun_id):
 
 @stasiun_bp.route('/', methods=['POST'])
 @jwt_required()
+@admin_required
 def create_stasiun():
-    current_user_nrp = get_jwt_identity()
-    user = User.query.filter_by(nrp=current_user_nrp).first()
-    
-    if not user or user.role != 'admin':
-        return jsonify({'message': 'Admin access required'}), 403
-    
     data = request.get_json()
     
     # Validate required fields
@@ -71,7 +68,10 @@ def create_stasiun():
     )
     
     db.session.add(stasiun)
+    db.session.flush()
+    init_counter(stasiun.stasiun_id)
     db.session.commit()
+    station_index.invalidate()
     
     return jsonify({
         'message': 'Stasiun created successfully',
@@ -80,13 +80,8 @@ def create_stasiun():
 
 @stasiun_bp.route('/<int:stasiun_id>', methods=['PUT'])
 @jwt_required()
+@admin_required
 def update_stasiun(stasiun_id):
-    current_user_nrp = get_jwt_identity()
-    user = User.query.filter_by(nrp=current_user_nrp).first()
-    
-    if not user or user.role != 'admin':
-        return jsonify({'message': 'Admin access required'}), 403
-    
     stasiun = Stasiun.query.get_or_404(stasiun_id)
     data = request.get_json()
     
@@ -98,6 +93,7 @@ def update_stasiun(stasiun_id):
     stasiun.longtitude = data.get('longtitude', stasiun.longtitude)
     
     db.session.commit()
+    station_index.invalidate()
     
     return jsonify({
         'message': 'Stasiun updated successfully',
@@ -106,13 +102,8 @@ def update_stasiun(stasiun_id):
 
 @stasiun_bp.route('/<int:stasiun_id>', methods=['DELETE'])
 @jwt_required()
+@admin_required
 def delete_stasiun(stasiun_id):
-    current_user_nrp = get_jwt_identity()
-    user = User.query.filter_by(nrp=current_user_nrp).first()
-    
-    if not user or user.role != 'admin':
-        return jsonify({'message': 'Admin access required'}), 403
-    
     stasiun = Stasiun.query.get_or_404(stasiun_id)
     
     # Check if there are bikes at this station
@@ -122,8 +113,10 @@ def delete_stasiun(stasiun_id):
             'message': 'Cannot delete station with bikes. Please relocate bikes first.'
         }), 400
     
+    KetersediaanStasiun.query.filter_by(stasiun_id=stasiun_id).delete()
     db.session.delete(stasiun)
     db.session.commit()
+    station_index.invalidate()
     
     return jsonify({'message': 'Stasiun deleted successfully'}), 200
 
@@ -133,51 +126,57 @@ def get_stasiun_kendaraan(stasiun_id):
     stasiun = Stasiun.query.get_or_404(stasiun_id)
     
     status = request.args.get('status')
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 20, type=int)
     
     query = Kendaraan.query.filter_by(stasiun_id=stasiun_id)
     
     if status:
-        query = query.filter(Kendaraan.status == status)
-    
-    # ADDED: Pagination for better performance
-    kendaraan_list = query.paginate(
-        page=page, per_page=per_page, error_out=False
-    )
+        try:
+            query = query.filter(Kendaraan.status == parse_status(status))
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+    
+    # Keyset pagination: deep pages cost the same as the first one
+    try:
+        kendaraan_list = paginate_keyset(
+            query, [Kendaraan.kendaraan_id], key=lambda k: [k.kendaraan_id]
+        )
+    except ValueError:
+        return jsonify({'message': 'Invalid cursor'}), 400
     
     return jsonify({
         'stasiun': stasiun.to_dict(),
-        'kendaraan': [k.to_dict() for k in kendaraan_list.items],
-        'total': kendaraan_list.total,
-        'pages': kendaraan_list.pages,
-        'current_page': page
+        'kendaraan': [k.to_dict() for k in kendaraan_list['items']],
+        **page_meta(kendaraan_list)
     }), 200
 
 @stasiun_bp.route('/summary', methods=['GET'])
 @jwt_required()
+@admin_required
 def get_stasiun_summary():
-    current_user_nrp = get_jwt_identity()
-    user = User.query.filter_by(nrp=current_user_nrp).first()
-    
-    if not user or user.role != 'admin':
-        return jsonify({'message': 'Admin access required'}), 403
+    # Optional subset, e.g. ?stasiun_ids=1,2,3
+    stasiun_ids = request.args.get('stasiun_ids')
+    if stasiun_ids:
+        try:
+            stasiun_ids = [int(i) for i in stasiun_ids.split(',') if i.strip()]
+        except ValueError:
+            return jsonify({'message': 'stasiun_ids must be a comma-separated list of integers'}), 400
+    
+    # One query: every active station joined with its availability counter
+    query = db.session.query(
+        Stasiun,
+        func.coalesce(KetersediaanStasiun.total, 0),
+        func.coalesce(KetersediaanStasiun.tersedia, 0)
+    ).outerjoin(
+        KetersediaanStasiun, KetersediaanStasiun.stasiun_id == Stasiun.stasiun_id
+    ).filter(
+        Stasiun.status == 'Aktif'
+    ).order_by(Stasiun.stasiun_id)
+    
+    if stasiun_ids:
+        query = query.filter(Stasiun.stasiun_id.in_(stasiun_ids))
     
-    # FIXED: Changed status filter to match model default 'Aktif'
-    stasiun_list = Stasiun.query.filter_by(status='Aktif').all()
     summary = []
-    
-    for stasiun in stasiun_list:
-        # FIXED: Changed status to match model default 'Tersedia'
-        available_bikes = Kendaraan.query.filter_by(
-            stasiun_id=stasiun.stasiun_id, 
-            status='Tersedia'
-        ).count()
-        
-        total_bikes = Kendaraan.query.filter_by(
-            stasiun_id=stasiun.stasiun_id
-        ).count()
-        
+    for stasiun, total_bikes, available_bikes in query.all():
         summary.append({
             'stasiun': stasiun.to_dict(),
             'available_bikes': available_bikes,
@@ -193,54 +192,52 @@ def get_stasiun_summary():
 def get_nearby_stasiun():
     lat = request.args.get('latitude', type=float)
     lng = request.args.get('longitude', type=float)
-    radius = request.args.get('radius', 5, type=int)  # km radius
+    radius = request.args.get('radius', 5, type=float)  # km radius
+    limit = request.args.get('limit', 20, type=int)
     
-    if not lat or not lng:
+    if lat is None or lng is None:
         return jsonify({'message': 'latitude and longitude parameters are required'}), 400
     
-    # For now, return all active stations since we don't have distance calculation
-    # In production, you would implement proper distance calculation
-    stasiun_list = Stasiun.query.filter_by(status='Aktif').all()
+    if radius <= 0:
+        return jsonify({'message': 'radius must be greater than 0'}), 400
+    
+    limit = max(1, min(limit, NEARBY_MAX_LIMIT))
+    
+    # Candidate stations come from the in-memory grid index, not a table scan
+    matches = station_index.nearby(lat, lng, radius, limit=limit)
+    available = get_availability([data['stasiun_id'] for _, data in matches])
     
     nearby_stations = []
-    for stasiun in stasiun_list:
-        if stasiun.latitude and stasiun.longtitude:
-            # Simple distance check (in real app, use proper geospatial queries)
-            available_bikes = Kendaraan.query.filter_by(
-                stasiun_id=stasiun.stasiun_id, 
-                status='Tersedia'
-            ).count()
-            
-            station_data = stasiun.to_dict()
-            station_data['available_bikes'] = available_bikes
-            nearby_stations.append(station_data)
+    for distance, data in matches:
+        station_data = dict(data)
+        station_data['distance_km'] = round(distance, 3)
+        station_data['available_bikes'] = available.get(data['stasiun_id'], (0, 0))[0]
+        nearby_stations.append(station_data)
     
     return jsonify({
         'nearby_stations': nearby_stations,
         'search_params': {
             'latitude': lat,
             'longitude': lng,
-            'radius_km': radius
+            'radius_km': radius,
+            'limit': limit
         }
     }), 200
 
 # ADDED: Route to get station statistics
 @stasiun_bp.route('/statistics', methods=['GET'])
 @jwt_required()
+@admin_required
 def get_stasiun_statistics():
-    current_user_nrp = get_jwt_identity()
-    user = User.query.filter_by(nrp=current_user_nrp).first()
-    
-    if not user or user.role != 'admin':
-        return jsonify({'message': 'Admin access required'}), 403
-    
-    total_stations = Stasiun.query.count()
-    active_stations = Stasiun.query.filter_by(status='Aktif').count()
+    # All four counters in a single round trip via scalar subqueries
+    total_stations, active_stations, total_bikes, available_bikes = db.session.execute(select(
+        select(func.count(Stasiun.stasiun_id)).scalar_subquery(),
+        select(func.count(Stasiun.stasiun_id)).where(Stasiun.status == 'Aktif').scalar_subquery(),
+        select(func.count(Kendaraan.kendaraan_id)).scalar_subquery(),
+        select(func.coalesce(func.sum(KetersediaanStasiun.tersedia), 0)).scalar_subquery()
+    )).one()
     inactive_stations = total_stations - active_stations
     
-    total_bikes = Kendaraan.query.count()
-    available_bikes = Kendaraan.query.filter_by(status='Tersedia').count()
-    
     return jsonify({
         'stations': {
             'total': total_stations,
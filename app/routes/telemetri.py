@@ -0,0 +1,78 @@
+import hmac
+
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import jwt_required, verify_jwt_in_request
+from app.utils.helpers import admin_required
+from app.utils.identity import current_role
+from app.utils.telemetry import telemetry, parse_frames, parse_ndjson
+
+telemetri_bp = Blueprint('telemetri', __name__)
+
+BINARY_TYPES = ('application/octet-stream', 'application/vnd.bike-telemetry')
+
+
+def _device_authorized():
+    """Bikes send X-Telemetry-Key; admins may also post with their JWT"""
+    key = current_app.config.get('TELEMETRY_API_KEY')
+    sent = request.headers.get('X-Telemetry-Key')
+    if key and sent:
+        return hmac.compare_digest(sent, key)
+    try:
+        verify_jwt_in_request()
+    except Exception:
+        return False
+    return current_role() == 'admin'
+
+
+@telemetri_bp.route('/ingest', methods=['POST'])
+def ingest_telemetry():
+    """Batch of pings as NDJSON or binary frames (see app/utils/telemetry.py)"""
+    if not _device_authorized():
+        return jsonify({'message': 'Invalid telemetry key'}), 401
+
+    data = request.get_data(cache=False)
+    if len(data) > current_app.config['TELEMETRY_MAX_PAYLOAD']:
+        return jsonify({'message': 'Payload too large'}), 413
+
+    try:
+        if request.mimetype in BINARY_TYPES:
+            pings, rejected = parse_frames(data)
+        else:
+            pings, rejected = parse_ndjson(data)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    accepted, unknown = telemetry.ingest(pings)
+    return jsonify({
+        'accepted': accepted,
+        'rejected': rejected + unknown
+    }), 202
+
+
+@telemetri_bp.route('/latest', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_latest_positions():
+    """Latest position per bike inside ?bbox=min_lat,min_lng,max_lat,max_lng"""
+    try:
+        min_lat, min_lng, max_lat, max_lng = (float(v) for v in request.args['bbox'].split(','))
+    except (KeyError, ValueError):
+        return jsonify({'message': 'bbox must be min_lat,min_lng,max_lat,max_lng'}), 400
+    if min_lat > max_lat or min_lng > max_lng:
+        return jsonify({'message': 'bbox minimums must not exceed maximums'}), 400
+    limit = min(max(request.args.get('limit', 500, type=int), 1), 5000)
+
+    telemetry.warm()
+    positions = telemetry.latest.in_bbox(min_lat, min_lng, max_lat, max_lng, limit=limit)
+    return jsonify({'positions': positions, 'count': len(positions)}), 200
+
+
+@telemetri_bp.route('/latest/<int:kendaraan_id>', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_latest_position(kendaraan_id):
+    telemetry.warm()
+    position = telemetry.latest.get(kendaraan_id)
+    if position is None:
+        return jsonify({'message': 'No telemetry for this vehicle'}), 404
+    return jsonify({'position': position}), 200
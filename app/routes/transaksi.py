@@ -1,17 +1,27 @@
 # transaksi.py (FIXED AND CLEANED)
 
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity, verify_jwt_in_request
+from flask import Blueprint, request, jsonify, Response, stream_with_context, current_app
+from flask_jwt_extended import jwt_required
+from sqlalchemy import update, select, literal, union_all, func, or_
 from sqlalchemy.orm import aliased
 from app import db
 from app.models.transaksi import Transaksi
-from app.models.kendaraan import Kendaraan
+from app.models.arsip import TransaksiArsip
+from app.models.kendaraan import Kendaraan, StatusKendaraan
 from app.models.stasiun import Stasiun
-from app.models.user import User
-from app.models.layanan import Layanan, TransaksiLayanan
+from app.utils.identity import current_user
+from app.utils.helpers import admin_required
 from app.models.stasiun import Stasiun
 from app.models.kendaraan import Kendaraan
+from app.utils.availability import record_bike_change
+from app.utils.pricing import get_pricing_engine, total_from_line_items, attach_services, UnknownServices
+from app.utils.helpers import encode_cursor, decode_cursor, keyset_after, MAX_PER_PAGE
+from app.utils.idempotency import idempotent
+from app.utils.archive import merge_newest_first
 from datetime import datetime
+import csv
+import io
+import json
 import uuid
 import logging
 
@@ -21,6 +31,11 @@ logger = logging.getLogger(__name__)
 
 transaksi_bp = Blueprint('transaksi', __name__)
 
+HISTORY_DEFAULT_LIMIT = 50
+HISTORY_MAX_LIMIT = 200
+STREAM_BATCH_SIZE = 500
+EXPORT_BATCH_SIZE = 5000
+
 # Helper function for consistent error handling
 def handle_error(e, message="An error occurred"):
     logger.error(f"Error in transaksi blueprint: {str(e)}")
@@ -30,8 +45,8 @@ def handle_error(e, message="An error occurred"):
 # Helper function to get current user safely
 def get_current_user():
     try:
-        current_user_nrp = get_jwt_identity()
-        user = User.query.filter_by(nrp=current_user_nrp).first()
+        # Request-scoped and process-cached, so no User query on most requests
+        user = current_user()
         if not user:
             return None, jsonify({'error': 'User not found'}), 404
         return user, None, None
@@ -40,6 +55,7 @@ def get_current_user():
 
 @transaksi_bp.route('/rent', methods=['POST'])
 @jwt_required()
+@idempotent
 def rent_bike():
     """Rent a bike"""
     try:
@@ -59,19 +75,31 @@ def rent_bike():
         if not kendaraan_id or not stasiun_ambil_id:
             return jsonify({'error': 'kendaraan_id and stasiun_ambil_id are required'}), 400
         
-        kendaraan = Kendaraan.query.get(kendaraan_id)
-        if not kendaraan:
-            return jsonify({'error': 'Vehicle not found'}), 404
-        # NOTE: Status check is case-insensitive by converting both to upper.
-        if kendaraan.status.upper() != 'TERSEDIA':
-            return jsonify({'error': f'Vehicle is not available. Status: {kendaraan.status}'}), 400
-        
         stasiun = Stasiun.query.get(stasiun_ambil_id)
         if not stasiun:
             return jsonify({'error': 'Station not found'}), 404
         
         deposit_dipegang = data.get('deposit_dipegang', 0)
         
+        # Claim the bike with a conditional UPDATE. The row lock taken by the
+        # UPDATE serializes concurrent renters, and only the one that still
+        # sees it as available gets a row back, so a bike is never rented twice.
+        claimed = db.session.execute(
+            update(Kendaraan)
+            .where(Kendaraan.kendaraan_id == kendaraan_id)
+            .where(Kendaraan.status == StatusKendaraan.TERSEDIA)
+            .values(status=StatusKendaraan.DISEWA)
+            .returning(Kendaraan.stasiun_id)
+            .execution_options(synchronize_session=False)
+        ).first()
+        
+        if claimed is None:
+            db.session.rollback()
+            kendaraan = Kendaraan.query.get(kendaraan_id)
+            if not kendaraan:
+                return jsonify({'error': 'Vehicle not found'}), 404
+            return jsonify({'error': f'Vehicle is not available. Status: {kendaraan.status.name}'}), 400
+        
         # Create transaction
         transaksi = Transaksi(
             user_nrp=user.nrp,
@@ -86,7 +114,7 @@ def rent_bike():
         )
         
         db.session.add(transaksi)
-        kendaraan.status = 'DISEWA'
+        record_bike_change(claimed.stasiun_id, StatusKendaraan.TERSEDIA, claimed.stasiun_id, StatusKendaraan.DISEWA)
         db.session.commit()
         
         return jsonify({
@@ -100,6 +128,7 @@ def rent_bike():
 
 @transaksi_bp.route('/return', methods=['POST'])
 @jwt_required()
+@idempotent
 def return_bike():
     """Return a bike"""
     try:
@@ -121,28 +150,51 @@ def return_bike():
         if not stasiun:
             return jsonify({'error': 'Return station not found'}), 404
         
-        transaksi = Transaksi.query.filter_by(
-            transaksi_id=transaksi_id,
-            user_nrp=user.nrp,
-            status_transaksi='ONGOING'
+        waktu_selesai = datetime.utcnow()
+        
+        # Close the rental with a conditional UPDATE so a retried or concurrent
+        # return cannot finish the same transaction twice
+        transaksi = db.session.scalars(
+            update(Transaksi)
+            .where(Transaksi.transaksi_id == transaksi_id)
+            .where(Transaksi.user_nrp == user.nrp)
+            .where(Transaksi.status_transaksi == 'ONGOING')
+            .values(
+                status_transaksi='SELESAI',
+                waktu_selesai=waktu_selesai,
+                stasiun_kembali_id=stasiun_kembali_id
+            )
+            .returning(Transaksi)
+            .execution_options(populate_existing=True)
         ).first()
         
         if not transaksi:
+            db.session.rollback()
             return jsonify({'error': 'Active rental with this ID not found for the current user'}), 404
         
-        waktu_selesai = datetime.utcnow()
-        duration = waktu_selesai - transaksi.waktu_mulai
-        duration_hours = duration.total_seconds() / 3600
-        
-        basic_cost = max(5000, duration_hours * 5000)
-        
-        transaksi.stasiun_kembali_id = stasiun_kembali_id
-        transaksi.waktu_selesai = waktu_selesai
-        transaksi.status_transaksi = 'SELESAI'
-        transaksi.total_biaya = basic_cost
-        
-        if transaksi.kendaraan:
-            transaksi.kendaraan.status = 'TERSEDIA'
+        # Ride charge from the tariff of this bike type; the total adds the
+        # service lines already on the rental with one aggregate
+        tipe = db.session.query(Kendaraan.tipe).filter_by(kendaraan_id=transaksi.kendaraan_id).scalar()
+        biaya_sewa = get_pricing_engine().price_ride(tipe, transaksi.waktu_mulai, waktu_selesai)
+        transaksi = db.session.scalars(
+            update(Transaksi)
+            .where(Transaksi.transaksi_id == transaksi.transaksi_id)
+            .values(biaya_sewa=biaya_sewa, total_biaya=total_from_line_items(literal(biaya_sewa, Transaksi.biaya_sewa.type)))
+            .returning(Transaksi)
+            .execution_options(populate_existing=True)
+        ).one()
+        
+        # Release the bike in the same transaction, again without a prior read
+        released = db.session.execute(
+            update(Kendaraan)
+            .where(Kendaraan.kendaraan_id == transaksi.kendaraan_id)
+            .where(Kendaraan.status == StatusKendaraan.DISEWA)
+            .values(status=StatusKendaraan.TERSEDIA)
+            .returning(Kendaraan.stasiun_id)
+            .execution_options(synchronize_session=False)
+        ).first()
+        if released is not None:
+            record_bike_change(released.stasiun_id, StatusKendaraan.DISEWA, released.stasiun_id, StatusKendaraan.TERSEDIA)
         
         db.session.commit()
         
@@ -194,50 +246,105 @@ def get_active_rentals():
 @transaksi_bp.route('/my-rentals', methods=['GET'])
 @jwt_required()
 def get_my_rentals():
-    """Get current user's rental history with station and bike names"""
+    """Get current user's rental history with station and bike names.
+
+    Paged with an opaque keyset cursor on (waktu_mulai, transaksi_id):
+    pass ``next_cursor`` back as ``?cursor=`` for the next page. With
+    ``?stream=true`` the whole history is streamed as it is read. Archived
+    rides are merged in, so the history is complete after archival.
+    """
     try:
         user, error_response, status_code = get_current_user()
         if error_response:
             return error_response, status_code
 
+        limit = request.args.get('limit', HISTORY_DEFAULT_LIMIT, type=int)
+        limit = max(1, min(limit, HISTORY_MAX_LIMIT))
+        stream = request.args.get('stream', 'false').lower() in ('1', 'true', 'yes')
+
+        cursor = request.args.get('cursor')
+        after = None
+        if cursor:
+            try:
+                values = decode_cursor(cursor)
+                started = datetime.fromisoformat(values['w']) if values['w'] is not None else None
+                after = (started, int(values['id']))
+            except (ValueError, KeyError, TypeError):
+                return jsonify({'error': 'Invalid cursor'}), 400
+
         PickupStation = aliased(Stasiun, name='pickup_station')
         ReturnStation = aliased(Stasiun, name='return_station')
 
-        # =======================================================================
-        # Querry Join: Transaksi, PickupStation, ReturnStation, Kendaraan
-        query = db.session.query(
-            Transaksi,
-            PickupStation.nama_stasiun.label('nama_stasiun_ambil'),
-            ReturnStation.nama_stasiun.label('nama_stasiun_kembali'),
-            Kendaraan.merk.label('merk_kendaraan')
-        ).join(
-            PickupStation, Transaksi.stasiun_ambil_id == PickupStation.stasiun_id, isouter=True
-        ).join(
-            ReturnStation, Transaksi.stasiun_kembali_id == ReturnStation.stasiun_id, isouter=True
-        ).join(
-            Kendaraan, Transaksi.kendaraan_id == Kendaraan.kendaraan_id, isouter=True 
-        ).filter(
-            Transaksi.user_nrp == user.nrp
-        ).order_by(
-            Transaksi.waktu_mulai.desc()
-        )
-        # Nure
-        # =======================================================================
+        def history_query(model):
+            # =======================================================================
+            # Querry Join: Transaksi, PickupStation, ReturnStation, Kendaraan
+            query = db.session.query(
+                model,
+                PickupStation.nama_stasiun.label('nama_stasiun_ambil'),
+                ReturnStation.nama_stasiun.label('nama_stasiun_kembali'),
+                Kendaraan.merk.label('merk_kendaraan')
+            ).join(
+                PickupStation, model.stasiun_ambil_id == PickupStation.stasiun_id, isouter=True
+            ).join(
+                ReturnStation, model.stasiun_kembali_id == ReturnStation.stasiun_id, isouter=True
+            ).join(
+                Kendaraan, model.kendaraan_id == Kendaraan.kendaraan_id, isouter=True 
+            ).filter(
+                model.user_nrp == user.nrp
+            ).order_by(
+                model.waktu_mulai.desc().nulls_last(), model.transaksi_id.desc()
+            )
+            # Nure
+            # =======================================================================
+            # Rides without a start time sort last, matching history_key below
+            if after and after[0] is None:
+                query = query.filter(model.waktu_mulai.is_(None), model.transaksi_id < after[1])
+            elif after:
+                query = query.filter(or_(
+                    keyset_after([model.waktu_mulai, model.transaksi_id], after),
+                    model.waktu_mulai.is_(None)
+                ))
+            return query
 
-        
-        rentals_with_details = query.all()
-        
-        results = []
-        for rental_obj, pickup_name, return_name, bike_brand in rentals_with_details:
+        # Finished rides may already live in the archive; read both and merge
+        queries = [history_query(Transaksi), history_query(TransaksiArsip)]
+        history_key = lambda row: (row[0].waktu_mulai or datetime.min, row[0].transaksi_id)
+
+        def serialize(rental_obj, pickup_name, return_name, bike_brand):
             rental_dict = rental_obj.to_dict()
             rental_dict['nama_stasiun_ambil'] = pickup_name
             rental_dict['nama_stasiun_kembali'] = return_name
             rental_dict['merk_kendaraan'] = bike_brand
-            results.append(rental_dict)
+            return rental_dict
+
+        if stream:
+            def generate():
+                yield '{"success": true, "data": ['
+                first = True
+                rows = merge_newest_first(*(q.yield_per(STREAM_BATCH_SIZE) for q in queries), key=history_key)
+                for row in rows:
+                    yield ('' if first else ',') + json.dumps(serialize(*row))
+                    first = False
+                yield ']}'
+
+            return Response(stream_with_context(generate()), mimetype='application/json')
+
+        rows = list(merge_newest_first(*(q.limit(limit + 1).all() for q in queries), key=history_key))[:limit + 1]
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+
+        results = [serialize(*row) for row in rows]
+        next_cursor = None
+        if has_more:
+            last = rows[-1][0]
+            started = last.waktu_mulai.isoformat() if last.waktu_mulai else None
+            next_cursor = encode_cursor({'w': started, 'id': last.transaksi_id})
 
         return jsonify({
             'success': True,
-            'data': results 
+            'data': results,
+            'next_cursor': next_cursor,
+            'has_more': has_more
         })
         
     except Exception as e:
@@ -247,35 +354,145 @@ def get_my_rentals():
 # This route is optional, you can add it back if needed for admins
 @transaksi_bp.route('/', methods=['GET'])
 @jwt_required()
+@admin_required
 def get_all_transactions_for_admin():
     """(Admin) Get all transactions from all users"""
     try:
-        user, error_response, status_code = get_current_user()
-        if error_response:
-            return error_response, status_code
-
-        if user.role != 'admin':
-            return jsonify({'error': 'Admin access required'}), 403
-
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 20, type=int)
 
-        all_transactions = Transaksi.query.order_by(Transaksi.waktu_mulai.desc()).paginate(
-            page=page, per_page=per_page, error_out=False
-        )
+        page = max(page, 1)
+        per_page = max(1, min(per_page, MAX_PER_PAGE))
+
+        # Page over hot and archived rows together by id, then load the rows
+        combined = union_all(
+            select(Transaksi.transaksi_id, Transaksi.waktu_mulai, literal(False).label('arsip')),
+            select(TransaksiArsip.transaksi_id, TransaksiArsip.waktu_mulai, literal(True).label('arsip'))
+        ).subquery()
+        page_rows = db.session.execute(
+            select(combined.c.transaksi_id, combined.c.arsip)
+            .order_by(combined.c.waktu_mulai.desc(), combined.c.transaksi_id.desc())
+            .offset((page - 1) * per_page).limit(per_page)
+        ).all()
+        total = (db.session.query(func.count(Transaksi.transaksi_id)).scalar()
+                 + db.session.query(func.count(TransaksiArsip.transaksi_id)).scalar())
+
+        hot_ids = [tid for tid, arsip in page_rows if not arsip]
+        cold_ids = [tid for tid, arsip in page_rows if arsip]
+        loaded = {}
+        if hot_ids:
+            loaded.update(((False, t.transaksi_id), t) for t in Transaksi.query.filter(Transaksi.transaksi_id.in_(hot_ids)))
+        if cold_ids:
+            loaded.update(((True, t.transaksi_id), t) for t in TransaksiArsip.query.filter(TransaksiArsip.transaksi_id.in_(cold_ids)))
+        items = [loaded[(bool(arsip), tid)] for tid, arsip in page_rows if (bool(arsip), tid) in loaded]
 
         return jsonify({
             'success': True,
-            'data': [t.to_dict() for t in all_transactions.items],
+            'data': [t.to_dict() for t in items],
             'pagination': {
                 'page': page,
                 'per_page': per_page,
-                'total': all_transactions.total,
-                'pages': all_transactions.pages
+                'total': total,
+                'pages': (total + per_page - 1) // per_page
             }
         })
     except Exception as e:
         return handle_error(e, "Failed to get all transactions")
+
+@transaksi_bp.route('/export', methods=['GET'])
+@jwt_required()
+@admin_required
+def export_transactions():
+    """(Admin) Stream transactions started in [start, end) as CSV or NDJSON"""
+    try:
+        export_format = request.args.get('format', 'csv').lower()
+        if export_format not in ('csv', 'ndjson'):
+            return jsonify({'error': "format must be 'csv' or 'ndjson'"}), 400
+
+        try:
+            start = datetime.fromisoformat(request.args['start'])
+            end = datetime.fromisoformat(request.args['end'])
+        except KeyError:
+            return jsonify({'error': 'start and end query parameters are required'}), 400
+        except ValueError:
+            return jsonify({'error': 'start and end must be ISO dates, e.g. 2025-01-31'}), 400
+
+        PickupStation = aliased(Stasiun, name='pickup_station')
+        ReturnStation = aliased(Stasiun, name='return_station')
+
+        # Plain column select: rows are tuples, never ORM objects
+        def export_select(model):
+            return select(
+                model.transaksi_id,
+                model.user_nrp,
+                model.kendaraan_id,
+                Kendaraan.merk.label('merk_kendaraan'),
+                model.stasiun_ambil_id,
+                PickupStation.nama_stasiun.label('nama_stasiun_ambil'),
+                model.stasiun_kembali_id,
+                ReturnStation.nama_stasiun.label('nama_stasiun_kembali'),
+                model.waktu_mulai,
+                model.waktu_selesai,
+                model.waktu_pembayaran,
+                model.status_transaksi,
+                model.payment_gateway_ref,
+                model.total_biaya,
+                model.deposit_dipegang
+            ).outerjoin(
+                PickupStation, model.stasiun_ambil_id == PickupStation.stasiun_id
+            ).outerjoin(
+                ReturnStation, model.stasiun_kembali_id == ReturnStation.stasiun_id
+            ).outerjoin(
+                Kendaraan, model.kendaraan_id == Kendaraan.kendaraan_id
+            ).where(
+                model.waktu_mulai >= start,
+                model.waktu_mulai < end
+            )
+
+        # Hot and archived rows in one ordered stream
+        rows = union_all(export_select(Transaksi), export_select(TransaksiArsip)).subquery()
+        statement = select(*rows.c).order_by(rows.c.waktu_mulai, rows.c.transaksi_id)
+
+        columns = [c.name for c in statement.selected_columns]
+
+        def to_value(value):
+            if isinstance(value, datetime):
+                return value.isoformat()
+            if value is not None and not isinstance(value, (int, str)):
+                return str(value)
+            return value
+
+        def generate():
+            # stream_results asks the driver for a server-side cursor, so only
+            # one batch of rows is held in memory at a time
+            result = db.session.execute(
+                statement.execution_options(stream_results=True, yield_per=EXPORT_BATCH_SIZE)
+            )
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            if export_format == 'csv':
+                writer.writerow(columns)
+
+            for partition in result.partitions():
+                for row in partition:
+                    if export_format == 'csv':
+                        writer.writerow([to_value(v) for v in row])
+                    else:
+                        buffer.write(json.dumps(dict(zip(columns, map(to_value, row)))) + '\n')
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate(0)
+            yield buffer.getvalue()
+
+        mimetype = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+        filename = f"transaksi_{start.date().isoformat()}_{end.date().isoformat()}.{export_format}"
+        return Response(
+            stream_with_context(generate()),
+            mimetype=mimetype,
+            headers={'Content-Disposition': f'attachment; filename={filename}'}
+        )
+    except Exception as e:
+        return handle_error(e, "Failed to export transactions")
     
 # app/routes/transaksi.py
 
@@ -284,6 +501,7 @@ def get_all_transactions_for_admin():
 # ==================== GANTI FUNGSI LAMA DENGAN YANG INI ====================
 @transaksi_bp.route('/add-service', methods=['POST'])
 @jwt_required()
+@idempotent
 def add_service_to_transaction():
     """Adds a new service to an existing transaction."""
     
@@ -303,42 +521,35 @@ def add_service_to_transaction():
     if not transaksi_id or not layanan_id:
         logger.warning(f"Add service failed: Missing ID. Transaksi: {transaksi_id}, Layanan: {layanan_id}")
         return jsonify({'error': 'transaksi_id and layanan_id are required'}), 400
+    try:
+        transaksi_id, layanan_id = int(transaksi_id), int(layanan_id)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'transaksi_id and layanan_id must be integers'}), 400
 
     try:
         logger.debug(f"Attempting to add service {layanan_id} to transaction {transaksi_id} for user {user.nrp}")
 
-        # 1. Verifikasi bahwa transaksi ini milik user yang sedang login dan sedang berlangsung
+        # 1. Verifikasi bahwa transaksi ini milik user yang sedang login dan sedang berlangsung.
+        #    The row stays locked until commit, so concurrent adds to the same
+        #    rental are serialised and each total sees every committed line
         transaksi = Transaksi.query.filter_by(
             transaksi_id=transaksi_id, 
             user_nrp=user.nrp,
             status_transaksi='ONGOING' # Mungkin hanya bisa tambah layanan pada transaksi aktif
-        ).first()
+        ).with_for_update().first()
         if not transaksi:
             logger.warning(f"Add service failed: Active transaction {transaksi_id} not found for user {user.nrp}")
             return jsonify({'error': 'Active transaction not found or does not belong to user'}), 404
         
-        # 2. Verifikasi bahwa layanan yang dipilih ada dan aktif
-        layanan = Layanan.query.filter_by(layanan_id=layanan_id, status=True).first()
-        if not layanan:
+        # 2. Baris layanan dibuat lewat jalur yang sama dengan /add-services:
+        #    layanan aktif dicek dan diberi harga dari katalog (service_catalog), total dihitung ulang
+        try:
+            layanan, = attach_services(transaksi, [layanan_id])
+        except UnknownServices:
+            db.session.rollback()
             logger.warning(f"Add service failed: Service ID {layanan_id} not found or is not active")
             return jsonify({'error': 'Service not found or is not active'}), 404
 
-        # 3. Buat hubungan antara transaksi dan layanan
-        new_transaksi_layanan = TransaksiLayanan(
-            transaksi_id=transaksi.transaksi_id,
-            layanan_id=layanan.layanan_id
-        )
-        db.session.add(new_transaksi_layanan)
-        logger.debug("TransaksiLayanan object created and added to session.")
-
-        # 4. Update total biaya transaksi dengan aman
-        # Ubah nilai None menjadi 0 sebelum melakukan penambahan
-        current_cost = float(transaksi.total_biaya or 0)
-        service_cost = float(layanan.biaya_dasar or 0)
-        
-        transaksi.total_biaya = current_cost + service_cost
-        logger.debug(f"Updating total_biaya for transaction {transaksi.transaksi_id}: {current_cost} + {service_cost} = {transaksi.total_biaya}")
-
         db.session.commit()
         logger.info(f"Successfully added service {layanan_id} to transaction {transaksi_id}")
 
@@ -350,4 +561,61 @@ def add_service_to_transaction():
     except Exception as e:
         # Gunakan helper error yang sudah ada
         return handle_error(e, "Failed to add service to transaction")
-# =======================================================================
\ No newline at end of file
+# =======================================================================
+@transaksi_bp.route('/add-services', methods=['POST'])
+@jwt_required()
+@idempotent
+def add_services_to_transaction():
+    """Attach several services to an active rental in one request.
+
+    Body: ``{"transaksi_id": 1, "layanan_ids": [2, 3]}``. Either every
+    service is added or none is; the total is recomputed once.
+    """
+    user, error_response, status_code = get_current_user()
+    if error_response:
+        return error_response, status_code
+
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({'error': 'No data provided'}), 400
+
+    transaksi_id = data.get('transaksi_id')
+    layanan_ids = data.get('layanan_ids')
+    if not transaksi_id or not isinstance(layanan_ids, list) or not layanan_ids:
+        return jsonify({'error': 'transaksi_id and a non-empty layanan_ids list are required'}), 400
+    if not isinstance(transaksi_id, int) or isinstance(transaksi_id, bool):
+        return jsonify({'error': 'transaksi_id must be an integer'}), 400
+    if not all(isinstance(layanan_id, int) and not isinstance(layanan_id, bool) for layanan_id in layanan_ids):
+        return jsonify({'error': 'layanan_ids must be integers'}), 400
+
+    limit = current_app.config['TRANSAKSI_SERVICES_MAX']
+    if len(layanan_ids) > limit:
+        return jsonify({'error': f'At most {limit} services per request'}), 400
+
+    try:
+        # Locked until commit, like /add-service
+        transaksi = Transaksi.query.filter_by(
+            transaksi_id=transaksi_id,
+            user_nrp=user.nrp,
+            status_transaksi='ONGOING'
+        ).with_for_update().first()
+        if not transaksi:
+            return jsonify({'error': 'Active transaction not found or does not belong to user'}), 404
+
+        try:
+            added = attach_services(transaksi, layanan_ids)
+        except UnknownServices as e:
+            db.session.rollback()
+            return jsonify({'error': 'Service not found or is not active', 'layanan_ids': e.missing}), 404
+
+        db.session.commit()
+        logger.info(f"Added {len(added)} service(s) to transaction {transaksi.transaksi_id}")
+
+        return jsonify({
+            'success': True,
+            'message': f"{len(added)} service(s) added to transaction {transaksi.transaksi_id}",
+            'data': transaksi.to_dict()
+        }), 200
+
+    except Exception as e:
+        return handle_error(e, "Failed to add services to transaction")
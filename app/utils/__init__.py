@@ -3,7 +3,14 @@ from .helpers import (
     user_owns_resource,
     generate_response,
     validate_required_fields,
-    paginate_query
+    paginate_query,
+    encode_cursor,
+    decode_cursor,
+    keyset_after,
+    paginate_keyset,
+    page_meta,
+    estimate_count,
+    upsert_insert
 )
 
 __all__ = [
@@ -11,5 +18,12 @@ __all__ = [
     'user_owns_resource',
     'generate_response',
     'validate_required_fields',
-    'paginate_query'
+    'paginate_query',
+    'encode_cursor',
+    'decode_cursor',
+    'keyset_after',
+    'paginate_keyset',
+    'page_meta',
+    'estimate_count',
+    'upsert_insert'
 ]
\ No newline at end of file
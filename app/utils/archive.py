@@ -0,0 +1,131 @@
+import heapq
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, insert, delete, func, literal
+
+from app import db
+from app.models.transaksi import Transaksi
+from app.models.layanan import TransaksiLayanan
+from app.models.arsip import TransaksiArsip, TransaksiLayananArsip
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_STATUS = 'SELESAI'
+
+
+def _shared_columns(source, target):
+    return [column.name for column in source.__table__.columns if column.name in target.__table__.columns]
+
+
+def archive_transactions(older_than_days, batch_size=1000, now=None, dry_run=False):
+    """Move SELESAI transactions started more than ``older_than_days`` ago
+    into transaksi_arsip, with their service lines.
+
+    Each batch copies the rows with INSERT ... SELECT and deletes them from
+    the hot tables in the same transaction, then commits, so locks stay
+    short and a failure never leaves a row in both or neither table. Rows a
+    concurrent request holds are skipped. Returns a report dict.
+    """
+    started = time.perf_counter()
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(days=older_than_days)
+
+    transaksi_columns = _shared_columns(Transaksi, TransaksiArsip)
+    line_columns = _shared_columns(TransaksiLayanan, TransaksiLayananArsip)
+    hot = Transaksi.__table__
+    hot_lines = TransaksiLayanan.__table__
+
+    eligible = [
+        Transaksi.status_transaksi == ARCHIVE_STATUS,
+        Transaksi.waktu_mulai < cutoff,
+        # Never move the newest row of either hot table: SQLite would hand
+        # its id out again and the next copy into the archive would collide
+        Transaksi.transaksi_id < select(func.max(Transaksi.transaksi_id)).scalar_subquery(),
+        Transaksi.transaksi_id.notin_(
+            select(TransaksiLayanan.transaksi_id).where(
+                TransaksiLayanan.transaksi_layanan_id
+                == select(func.max(TransaksiLayanan.transaksi_layanan_id)).scalar_subquery()
+            )
+        )
+    ]
+
+    if dry_run:
+        count = db.session.execute(select(func.count()).select_from(Transaksi).where(*eligible)).scalar()
+        return {'archived': 0, 'eligible': count, 'cutoff': cutoff.isoformat(), 'dry_run': True}
+
+    archived = 0
+    lines = 0
+    batches = 0
+    last_id = 0
+    while True:
+        ids = db.session.execute(
+            select(Transaksi.transaksi_id)
+            .where(*eligible, Transaksi.transaksi_id > last_id)
+            .order_by(Transaksi.transaksi_id).limit(batch_size)
+            .with_for_update(of=Transaksi, skip_locked=True)
+        ).scalars().all()
+        if not ids:
+            break
+        last_id = ids[-1]
+        batches += 1
+
+        db.session.execute(insert(TransaksiArsip.__table__).from_select(
+            transaksi_columns + ['diarsipkan_pada'],
+            select(*(hot.c[name] for name in transaksi_columns), literal(now))
+            .where(hot.c.transaksi_id.in_(ids))
+        ))
+        lines += db.session.execute(insert(TransaksiLayananArsip.__table__).from_select(
+            line_columns,
+            select(*(hot_lines.c[name] for name in line_columns)).where(hot_lines.c.transaksi_id.in_(ids))
+        )).rowcount
+        db.session.execute(delete(hot_lines).where(hot_lines.c.transaksi_id.in_(ids)))
+        db.session.execute(delete(hot).where(hot.c.transaksi_id.in_(ids)))
+        db.session.commit()
+        archived += len(ids)
+
+        if len(ids) < batch_size:
+            break
+
+    return {
+        'archived': archived,
+        'service_lines': lines,
+        'batches': batches,
+        'cutoff': cutoff.isoformat(),
+        'elapsed_seconds': round(time.perf_counter() - started, 3)
+    }
+
+
+def merge_newest_first(*streams, key):
+    """Merge row iterables that are each sorted newest first into one"""
+    return heapq.merge(*streams, key=key, reverse=True)
+
+
+def start_archiver(app):
+    """Run archive_transactions every ARCHIVE_INTERVAL seconds in a daemon thread"""
+    interval = app.config.get('ARCHIVE_INTERVAL')
+    if not interval:
+        return None
+
+    def loop():
+        while True:
+            time.sleep(interval)
+            with app.app_context():
+                try:
+                    report = archive_transactions(
+                        app.config['ARCHIVE_AFTER_DAYS'],
+                        batch_size=app.config['ARCHIVE_BATCH_SIZE']
+                    )
+                    if report['archived']:
+                        logger.info(f"Archiver: {report}")
+                except Exception as e:
+                    logger.error(f"Archiver failed: {str(e)}")
+                    db.session.rollback()
+                finally:
+                    db.session.remove()
+
+    thread = threading.Thread(target=loop, name='transaksi-archiver', daemon=True)
+    thread.start()
+    return thread
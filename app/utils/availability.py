@@ -0,0 +1,151 @@
+from sqlalchemy import func, case
+from app import db
+from app.models.kendaraan import Kendaraan, StatusKendaraan
+from app.models.stasiun import KetersediaanStasiun
+from app.utils.helpers import upsert_insert
+
+
+def is_available_status(status):
+    """A bike counts as available when its status is TERSEDIA"""
+    return status is not None and StatusKendaraan.parse(status) == StatusKendaraan.TERSEDIA
+
+
+def _available_condition():
+    # Plain equality on the code so ix_kendaraan_stasiun_status covers it
+    return Kendaraan.status == StatusKendaraan.TERSEDIA
+
+
+def count_from_fleet(stasiun_ids=None):
+    """Recompute {stasiun_id: (tersedia, total)} from the kendaraan table"""
+    query = db.session.query(
+        Kendaraan.stasiun_id,
+        func.count(case((_available_condition(), Kendaraan.kendaraan_id))),
+        func.count(Kendaraan.kendaraan_id)
+    ).filter(Kendaraan.stasiun_id.isnot(None))
+
+    if stasiun_ids is not None:
+        query = query.filter(Kendaraan.stasiun_id.in_(stasiun_ids))
+
+    rows = query.group_by(Kendaraan.stasiun_id).all()
+    return {stasiun_id: (tersedia, total) for stasiun_id, tersedia, total in rows}
+
+
+def _add_to_counter(stasiun_id, d_tersedia, d_total):
+    return KetersediaanStasiun.query.filter_by(stasiun_id=stasiun_id).update({
+        KetersediaanStasiun.tersedia: KetersediaanStasiun.tersedia + d_tersedia,
+        KetersediaanStasiun.total: KetersediaanStasiun.total + d_total
+    }, synchronize_session=False)
+
+
+def _bump(stasiun_id, d_tersedia, d_total):
+    if stasiun_id is None or (d_tersedia == 0 and d_total == 0):
+        return
+
+    if _add_to_counter(stasiun_id, d_tersedia, d_total) == 0:
+        # No counter row yet (e.g. station created before counters existed):
+        # seed it from the fleet as it was before this change, tolerating a
+        # concurrent request seeding it first, then apply the change as usual
+        db.session.flush()
+        tersedia, total = count_from_fleet([stasiun_id]).get(stasiun_id, (0, 0))
+        db.session.execute(
+            upsert_insert(KetersediaanStasiun).values(
+                stasiun_id=stasiun_id, tersedia=tersedia - d_tersedia, total=total - d_total
+            ).on_conflict_do_nothing(index_elements=['stasiun_id'])
+        )
+        _add_to_counter(stasiun_id, d_tersedia, d_total)
+
+
+def accumulate_bike_change(deltas, old_stasiun_id, old_status, new_stasiun_id, new_status):
+    """Add one kendaraan change to a {stasiun_id: (d_tersedia, d_total)} dict.
+
+    Pass ``None`` for both old values on create and for both new values on
+    delete.
+    """
+    old_available = 1 if old_stasiun_id is not None and is_available_status(old_status) else 0
+    new_available = 1 if new_stasiun_id is not None and is_available_status(new_status) else 0
+
+    def add(stasiun_id, d_tersedia, d_total):
+        if stasiun_id is None:
+            return
+        tersedia, total = deltas.get(stasiun_id, (0, 0))
+        deltas[stasiun_id] = (tersedia + d_tersedia, total + d_total)
+
+    if old_stasiun_id == new_stasiun_id:
+        add(new_stasiun_id, new_available - old_available, 0)
+    else:
+        add(old_stasiun_id, -old_available, -1)
+        add(new_stasiun_id, new_available, 1)
+    return deltas
+
+
+def record_bike_change(old_stasiun_id, old_status, new_stasiun_id, new_status):
+    """Apply a kendaraan change to the counters inside the caller's transaction.
+
+    Nothing is committed here, so the counter update lands atomically with
+    the caller's own ``db.session.commit()``.
+    """
+    record_availability_deltas(
+        accumulate_bike_change({}, old_stasiun_id, old_status, new_stasiun_id, new_status)
+    )
+
+
+def record_availability_deltas(deltas):
+    """Apply pre-aggregated {stasiun_id: (d_tersedia, d_total)} from a bulk UPDATE"""
+    for stasiun_id, (d_tersedia, d_total) in deltas.items():
+        _bump(stasiun_id, d_tersedia, d_total)
+
+
+def init_counter(stasiun_id):
+    """Create an empty counter row for a new station"""
+    db.session.add(KetersediaanStasiun(stasiun_id=stasiun_id, tersedia=0, total=0))
+
+
+def get_availability(stasiun_ids):
+    """Return {stasiun_id: (tersedia, total)} via primary key lookups on the counter table"""
+    if not stasiun_ids:
+        return {}
+    rows = db.session.query(
+        KetersediaanStasiun.stasiun_id,
+        KetersediaanStasiun.tersedia,
+        KetersediaanStasiun.total
+    ).filter(KetersediaanStasiun.stasiun_id.in_(stasiun_ids)).all()
+    return {stasiun_id: (tersedia, total) for stasiun_id, tersedia, total in rows}
+
+
+def reconcile_availability(fix=True):
+    """Recompute every counter from scratch and report the drift.
+
+    Returns a list of ``{'stasiun_id', 'expected', 'actual'}`` entries where
+    the stored counters disagreed with the fleet table. With ``fix=True`` the
+    counters are rewritten and committed.
+    """
+    from app.models.stasiun import Stasiun
+
+    expected = count_from_fleet()
+    stored = {
+        row.stasiun_id: row
+        for row in KetersediaanStasiun.query.all()
+    }
+
+    drift = []
+    for (stasiun_id,) in db.session.query(Stasiun.stasiun_id).all():
+        want = expected.get(stasiun_id, (0, 0))
+        row = stored.get(stasiun_id)
+        have = (row.tersedia, row.total) if row else None
+        if have == want:
+            continue
+
+        drift.append({
+            'stasiun_id': stasiun_id,
+            'expected': {'tersedia': want[0], 'total': want[1]},
+            'actual': {'tersedia': have[0], 'total': have[1]} if have else None
+        })
+        if fix:
+            if row is None:
+                db.session.add(KetersediaanStasiun(stasiun_id=stasiun_id, tersedia=want[0], total=want[1]))
+            else:
+                row.tersedia, row.total = want
+
+    if fix:
+        db.session.commit()
+    return drift
@@ -0,0 +1,81 @@
+import hashlib
+import threading
+import time
+
+from flask import current_app
+from sqlalchemy import event
+
+from app.models.layanan import Layanan
+
+
+class ServiceSnapshot:
+    """Read-only copy of an active Layanan row that is safe to share between requests"""
+
+    __slots__ = ('layanan_id', 'nama_layanan', 'deskripsi', 'biaya_dasar', 'status')
+
+    def __init__(self, layanan):
+        self.layanan_id = layanan.layanan_id
+        self.nama_layanan = layanan.nama_layanan
+        self.deskripsi = layanan.deskripsi
+        self.biaya_dasar = layanan.biaya_dasar
+        self.status = layanan.status
+
+
+class ServiceCatalog:
+    """Versioned process cache of the active service catalog.
+
+    One load serves both the GET /api/layanan body and the price lookups
+    of app.utils.pricing.attach_services. The ETag is a hash of the response
+    body, so every worker hands out the same tag for the same
+    catalog. Local changes invalidate it through ORM events; changes made
+    by other workers are picked up after ``ttl`` seconds.
+    """
+
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self._services = {}
+        self._body = None
+        self._etag = None
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        self._loaded_at = None
+
+    def is_stale(self):
+        if self._loaded_at is None:
+            return True
+        return self.ttl is not None and time.monotonic() - self._loaded_at > self.ttl
+
+    def ensure_fresh(self):
+        if not self.is_stale():
+            return
+        with self._lock:
+            if not self.is_stale():
+                return
+            rows = Layanan.query.filter_by(status=True).order_by(Layanan.layanan_id).all()
+            body = current_app.json.dumps({'success': True, 'data': [l.to_dict() for l in rows]}).encode()
+            self._services = {l.layanan_id: ServiceSnapshot(l) for l in rows}
+            self._body = body
+            self._etag = hashlib.sha1(body).hexdigest()
+            self._loaded_at = time.monotonic()
+
+    def response_parts(self):
+        """``(body_bytes, etag)`` for the catalog listing"""
+        self.ensure_fresh()
+        return self._body, self._etag
+
+    def get(self, layanan_id):
+        """ServiceSnapshot of an active service, or None"""
+        self.ensure_fresh()
+        return self._services.get(layanan_id)
+
+
+service_catalog = ServiceCatalog()
+
+
+@event.listens_for(Layanan, 'after_insert')
+@event.listens_for(Layanan, 'after_update')
+@event.listens_for(Layanan, 'after_delete')
+def _invalidate_catalog(mapper, connection, target):
+    service_catalog.invalidate()
@@ -0,0 +1,114 @@
+import math
+import threading
+import time
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = 111.32
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance between two coordinates in kilometers"""
+    phi1 = math.radians(lat1)
+    phi2 = math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lng2 - lng1)
+
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class StationIndex:
+    """In-process grid index over active station coordinates.
+
+    Stations are bucketed into square cells of ``cell_size`` degrees, so a
+    radius query only has to look at the handful of cells overlapping the
+    search circle instead of every station. The index is rebuilt lazily from
+    the database after ``invalidate()`` or once ``ttl`` seconds have passed,
+    which keeps other worker processes eventually consistent.
+    """
+
+    def __init__(self, cell_size=0.01, ttl=300):
+        self.cell_size = cell_size
+        self.ttl = ttl
+        # (cells, stations) swapped as one reference so readers never mix builds
+        self._index = ({}, {})
+        self._built_at = None
+        self._lock = threading.Lock()
+
+    def _cell(self, lat, lng):
+        return (int(math.floor(lat / self.cell_size)), int(math.floor(lng / self.cell_size)))
+
+    def invalidate(self):
+        """Force a rebuild on the next query"""
+        self._built_at = None
+
+    def is_stale(self):
+        if self._built_at is None:
+            return True
+        return self.ttl is not None and time.monotonic() - self._built_at > self.ttl
+
+    def build(self, stations):
+        """Replace the index contents with the given Stasiun rows"""
+        cells = {}
+        snapshot = {}
+        for stasiun in stations:
+            if stasiun.latitude is None or stasiun.longtitude is None:
+                continue
+            lat = float(stasiun.latitude)
+            lng = float(stasiun.longtitude)
+            snapshot[stasiun.stasiun_id] = (lat, lng, stasiun.to_dict())
+            cells.setdefault(self._cell(lat, lng), []).append(stasiun.stasiun_id)
+
+        self._index = (cells, snapshot)
+        self._built_at = time.monotonic()
+
+    def ensure_fresh(self):
+        if not self.is_stale():
+            return
+        with self._lock:
+            if not self.is_stale():
+                return
+            from app.models.stasiun import Stasiun
+            self.build(Stasiun.query.filter_by(status='Aktif').all())
+
+    def __len__(self):
+        return len(self._index[1])
+
+    def nearby(self, lat, lng, radius_km, limit=None):
+        """Return ``(distance_km, station_dict)`` pairs within radius, nearest first"""
+        self.ensure_fresh()
+        cells, stations = self._index
+
+        dlat = radius_km / KM_PER_DEGREE_LAT
+        cos_lat = max(math.cos(math.radians(lat)), 1e-6)
+        dlng = min(radius_km / (KM_PER_DEGREE_LAT * cos_lat), 180.0)
+
+        lat_lo, lng_lo = self._cell(lat - dlat, lng - dlng)
+        lat_hi, lng_hi = self._cell(lat + dlat, lng + dlng)
+        n_cells = (lat_hi - lat_lo + 1) * (lng_hi - lng_lo + 1)
+
+        # A huge radius touches more cells than there are stations, scan instead
+        if n_cells > len(cells):
+            candidates = stations.keys()
+        else:
+            candidates = []
+            for ci in range(lat_lo, lat_hi + 1):
+                for cj in range(lng_lo, lng_hi + 1):
+                    bucket = cells.get((ci, cj))
+                    if bucket:
+                        candidates.extend(bucket)
+
+        results = []
+        for stasiun_id in candidates:
+            s_lat, s_lng, data = stations[stasiun_id]
+            distance = haversine_km(lat, lng, s_lat, s_lng)
+            if distance <= radius_km:
+                results.append((distance, data))
+
+        results.sort(key=lambda item: item[0])
+        if limit is not None:
+            results = results[:limit]
+        return results
+
+
+station_index = StationIndex()
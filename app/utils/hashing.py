@@ -0,0 +1,188 @@
+import os
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from flask import current_app
+from werkzeug.security import generate_password_hash, check_password_hash, DEFAULT_PBKDF2_ITERATIONS
+
+
+class HashingBusy(Exception):
+    """Raised when the hashing pool queue is full; callers should answer 503"""
+
+
+def _generate(password, method):
+    return generate_password_hash(password, method=method)
+
+
+def _verify(pwhash, password):
+    return check_password_hash(pwhash, password)
+
+
+class HashingPool:
+    """Bounded executor for CPU-bound password hashing.
+
+    At most ``workers + max_queue`` jobs may be pending. Past that, submit()
+    raises HashingBusy right away instead of letting requests pile up behind
+    the hashing work. The executor is created lazily so each forked worker
+    process gets its own.
+    """
+
+    def __init__(self, workers=None, max_queue=32, kind='thread'):
+        self.workers = workers or os.cpu_count() or 2
+        self.max_queue = max_queue
+        self.kind = kind
+        self._executor = None
+        self._slots = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def configure(self, workers=None, max_queue=None, kind=None):
+        with self._lock:
+            self.shutdown()
+            if workers:
+                self.workers = workers
+            if max_queue is not None:
+                self.max_queue = max_queue
+            if kind:
+                self.kind = kind
+
+    def _ensure_executor(self):
+        if self._executor is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._executor is not None and self._pid == os.getpid():
+                return
+            executor_class = ProcessPoolExecutor if self.kind == 'process' else ThreadPoolExecutor
+            self._executor = executor_class(max_workers=self.workers)
+            self._slots = threading.BoundedSemaphore(self.workers + self.max_queue)
+            self._pid = os.getpid()
+
+    def submit(self, fn, *args):
+        self._ensure_executor()
+        if not self._slots.acquire(blocking=False):
+            raise HashingBusy('Password hashing queue is full')
+        try:
+            future = self._executor.submit(fn, *args)
+        except Exception:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def map(self, fn, *iterables, chunksize=1):
+        """Unbounded bulk map for offline jobs (CLI imports), not request paths"""
+        self._ensure_executor()
+        if self.kind == 'process':
+            return self._executor.map(fn, *iterables, chunksize=chunksize)
+        return self._executor.map(fn, *iterables)
+
+    def run(self, fn, *args, timeout=None):
+        return self.submit(fn, *args).result(timeout=timeout)
+
+    def shutdown(self):
+        if self._executor is not None and self._pid == os.getpid():
+            self._executor.shutdown(wait=False)
+        self._executor = None
+        self._pid = None
+
+
+hashing_pool = HashingPool()
+
+
+def configure_hashing(app):
+    hashing_pool.configure(
+        workers=app.config['PASSWORD_HASH_WORKERS'],
+        max_queue=app.config['PASSWORD_HASH_MAX_QUEUE'],
+        kind=app.config['PASSWORD_HASH_EXECUTOR']
+    )
+
+
+def hash_method():
+    return current_app.config['PASSWORD_HASH_METHOD']
+
+
+def hash_password(password):
+    """Hash with the configured method on the pool (raises HashingBusy)"""
+    return hashing_pool.run(_generate, password, hash_method(),
+                            timeout=current_app.config['PASSWORD_HASH_TIMEOUT'])
+
+
+def hash_passwords(passwords, method=None):
+    """Hash many passwords on the pool, in input order.
+
+    At most one job per worker is in flight at a time, so logins can still
+    get a slot while a bulk import runs. Raises HashingBusy only if the pool
+    is full before this call has any job of its own to wait on.
+    """
+    method = method or hash_method()
+    pending = deque()
+    hashes = []
+    for password in passwords:
+        while True:
+            try:
+                pending.append(hashing_pool.submit(_generate, password, method))
+                break
+            except HashingBusy:
+                if not pending:
+                    raise
+                hashes.append(pending.popleft().result())
+        if len(pending) >= hashing_pool.workers:
+            hashes.append(pending.popleft().result())
+    hashes.extend(future.result() for future in pending)
+    return hashes
+
+
+def verify_password(pwhash, password):
+    """Verify on the pool (raises HashingBusy)"""
+    return hashing_pool.run(_verify, pwhash, password,
+                            timeout=current_app.config['PASSWORD_HASH_TIMEOUT'])
+
+
+def normalize_method(method):
+    """Spell a werkzeug method string out with its effective parameters, so
+    'scrypt' and 'scrypt:32768:8:1' compare equal"""
+    name, *args = method.split(':')
+    if name == 'scrypt':
+        n, r, p = args or (2 ** 15, 8, 1)
+        return f'scrypt:{int(n)}:{int(r)}:{int(p)}'
+    if name == 'pbkdf2':
+        hash_name = args[0] if args else 'sha256'
+        iterations = int(args[1]) if len(args) > 1 else DEFAULT_PBKDF2_ITERATIONS
+        return f'pbkdf2:{hash_name}:{iterations}'
+    return method
+
+
+def needs_rehash(pwhash):
+    """True if pwhash was produced with a different method or cost than configured"""
+    try:
+        return normalize_method(pwhash.split('$', 1)[0]) != normalize_method(hash_method())
+    except ValueError:
+        return True
+
+
+def benchmark(methods, seconds=1.0, password='benchmark-password'):
+    """Measure single-thread and pooled hashes per second for each method"""
+    import time
+
+    results = []
+    for method in methods:
+        count = 0
+        started = time.perf_counter()
+        while time.perf_counter() - started < seconds:
+            _generate(password, method)
+            count += 1
+        single = count / (time.perf_counter() - started)
+
+        batch = max(hashing_pool.workers, int(single * seconds * hashing_pool.workers) or 1)
+        started = time.perf_counter()
+        list(hashing_pool.map(_generate, [password] * batch, [method] * batch))
+        pooled = batch / (time.perf_counter() - started)
+
+        results.append({
+            'method': method,
+            'hashes_per_second': round(single, 1),
+            'pooled_hashes_per_second': round(pooled, 1),
+            'workers': hashing_pool.workers
+        })
+    return results
@@ -1,16 +1,23 @@
+import base64
+import json
+import math
+from datetime import datetime
 from functools import wraps
-from flask import jsonify
+from flask import jsonify, request
+from sqlalchemy import and_, or_
+from app import db
 from flask_jwt_extended import get_jwt_identity
-from app.models.user import User
+from app.utils.identity import current_role
 
 def admin_required(f):
-    """Decorator to require admin role for accessing endpoints"""
+    """Decorator to require admin role for accessing endpoints.
+
+    The role comes from the JWT claims, so no User query is made. Apply it
+    below ``@jwt_required()``.
+    """
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        current_user_nrp = get_jwt_identity()
-        user = User.query.filter_by(nrp=current_user_nrp).first()
-        
-        if not user or user.role != 'admin':
+        if current_role() != 'admin':
             return jsonify({'message': 'Admin access required'}), 403
         
         return f(*args, **kwargs)
@@ -19,9 +26,20 @@ def admin_required(f):
 def user_owns_resource(resource_user_nrp):
     """Check if current user owns the resource"""
     current_user_nrp = get_jwt_identity()
-    user = User.query.filter_by(nrp=current_user_nrp).first()
     
-    return user.role == 'admin' or current_user_nrp == resource_user_nrp
+    return current_role() == 'admin' or current_user_nrp == resource_user_nrp
+
+def upsert_insert(model):
+    """INSERT for the current dialect with ``on_conflict_do_nothing`` /
+    ``on_conflict_do_update`` (PostgreSQL and SQLite)"""
+    dialect = db.engine.dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise NotImplementedError(f'No upsert support for {dialect}')
+    return insert(model)
 
 def generate_response(message, data=None, status_code=200):
     """Generate standardized API response"""
@@ -61,4 +79,121 @@ def paginate_query(query, page=1, per_page=20):
         'per_page': per_page,
         'has_next': paginated.has_next,
         'has_prev': paginated.has_prev
-    }
\ No newline at end of file
+    }
+
+def encode_cursor(values):
+    """Encode keyset values (dict) into an opaque, URL-safe cursor string"""
+    raw = json.dumps(values, separators=(',', ':'), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by encode_cursor, raising ValueError if malformed"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception:
+        raise ValueError('Invalid cursor')
+    if not isinstance(values, dict):
+        raise ValueError('Invalid cursor')
+    return values
+
+def keyset_after(columns, values, descending=True):
+    """Build the WHERE clause selecting rows strictly after ``values`` in keyset order.
+
+    ``columns`` and ``values`` are parallel lists, e.g. ``[Transaksi.waktu_mulai,
+    Transaksi.transaksi_id]`` and the last row's values; the query must be
+    ordered by the same columns in the same direction.
+    """
+    clauses = []
+    for i, column in enumerate(columns):
+        equal_prefix = [columns[j] == values[j] for j in range(i)]
+        beyond = column < values[i] if descending else column > values[i]
+        clauses.append(and_(*equal_prefix, beyond))
+    return or_(*clauses)
+
+
+def _cursor_value(column, value):
+    """Convert one decoded cursor value to the column's Python type, raising
+    ValueError if it does not match (JSON keeps datetimes as ISO strings)"""
+    try:
+        expected = column.type.python_type
+    except NotImplementedError:
+        return value
+    if expected is datetime:
+        if not isinstance(value, str):
+            raise ValueError('Invalid cursor')
+        return datetime.fromisoformat(value)
+    if isinstance(value, bool) and expected is not bool:
+        raise ValueError('Invalid cursor')
+    if expected is float and isinstance(value, int):
+        return float(value)
+    if not isinstance(value, expected):
+        raise ValueError('Invalid cursor')
+    return value
+
+
+MAX_PER_PAGE = 100
+
+def estimate_count(query):
+    """Row estimate from the PostgreSQL planner; exact COUNT(*) on other databases"""
+    if db.engine.dialect.name != 'postgresql':
+        return query.order_by(None).count()
+    connection = db.session.connection()
+    compiled = query.order_by(None).statement.compile(dialect=connection.dialect)
+    plan = connection.exec_driver_sql('EXPLAIN (FORMAT JSON) ' + str(compiled), compiled.params).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+def paginate_keyset(query, columns, key, descending=False):
+    """Cursor-based replacement for ``query.paginate()`` on listing endpoints.
+
+    Rows are ordered by ``columns`` (the last one must be unique, usually the
+    primary key) and ``key(row)`` returns the matching values for a row. Pass
+    ``next_cursor`` back as ``?cursor=`` to get the next page; ``?page=`` still
+    works with OFFSET for old clients. The COUNT(*) only runs when asked for
+    with ``?count=exact`` (or ``?count=estimate`` for the planner estimate),
+    otherwise ``total`` and ``pages`` are null.
+
+    Key columns must not be NULL (wrap nullable ones in ``coalesce``).
+    Raises ValueError for a malformed cursor or one whose values do not match
+    the column types.
+    """
+    per_page = min(max(request.args.get('per_page', 20, type=int), 1), MAX_PER_PAGE)
+    page = request.args.get('page', type=int)
+    cursor = request.args.get('cursor')
+    count_mode = request.args.get('count')
+
+    total = None
+    if count_mode == 'exact':
+        total = query.order_by(None).count()
+    elif count_mode == 'estimate':
+        total = estimate_count(query)
+
+    ordered = query.order_by(*[column.desc() if descending else column.asc() for column in columns])
+    if cursor:
+        values = decode_cursor(cursor).get('k')
+        if not isinstance(values, list) or len(values) != len(columns):
+            raise ValueError('Invalid cursor')
+        values = [_cursor_value(column, value) for column, value in zip(columns, values)]
+        ordered = ordered.filter(keyset_after(columns, values, descending=descending))
+    elif page and page > 1:
+        ordered = ordered.offset((page - 1) * per_page)
+
+    rows = ordered.limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+
+    return {
+        'items': rows,
+        'total': total,
+        'pages': math.ceil(total / per_page) if total is not None else None,
+        'current_page': None if cursor else (page or 1),
+        'per_page': per_page,
+        'next_cursor': encode_cursor({'k': list(key(rows[-1]))}) if has_more else None,
+        'has_more': has_more
+    }
+
+def page_meta(paged):
+    """Response keys shared by every paginated listing"""
+    return {name: paged[name] for name in ('total', 'pages', 'current_page', 'next_cursor', 'has_more')}
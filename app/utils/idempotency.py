@@ -0,0 +1,176 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from functools import wraps
+
+from flask import current_app, jsonify, make_response, request, Response
+from flask_jwt_extended import get_jwt_identity
+
+IDEMPOTENCY_HEADER = 'Idempotency-Key'
+REPLAY_HEADER = 'Idempotent-Replayed'
+
+_IN_FLIGHT = object()
+
+
+class IdempotencyStore:
+    """Bounded in-memory LRU of stored responses with a TTL.
+
+    Entries are ``(request_hash, status_code, mimetype, body)`` tuples. A key
+    being processed right now holds an in-flight marker so a concurrent retry
+    gets a 409 instead of running the write a second time.
+    """
+
+    def __init__(self, max_entries=10000, ttl=86400):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _expired(self, stored_at):
+        return time.monotonic() - stored_at > self.ttl
+
+    def get(self, key):
+        with self._lock:
+            item = self._entries.get(key)
+            if item is None:
+                return None
+            value, stored_at = item
+            if self._expired(stored_at):
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def begin(self, key):
+        """Mark key as in flight; returns False if it already exists"""
+        with self._lock:
+            item = self._entries.get(key)
+            if item is not None and not self._expired(item[1]):
+                return False
+            self._set(key, _IN_FLIGHT)
+            return True
+
+    def put(self, key, value):
+        with self._lock:
+            self._set(key, value)
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def _set(self, key, value):
+        self._entries[key] = (value, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+idempotency_store = IdempotencyStore()
+
+
+def _load_from_db(key):
+    from app.models.idempotency import IdempotencyKey
+
+    ttl = current_app.config['IDEMPOTENCY_TTL']
+    row = IdempotencyKey.query.filter(
+        IdempotencyKey.key == key,
+        IdempotencyKey.created_at >= datetime.utcnow() - timedelta(seconds=ttl)
+    ).first()
+    if row is None:
+        return None
+    return (row.request_hash, row.status_code, row.mimetype, row.body)
+
+
+def _save_to_db(key, value):
+    from app import db
+    from app.models.idempotency import IdempotencyKey
+
+    request_hash, status_code, mimetype, body = value
+    try:
+        db.session.merge(IdempotencyKey(
+            key=key,
+            request_hash=request_hash,
+            status_code=status_code,
+            mimetype=mimetype,
+            body=body,
+            created_at=datetime.utcnow()
+        ))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+
+
+def _replay(value):
+    _, status_code, mimetype, body = value
+    response = Response(body, status=status_code, mimetype=mimetype)
+    response.headers[REPLAY_HEADER] = 'true'
+    return response
+
+
+def purge_expired_keys():
+    """Delete DB-backed idempotency keys older than IDEMPOTENCY_TTL"""
+    from app import db
+    from app.models.idempotency import IdempotencyKey
+
+    cutoff = datetime.utcnow() - timedelta(seconds=current_app.config['IDEMPOTENCY_TTL'])
+    deleted = IdempotencyKey.query.filter(IdempotencyKey.created_at < cutoff).delete(synchronize_session=False)
+    db.session.commit()
+    return deleted
+
+
+def idempotent(f):
+    """Replay the stored response when a request repeats its Idempotency-Key.
+
+    Keys are scoped to the JWT identity and endpoint, so must be applied
+    below ``@jwt_required()``. Requests without the header run normally.
+    Server errors (5xx) are not stored so the client can retry them.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        client_key = request.headers.get(IDEMPOTENCY_HEADER)
+        if not client_key:
+            return f(*args, **kwargs)
+        if len(client_key) > 128:
+            return jsonify({'error': f'{IDEMPOTENCY_HEADER} must be at most 128 characters'}), 400
+
+        key = f'{get_jwt_identity()}:{request.endpoint}:{client_key}'
+        request_hash = hashlib.sha256(request.get_data()).hexdigest()
+        use_db = current_app.config.get('IDEMPOTENCY_DB_BACKED', False)
+
+        stored = idempotency_store.get(key)
+        if stored is None and use_db:
+            stored = _load_from_db(key)
+            if stored is not None:
+                idempotency_store.put(key, stored)
+
+        if stored is _IN_FLIGHT:
+            return jsonify({'error': 'A request with this Idempotency-Key is still being processed'}), 409
+        if stored is not None:
+            if stored[0] != request_hash:
+                return jsonify({'error': f'{IDEMPOTENCY_HEADER} was already used with a different request body'}), 422
+            return _replay(stored)
+
+        if not idempotency_store.begin(key):
+            return jsonify({'error': 'A request with this Idempotency-Key is still being processed'}), 409
+
+        try:
+            response = make_response(f(*args, **kwargs))
+        except Exception:
+            idempotency_store.discard(key)
+            raise
+
+        if response.status_code >= 500 or response.is_streamed:
+            idempotency_store.discard(key)
+            return response
+
+        value = (request_hash, response.status_code, response.mimetype, response.get_data())
+        idempotency_store.put(key, value)
+        if use_db:
+            _save_to_db(key, value)
+        return response
+    return decorated_function
@@ -0,0 +1,112 @@
+import threading
+import time
+
+from flask import g
+from flask_jwt_extended import get_jwt, get_jwt_identity
+from sqlalchemy import event
+
+from app.models.user import User
+
+
+class UserSnapshot:
+    """Read-only copy of a User row that is safe to share between requests"""
+
+    __slots__ = ('nrp', 'nama', 'email', 'no_hp', 'role', 'created_at')
+
+    def __init__(self, user):
+        self.nrp = user.nrp
+        self.nama = user.nama
+        self.email = user.email
+        self.no_hp = user.no_hp
+        self.role = user.role
+        self.created_at = user.created_at
+
+    def to_dict(self):
+        return {
+            'nrp': self.nrp,
+            'nama': self.nama,
+            'email': self.email,
+            'no_hp': self.no_hp,
+            'role': self.role,
+            'created_at': self.created_at.isoformat() if self.created_at else None
+        }
+
+
+class UserCache:
+    """Short-TTL process cache of UserSnapshot keyed by nrp"""
+
+    def __init__(self, ttl=60, max_entries=10000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, nrp):
+        item = self._entries.get(nrp)
+        if item is None:
+            return None
+        snapshot, stored_at = item
+        if time.monotonic() - stored_at > self.ttl:
+            self.invalidate(nrp)
+            return None
+        return snapshot
+
+    def put(self, snapshot):
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._entries.clear()
+            self._entries[snapshot.nrp] = (snapshot, time.monotonic())
+
+    def invalidate(self, nrp=None):
+        with self._lock:
+            if nrp is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(nrp, None)
+
+
+user_cache = UserCache()
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _invalidate_changed_user(mapper, connection, target):
+    user_cache.invalidate(target.nrp)
+
+
+def load_user(nrp):
+    """Return the UserSnapshot for nrp, from request scope, process cache or DB"""
+    cached = getattr(g, '_identity_users', None)
+    if cached is None:
+        cached = g._identity_users = {}
+    if nrp in cached:
+        return cached[nrp]
+
+    snapshot = user_cache.get(nrp)
+    if snapshot is None:
+        user = User.query.filter_by(nrp=nrp).first()
+        if user is not None:
+            snapshot = UserSnapshot(user)
+            user_cache.put(snapshot)
+
+    cached[nrp] = snapshot
+    return snapshot
+
+
+def current_user():
+    """UserSnapshot of the JWT identity, or None if the user no longer exists"""
+    return load_user(get_jwt_identity())
+
+
+def current_role():
+    """Role of the JWT identity, read from the token claims when present"""
+    role = get_jwt().get('role')
+    if role is not None:
+        return role
+    # Tokens issued before roles were added to the claims
+    user = current_user()
+    return user.role if user else None
+
+
+def configure_identity(app):
+    user_cache.ttl = app.config['USER_CACHE_TTL']
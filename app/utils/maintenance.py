@@ -0,0 +1,185 @@
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+from flask import current_app
+from sqlalchemy import func, select, case, delete
+
+from app import db
+from app.models.kendaraan import Kendaraan, LogLaporan
+from app.models.transaksi import Transaksi
+from app.models.pemeliharaan import PrioritasPemeliharaan
+from app.utils.helpers import upsert_insert
+
+logger = logging.getLogger(__name__)
+
+SCORE_COLUMNS = ('skor', 'laporan_terbuka', 'laporan_tertua', 'perjalanan_terakhir', 'pemeliharaan_terakhir', 'updated_at')
+
+
+def _is_open(closed_statuses):
+    return func.lower(func.coalesce(LogLaporan.status, '')).notin_([s.lower() for s in closed_statuses])
+
+
+def score(signals, weights, now, max_idle_days):
+    """Weighted sum of one bike's maintenance signals"""
+    oldest = signals['laporan_tertua']
+    open_age_days = (now - oldest).total_seconds() / 86400 if oldest else 0.0
+    since = signals['pemeliharaan_terakhir'] or signals['created_at']
+    idle_days = min((now - since).total_seconds() / 86400, max_idle_days) if since else max_idle_days
+    return (
+        weights.get('laporan_terbuka', 0) * signals['laporan_terbuka']
+        + weights.get('umur_laporan_hari', 0) * max(open_age_days, 0.0)
+        + weights.get('perjalanan', 0) * signals['perjalanan_terakhir']
+        + weights.get('hari_sejak_pemeliharaan', 0) * max(idle_days, 0.0)
+    )
+
+
+def compute_priorities(kendaraan_ids=None, now=None):
+    """Score bikes from one aggregate query over kendaraan, log_laporan and transaksi.
+
+    Returns a list of row dicts ready for PrioritasPemeliharaan. With
+    ``kendaraan_ids`` only those bikes are scored.
+    """
+    config = current_app.config
+    now = now or datetime.utcnow()
+    is_open = _is_open(config['MAINTENANCE_CLOSED_STATUSES'])
+
+    laporan = select(
+        LogLaporan.kendaraan_id.label('kendaraan_id'),
+        func.count(case((is_open, LogLaporan.log_laporan_id))).label('laporan_terbuka'),
+        func.min(case((is_open, LogLaporan.tanggal_laporan))).label('laporan_tertua'),
+        func.max(LogLaporan.tanggal_pemeliharaan).label('pemeliharaan_terakhir')
+    ).group_by(LogLaporan.kendaraan_id)
+
+    rides = select(
+        Transaksi.kendaraan_id.label('kendaraan_id'),
+        func.count(Transaksi.transaksi_id).label('perjalanan_terakhir')
+    ).where(
+        Transaksi.waktu_mulai >= now - timedelta(days=config['MAINTENANCE_RIDE_WINDOW_DAYS'])
+    ).group_by(Transaksi.kendaraan_id)
+
+    if kendaraan_ids is not None:
+        laporan = laporan.where(LogLaporan.kendaraan_id.in_(kendaraan_ids))
+        rides = rides.where(Transaksi.kendaraan_id.in_(kendaraan_ids))
+    laporan = laporan.subquery()
+    rides = rides.subquery()
+
+    query = select(
+        Kendaraan.kendaraan_id,
+        Kendaraan.created_at,
+        func.coalesce(laporan.c.laporan_terbuka, 0),
+        laporan.c.laporan_tertua,
+        laporan.c.pemeliharaan_terakhir,
+        func.coalesce(rides.c.perjalanan_terakhir, 0)
+    ).outerjoin(laporan, laporan.c.kendaraan_id == Kendaraan.kendaraan_id) \
+     .outerjoin(rides, rides.c.kendaraan_id == Kendaraan.kendaraan_id)
+    if kendaraan_ids is not None:
+        query = query.where(Kendaraan.kendaraan_id.in_(kendaraan_ids))
+
+    weights = config['MAINTENANCE_WEIGHTS']
+    max_idle_days = config['MAINTENANCE_MAX_IDLE_DAYS']
+    rows = []
+    for kendaraan_id, created_at, open_count, oldest, last_maintenance, ride_count in db.session.execute(query):
+        signals = {
+            'kendaraan_id': kendaraan_id,
+            'laporan_terbuka': open_count,
+            'laporan_tertua': oldest,
+            'perjalanan_terakhir': ride_count,
+            'pemeliharaan_terakhir': last_maintenance,
+            'created_at': created_at
+        }
+        signals['skor'] = round(score(signals, weights, now, max_idle_days), 4)
+        signals['updated_at'] = now
+        del signals['created_at']
+        rows.append(signals)
+    return rows
+
+
+def _upsert(rows):
+    """Insert or overwrite queue rows; safe when another transaction writes the same bikes"""
+    stmt = upsert_insert(PrioritasPemeliharaan)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['kendaraan_id'],
+        set_={name: stmt.excluded[name] for name in SCORE_COLUMNS}
+    )
+    db.session.execute(stmt, rows)
+
+
+def refresh_priorities(kendaraan_ids):
+    """Rescore a few bikes inside the caller's transaction (nothing is committed)"""
+    kendaraan_ids = [kendaraan_id for kendaraan_id in set(kendaraan_ids) if kendaraan_id is not None]
+    if not kendaraan_ids:
+        return
+    rows = compute_priorities(kendaraan_ids)
+    if rows:
+        _upsert(rows)
+
+
+def forget_priorities(kendaraan_ids):
+    """Drop queue rows of deleted bikes (for databases without ON DELETE CASCADE)"""
+    if kendaraan_ids:
+        db.session.execute(
+            delete(PrioritasPemeliharaan)
+            .where(PrioritasPemeliharaan.kendaraan_id.in_(list(kendaraan_ids)))
+            .execution_options(synchronize_session=False)
+        )
+
+
+def rebuild_priorities(batch_size=5000):
+    """Recompute the whole queue in one aggregate pass and write it in one transaction.
+
+    Ride counts and ages drift with time, so run this periodically
+    (``flask rebuild-maintenance-queue`` or MAINTENANCE_REBUILD_INTERVAL);
+    individual bikes are also rescored when they are created or their
+    reports change. Returns are left alone to keep that path short.
+    """
+    started = time.perf_counter()
+    rows = compute_priorities()
+    for start in range(0, len(rows), batch_size):
+        _upsert(rows[start:start + batch_size])
+    # Rows of bikes deleted without forget_priorities()
+    db.session.execute(
+        delete(PrioritasPemeliharaan)
+        .where(PrioritasPemeliharaan.kendaraan_id.notin_(select(Kendaraan.kendaraan_id)))
+        .execution_options(synchronize_session=False)
+    )
+    db.session.commit()
+    return {'kendaraan': len(rows), 'elapsed_seconds': round(time.perf_counter() - started, 3)}
+
+
+def top_priorities(limit=20, status=None, stasiun_id=None):
+    """Highest scores first, read from the skor index with LIMIT"""
+    query = db.session.query(PrioritasPemeliharaan, Kendaraan).join(
+        Kendaraan, Kendaraan.kendaraan_id == PrioritasPemeliharaan.kendaraan_id
+    )
+    if status is not None:
+        query = query.filter(Kendaraan.status == status)
+    if stasiun_id is not None:
+        query = query.filter(Kendaraan.stasiun_id == stasiun_id)
+    return query.order_by(
+        PrioritasPemeliharaan.skor.desc(), PrioritasPemeliharaan.kendaraan_id
+    ).limit(limit).all()
+
+
+def start_maintenance_job(app):
+    """Run rebuild_priorities every MAINTENANCE_REBUILD_INTERVAL seconds in a daemon thread"""
+    interval = app.config.get('MAINTENANCE_REBUILD_INTERVAL')
+    if not interval:
+        return None
+
+    def loop():
+        while True:
+            time.sleep(interval)
+            with app.app_context():
+                try:
+                    rebuild_priorities()
+                except Exception as e:
+                    logger.error(f"Maintenance queue rebuild failed: {str(e)}")
+                    db.session.rollback()
+                finally:
+                    db.session.remove()
+
+    thread = threading.Thread(target=loop, name='maintenance-queue', daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,163 @@
+import csv
+import io
+import json
+import time
+
+from flask import current_app
+from sqlalchemy import func, insert, or_, select
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models.user import User
+from app.utils.hashing import hash_passwords
+
+REQUIRED_FIELDS = ('nrp', 'nama', 'email', 'password')
+ALLOWED_ROLES = ('user', 'admin')
+
+
+def parse_rows(stream, fmt):
+    """Yield dict rows from a text stream of CSV (with header) or NDJSON"""
+    if fmt == 'csv':
+        yield from csv.DictReader(stream)
+        return
+
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = {'_error': 'Invalid JSON line'}
+        if not isinstance(row, dict):
+            row = {'_error': 'Each line must be a JSON object'}
+        yield {key: str(value) if value is not None else None for key, value in row.items()}
+
+
+def _chunks(rows, size):
+    chunk = []
+    for index, row in enumerate(rows, start=1):
+        chunk.append((index, row))
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _validate(row, seen_nrp, seen_email):
+    if '_error' in row:
+        return row['_error']
+    missing = [field for field in REQUIRED_FIELDS if not (row.get(field) or '').strip()]
+    if missing:
+        return f'Missing required fields: {", ".join(missing)}'
+    if (row.get('role') or 'user') not in ALLOWED_ROLES:
+        return f'role must be one of {", ".join(ALLOWED_ROLES)}'
+    if row['nrp'].strip() in seen_nrp:
+        return 'Duplicate NRP in import'
+    if row['email'].strip().lower() in seen_email:
+        return 'Duplicate email in import'
+    return None
+
+
+def _insert_rows(rows, errors):
+    """Insert user rows with one executemany INSERT and commit. If a row
+    collides with one created concurrently, retry row by row and report the
+    rejected ones as errors. Returns the number inserted."""
+    try:
+        db.session.execute(insert(User), [values for _, values in rows])
+        db.session.commit()
+        return len(rows)
+    except IntegrityError:
+        db.session.rollback()
+
+    inserted = 0
+    for index, values in rows:
+        try:
+            with db.session.begin_nested():
+                db.session.execute(insert(User), [values])
+            inserted += 1
+        except IntegrityError:
+            errors.append({'row': index, 'nrp': values['nrp'], 'error': 'NRP or email already exists'})
+    db.session.commit()
+    return inserted
+
+
+def import_users(rows, chunk_size=1000):
+    """Create users from an iterable of dict rows in bulk.
+
+    Per chunk: one query checks the chunk's nrp/email values against the
+    table, passwords are hashed on the shared hashing pool, and the new users
+    are inserted with one executemany INSERT and committed. Returns a report
+    with the number created and a per-row error list (1-based row numbers).
+    """
+    started = time.perf_counter()
+    method = current_app.config.get('BULK_IMPORT_HASH_METHOD') or current_app.config['PASSWORD_HASH_METHOD']
+
+    created = 0
+    errors = []
+    seen_nrp = set()
+    seen_email = set()
+
+    for chunk in _chunks(rows, chunk_size):
+        candidates = []
+        for index, row in chunk:
+            error = _validate(row, seen_nrp, seen_email)
+            if error:
+                errors.append({'row': index, 'nrp': row.get('nrp'), 'error': error})
+                continue
+            nrp = row['nrp'].strip()
+            email = row['email'].strip()
+            seen_nrp.add(nrp)
+            seen_email.add(email.lower())
+            candidates.append((index, nrp, email, row))
+
+        if not candidates:
+            continue
+
+        existing = db.session.execute(
+            select(User.nrp, User.email).where(or_(
+                User.nrp.in_([nrp for _, nrp, _, _ in candidates]),
+                func.lower(User.email).in_([email.lower() for _, _, email, _ in candidates])
+            ))
+        ).all()
+        existing_nrp = {nrp for nrp, _ in existing}
+        existing_email = {email.lower() for _, email in existing}
+
+        new_users = []
+        for index, nrp, email, row in candidates:
+            if nrp in existing_nrp:
+                errors.append({'row': index, 'nrp': nrp, 'error': 'NRP already exists'})
+            elif email.lower() in existing_email:
+                errors.append({'row': index, 'nrp': nrp, 'error': 'Email already exists'})
+            else:
+                new_users.append((index, nrp, email, row))
+
+        if not new_users:
+            continue
+
+        hashes = hash_passwords([row['password'] for _, _, _, row in new_users], method)
+        created += _insert_rows([
+            (index, {
+                'nrp': nrp,
+                'nama': row['nama'].strip(),
+                'email': email,
+                'password': pwhash,
+                'no_hp': row.get('no_hp') or None,
+                'role': row.get('role') or 'user'
+            })
+            for (index, nrp, email, row), pwhash in zip(new_users, hashes)
+        ], errors)
+
+    errors.sort(key=lambda error: error['row'])
+    return {
+        'created': created,
+        'failed': len(errors),
+        'errors': errors,
+        'elapsed_seconds': round(time.perf_counter() - started, 3)
+    }
+
+
+def import_users_from_stream(binary_stream, fmt, chunk_size=1000):
+    text = io.TextIOWrapper(binary_stream, encoding='utf-8-sig', newline='')
+    return import_users(parse_rows(text, fmt), chunk_size=chunk_size)
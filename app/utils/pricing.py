@@ -0,0 +1,406 @@
+import bisect
+import threading
+from datetime import datetime, timedelta
+from decimal import Decimal, ROUND_HALF_UP
+
+from flask import current_app
+from sqlalchemy import select, insert, update, bindparam, func, Numeric
+
+from app import db
+from app.models.transaksi import Transaksi
+from app.models.kendaraan import Kendaraan
+from app.models.layanan import Layanan, TransaksiLayanan
+from app.utils.catalog import service_catalog
+
+CENT = Decimal('0.01')
+MINUTES_PER_DAY = 24 * 60
+
+# Used when Config.TARIFFS is not set; reproduces the original flat rule
+# max(5000, duration_hours * 5000) for every kendaraan tipe.
+DEFAULT_TARIFFS = {
+    'default': {
+        'rate_per_hour': '5000',
+        'minimum': '5000',
+        'cap': None,
+        'bands': [],
+        'service_surcharges': {},
+    }
+}
+
+
+def to_decimal(value):
+    """Convert floats, ints, strings and None into Decimal without float noise"""
+    if value is None:
+        return Decimal('0')
+    if isinstance(value, Decimal):
+        return value
+    return Decimal(str(value))
+
+
+def _parse_minutes(hhmm):
+    hours, minutes = hhmm.split(':')
+    return int(hours) * 60 + int(minutes)
+
+
+class Tariff:
+    """A compiled tariff: Decimal amounts and a gap-free list of day bands"""
+
+    def __init__(self, name, rate_per_hour, minimum=None, cap=None, bands=None, service_surcharges=None):
+        self.name = name
+        self.rate_per_hour = to_decimal(rate_per_hour)
+        self.minimum = to_decimal(minimum) if minimum is not None else None
+        self.cap = to_decimal(cap) if cap is not None else None
+        self.service_surcharges = {
+            int(layanan_id): to_decimal(amount)
+            for layanan_id, amount in (service_surcharges or {}).items()
+        }
+        self._compile_bands(bands or [])
+
+    def _compile_bands(self, bands):
+        # Split bands that wrap past midnight, then fill gaps with multiplier 1
+        spans = []
+        for band in bands:
+            start = _parse_minutes(band['start'])
+            end = _parse_minutes(band['end'])
+            multiplier = to_decimal(band.get('multiplier', 1))
+            if end <= start:
+                spans.append((start, MINUTES_PER_DAY, multiplier))
+                spans.append((0, end, multiplier))
+            else:
+                spans.append((start, end, multiplier))
+        spans = sorted(s for s in spans if s[1] > s[0])
+
+        compiled = []
+        cursor = 0
+        for start, end, multiplier in spans:
+            if start < cursor:
+                raise ValueError(f"Tariff '{self.name}' has overlapping time bands")
+            if start > cursor:
+                compiled.append((cursor, start, Decimal('1')))
+            compiled.append((start, end, multiplier))
+            cursor = end
+        if cursor < MINUTES_PER_DAY:
+            compiled.append((cursor, MINUTES_PER_DAY, Decimal('1')))
+
+        self.bands = compiled
+        self._band_starts = [start for start, _, _ in compiled]
+        self._flat = all(multiplier == 1 for _, _, multiplier in compiled)
+        # Weighted hours in one full day, used to skip whole days at once
+        self._day_weight = sum(
+            (Decimal(end - start) / 60) * multiplier for start, end, multiplier in compiled
+        )
+
+    def weighted_hours(self, start, end):
+        """Ride duration in hours, each slice scaled by its band multiplier"""
+        if end <= start:
+            return Decimal('0')
+        if self._flat:
+            return to_decimal((end - start).total_seconds()) / 3600
+
+        total = Decimal('0')
+        full_days = (end - start).days
+        if full_days:
+            total += self._day_weight * full_days
+            start = start + timedelta(days=full_days)
+
+        cursor = start
+        while cursor < end:
+            midnight = cursor.replace(hour=0, minute=0, second=0, microsecond=0)
+            minute_of_day = (cursor - midnight).total_seconds() / 60
+            index = bisect.bisect_right(self._band_starts, minute_of_day) - 1
+            _, band_end, multiplier = self.bands[index]
+            segment_end = min(end, midnight + timedelta(minutes=band_end))
+            total += to_decimal((segment_end - cursor).total_seconds()) / 3600 * multiplier
+            cursor = segment_end
+        return total
+
+    def price_ride(self, start, end):
+        cost = self.weighted_hours(start, end) * self.rate_per_hour
+        if self.minimum is not None:
+            cost = max(self.minimum, cost)
+        if self.cap is not None:
+            cost = min(self.cap, cost)
+        return cost.quantize(CENT, rounding=ROUND_HALF_UP)
+
+    def price_service(self, layanan_id, biaya_dasar):
+        cost = to_decimal(biaya_dasar) + self.service_surcharges.get(layanan_id, Decimal('0'))
+        return cost.quantize(CENT, rounding=ROUND_HALF_UP)
+
+
+class PricingEngine:
+    """Tariff tables keyed by Kendaraan.tipe, compiled once from config"""
+
+    def __init__(self, tables):
+        if 'default' not in tables:
+            raise ValueError("Tariff tables must define a 'default' tariff")
+        self.tariffs = {name: Tariff(name, **spec) for name, spec in tables.items()}
+
+    def tariff_for(self, tipe):
+        return self.tariffs.get(tipe) or self.tariffs['default']
+
+    def price_ride(self, tipe, waktu_mulai, waktu_selesai=None):
+        return self.tariff_for(tipe).price_ride(waktu_mulai, waktu_selesai or datetime.utcnow())
+
+    def price_service(self, tipe, layanan_id, biaya_dasar):
+        return self.tariff_for(tipe).price_service(layanan_id, biaya_dasar)
+
+    def price_batch(self, rides):
+        """Price many rides in one call.
+
+        ``rides`` yields ``(tipe, waktu_mulai, waktu_selesai, services)`` where
+        services is a list of ``(layanan_id, biaya_dasar)``. Returns a list of
+        ``(ride_cost, service_cost, total)`` Decimal triples in the same order.
+        """
+        results = []
+        for tipe, waktu_mulai, waktu_selesai, services in rides:
+            tariff = self.tariff_for(tipe)
+            ride_cost = tariff.price_ride(waktu_mulai, waktu_selesai)
+            service_cost = sum(
+                (tariff.price_service(layanan_id, biaya) for layanan_id, biaya in services),
+                Decimal('0.00')
+            )
+            results.append((ride_cost, service_cost, ride_cost + service_cost))
+        return results
+
+
+_engine_lock = threading.Lock()
+_engine_cache = {}
+
+
+def get_pricing_engine():
+    """Return the engine for the current app's TARIFFS, compiling it once"""
+    tables = current_app.config.get('TARIFFS') or DEFAULT_TARIFFS
+    key = id(tables)
+    engine = _engine_cache.get(key)
+    if engine is None:
+        with _engine_lock:
+            engine = _engine_cache.get(key)
+            if engine is None:
+                engine = PricingEngine(tables)
+                _engine_cache[key] = engine
+    return engine
+
+
+def reset_pricing_engine():
+    """Drop compiled tariffs, e.g. after editing TARIFFS at runtime"""
+    _engine_cache.clear()
+
+
+def total_from_line_items(biaya_sewa=None):
+    """SQL expression for a transaksi total: the ride charge plus the SUM of
+    its TransaksiLayanan.harga lines, correlated to the transaksi row.
+
+    ``biaya_sewa`` overrides the stored ride charge, e.g. with a bindparam
+    when the same statement also writes it.
+    """
+    services = select(func.coalesce(func.sum(TransaksiLayanan.harga), 0)).where(
+        TransaksiLayanan.transaksi_id == Transaksi.transaksi_id
+    ).scalar_subquery()
+    if biaya_sewa is None:
+        biaya_sewa = func.coalesce(Transaksi.biaya_sewa, 0)
+    return biaya_sewa + services
+
+
+def recompute_totals(transaksi_ids=None, lower=None, upper=None, dry_run=False):
+    """Rewrite total_biaya from the line items with one set-based UPDATE.
+
+    Limited to ``transaksi_ids`` and/or the id range ``lower < id <= upper``;
+    rows whose total is already right are not touched. Returns the number of
+    totals that changed (or would change with ``dry_run``). Does not commit.
+    """
+    total = total_from_line_items()
+    conditions = [Transaksi.total_biaya.is_distinct_from(total)]
+    if transaksi_ids is not None:
+        conditions.append(Transaksi.transaksi_id.in_(transaksi_ids))
+    if lower is not None:
+        conditions.append(Transaksi.transaksi_id > lower)
+    if upper is not None:
+        conditions.append(Transaksi.transaksi_id <= upper)
+
+    if dry_run:
+        return db.session.execute(select(func.count()).select_from(Transaksi).where(*conditions)).scalar()
+    return db.session.execute(
+        update(Transaksi).where(*conditions).values(total_biaya=total)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+
+class UnknownServices(ValueError):
+    """Some requested layanan_ids do not exist or are not active"""
+
+    def __init__(self, missing):
+        super().__init__(f"Service(s) not found or not active: {', '.join(map(str, missing))}")
+        self.missing = missing
+
+
+def attach_services(transaksi, layanan_ids):
+    """Add one priced line per id in ``layanan_ids`` to ``transaksi``.
+
+    The ids are looked up in the cached service catalog; if any is not an
+    active service UnknownServices is raised and nothing is written. Each
+    line's harga is priced from the catalog snapshot's biaya_dasar. Lines are
+    inserted with one executemany INSERT and the total is recomputed once.
+    The caller should hold the transaksi row lock and commits. Returns the
+    ServiceSnapshot rows in request order.
+    """
+    services = {layanan_id: service_catalog.get(layanan_id) for layanan_id in set(layanan_ids)}
+    missing = sorted(layanan_id for layanan_id, snapshot in services.items() if snapshot is None)
+    if missing:
+        raise UnknownServices(missing)
+
+    engine = get_pricing_engine()
+    tipe = transaksi.kendaraan.tipe if transaksi.kendaraan else None
+    db.session.execute(insert(TransaksiLayanan), [
+        {
+            'transaksi_id': transaksi.transaksi_id,
+            'layanan_id': layanan_id,
+            'harga': engine.price_service(tipe, layanan_id, services[layanan_id].biaya_dasar)
+        }
+        for layanan_id in layanan_ids
+    ])
+    recompute_totals([transaksi.transaksi_id])
+    return [services[layanan_id] for layanan_id in layanan_ids]
+
+
+def repair_line_items(batch_size=5000, dry_run=False):
+    """Backfill line items of historical transactions, then recompute every total.
+
+    Service lines created before price snapshots existed get the current
+    catalog price of their service; finished rides without a ride charge are
+    priced with the current tariffs. Totals are then rebuilt from the line
+    items in id-range batches with one aggregate UPDATE each, committing per
+    batch. Returns a report dict.
+    """
+    engine = get_pricing_engine()
+    report = {'service_lines_priced': 0, 'rides_priced': 0, 'totals_changed': 0}
+
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            select(TransaksiLayanan.transaksi_layanan_id, TransaksiLayanan.layanan_id,
+                   Layanan.biaya_dasar, Kendaraan.tipe)
+            .join(Layanan, TransaksiLayanan.layanan_id == Layanan.layanan_id)
+            .join(Transaksi, TransaksiLayanan.transaksi_id == Transaksi.transaksi_id)
+            .outerjoin(Kendaraan, Transaksi.kendaraan_id == Kendaraan.kendaraan_id)
+            .where(TransaksiLayanan.harga.is_(None), TransaksiLayanan.transaksi_layanan_id > last_id)
+            .order_by(TransaksiLayanan.transaksi_layanan_id).limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].transaksi_layanan_id
+        report['service_lines_priced'] += len(rows)
+        if not dry_run:
+            table = TransaksiLayanan.__table__
+            db.session.execute(
+                update(table).where(table.c.transaksi_layanan_id == bindparam('lid'))
+                .values(harga=bindparam('harga')),
+                [
+                    {'lid': row.transaksi_layanan_id,
+                     'harga': engine.price_service(row.tipe, row.layanan_id, row.biaya_dasar)}
+                    for row in rows
+                ]
+            )
+            db.session.commit()
+
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            select(Transaksi.transaksi_id, Transaksi.waktu_mulai, Transaksi.waktu_selesai, Kendaraan.tipe)
+            .outerjoin(Kendaraan, Transaksi.kendaraan_id == Kendaraan.kendaraan_id)
+            .where(
+                Transaksi.biaya_sewa.is_(None),
+                Transaksi.waktu_selesai.isnot(None),
+                Transaksi.transaksi_id > last_id
+            ).order_by(Transaksi.transaksi_id).limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        last_id = rows[-1].transaksi_id
+        report['rides_priced'] += len(rows)
+        if not dry_run:
+            table = Transaksi.__table__
+            db.session.execute(
+                update(table).where(table.c.transaksi_id == bindparam('tid'))
+                .values(biaya_sewa=bindparam('sewa')),
+                [
+                    {'tid': row.transaksi_id, 'sewa': engine.price_ride(row.tipe, row.waktu_mulai, row.waktu_selesai)}
+                    for row in rows
+                ]
+            )
+            db.session.commit()
+
+    max_id = db.session.execute(select(func.max(Transaksi.transaksi_id))).scalar() or 0
+    for lower in range(0, max_id, batch_size):
+        report['totals_changed'] += recompute_totals(lower=lower, upper=lower + batch_size, dry_run=dry_run)
+        if not dry_run:
+            db.session.commit()
+
+    return report
+
+
+def reprice_transactions(since=None, until=None, batch_size=5000, dry_run=False):
+    """Recompute the ride charge of finished transactions with the current tariffs.
+
+    Rows are read in keyset batches with plain column queries (no ORM
+    objects). Service lines keep the price snapshot taken when they were
+    added; each batch writes the new ride charges and the totals derived from
+    the line items with a single executemany UPDATE. Returns the number of
+    rows whose total changed.
+    """
+    engine = get_pricing_engine()
+    changed = 0
+    last_id = 0
+
+    while True:
+        query = select(
+            Transaksi.transaksi_id,
+            Kendaraan.tipe,
+            Transaksi.waktu_mulai,
+            Transaksi.waktu_selesai,
+            Transaksi.total_biaya
+        ).outerjoin(
+            Kendaraan, Transaksi.kendaraan_id == Kendaraan.kendaraan_id
+        ).where(
+            Transaksi.status_transaksi == 'SELESAI',
+            Transaksi.waktu_selesai.isnot(None),
+            Transaksi.transaksi_id > last_id
+        ).order_by(Transaksi.transaksi_id).limit(batch_size)
+
+        if since is not None:
+            query = query.where(Transaksi.waktu_mulai >= since)
+        if until is not None:
+            query = query.where(Transaksi.waktu_mulai < until)
+
+        rows = db.session.execute(query).all()
+        if not rows:
+            break
+        last_id = rows[-1].transaksi_id
+
+        service_totals = dict(db.session.execute(
+            select(TransaksiLayanan.transaksi_id, func.sum(TransaksiLayanan.harga))
+            .where(TransaksiLayanan.transaksi_id.between(rows[0].transaksi_id, last_id))
+            .group_by(TransaksiLayanan.transaksi_id)
+        ).all())
+
+        updates = []
+        for row in rows:
+            ride_cost = engine.price_ride(row.tipe, row.waktu_mulai, row.waktu_selesai)
+            total = ride_cost + to_decimal(service_totals.get(row.transaksi_id))
+            if row.total_biaya is None or to_decimal(row.total_biaya) != total:
+                updates.append({'tid': row.transaksi_id, 'sewa': ride_cost})
+        changed += len(updates)
+
+        if updates and not dry_run:
+            table = Transaksi.__table__
+            db.session.execute(
+                update(table)
+                .where(table.c.transaksi_id == bindparam('tid'))
+                .values(
+                    biaya_sewa=bindparam('sewa'),
+                    total_biaya=total_from_line_items(bindparam('sewa', type_=Numeric(10, 2)))
+                ),
+                updates
+            )
+            db.session.commit()
+
+    return changed
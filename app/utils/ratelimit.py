@@ -0,0 +1,167 @@
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+
+import jwt as pyjwt
+from flask import current_app, jsonify, request
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+
+def parse_limit(spec):
+    """'10/minute' -> (capacity, refill tokens per second)"""
+    amount, _, period = spec.partition('/')
+    period = period.strip().rstrip('s')
+    if period not in PERIODS:
+        raise ValueError(f"Invalid rate limit '{spec}', use e.g. '10/minute'")
+    capacity = int(amount)
+    return capacity, capacity / PERIODS[period]
+
+
+class MemoryBackend:
+    """Per-process token buckets in a bounded LRU"""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key, capacity, rate):
+        """Take one token; returns seconds to wait (0 when allowed)"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                wait = 0.0
+            else:
+                self._buckets[key] = (tokens, now)
+                wait = (1 - tokens) / rate
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+class RedisBackend:
+    """Token buckets shared by every worker, updated atomically in Redis"""
+
+    SCRIPT = """
+    local capacity = tonumber(ARGV[1])
+    local rate = tonumber(ARGV[2])
+    local now = tonumber(ARGV[3])
+    local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+    local tokens = tonumber(bucket[1]) or capacity
+    local updated = tonumber(bucket[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+    local wait = 0
+    if tokens >= 1 then
+        tokens = tokens - 1
+    else
+        wait = (1 - tokens) / rate
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'updated', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+    return tostring(wait)
+    """
+
+    def __init__(self, url, timeout=0.1):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError('RATELIMIT_STORAGE_URL points at Redis but the redis package is not installed')
+        self._errors = redis.RedisError
+        self._client = redis.Redis.from_url(url, socket_timeout=timeout, socket_connect_timeout=timeout)
+        self._script = self._client.register_script(self.SCRIPT)
+        self._warned_at = None
+
+    def consume(self, key, capacity, rate):
+        try:
+            return float(self._script(keys=[f'ratelimit:{key}'], args=[capacity, rate, time.time()]))
+        except self._errors as e:
+            # Fail open: an unreachable Redis must not take the API down with it
+            now = time.monotonic()
+            if self._warned_at is None or now - self._warned_at > 60:
+                logger.warning(f"Rate limit storage unavailable, allowing requests: {str(e)}")
+                self._warned_at = now
+            return 0.0
+
+
+class RateLimiter:
+    """Admission control for configured endpoints, run before the view"""
+
+    def __init__(self):
+        self.backend = MemoryBackend()
+        self.limits = {}
+
+    def configure(self, limits, storage_url=None, storage_timeout=0.1):
+        self.limits = {
+            endpoint: {scope: parse_limit(spec) for scope, spec in scopes.items()}
+            for endpoint, scopes in (limits or {}).items()
+        }
+        self.backend = RedisBackend(storage_url, storage_timeout) if storage_url else MemoryBackend()
+
+    def _identity(self):
+        """Identity claim of the bearer token, read WITHOUT verifying it.
+
+        Admission control must not cost a blocklist lookup, so the token is
+        only decoded here; the view still verifies it. A forged claim just
+        moves the caller into another per-user bucket, and per_ip still
+        applies.
+        """
+        header_type = current_app.config['JWT_HEADER_TYPE']
+        parts = request.headers.get(current_app.config['JWT_HEADER_NAME'], '').split()
+        if header_type:
+            if len(parts) != 2 or parts[0] != header_type:
+                return None
+            token = parts[1]
+        elif len(parts) == 1:
+            token = parts[0]
+        else:
+            return None
+        try:
+            claims = pyjwt.decode(token, options={'verify_signature': False})
+        except pyjwt.InvalidTokenError:
+            return None
+        identity = claims.get(current_app.config['JWT_IDENTITY_CLAIM'])
+        return identity if isinstance(identity, (str, int)) else None
+
+    def check(self):
+        scopes = self.limits.get(request.endpoint)
+        if not scopes or request.method == 'OPTIONS':
+            return None
+
+        wait = 0.0
+        if 'per_ip' in scopes:
+            capacity, rate = scopes['per_ip']
+            wait = max(wait, self.backend.consume(f'{request.endpoint}:ip:{request.remote_addr}', capacity, rate))
+        if 'per_user' in scopes:
+            nrp = self._identity()
+            if nrp is not None:
+                capacity, rate = scopes['per_user']
+                wait = max(wait, self.backend.consume(f'{request.endpoint}:user:{nrp}', capacity, rate))
+
+        if wait > 0:
+            response = jsonify({'message': 'Too many requests, please slow down'})
+            response.headers['Retry-After'] = str(max(1, math.ceil(wait)))
+            return response, 429
+        return None
+
+
+rate_limiter = RateLimiter()
+
+
+def configure_rate_limits(app):
+    if not app.config.get('RATELIMIT_ENABLED', True):
+        return
+    rate_limiter.configure(
+        app.config.get('RATELIMITS'),
+        app.config.get('RATELIMIT_STORAGE_URL'),
+        app.config.get('RATELIMIT_STORAGE_TIMEOUT', 0.1)
+    )
+    app.before_request(rate_limiter.check)
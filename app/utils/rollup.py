@@ -0,0 +1,166 @@
+import logging
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import select, insert, delete, extract, func, literal, union_all
+
+from app import db
+from app.models.transaksi import Transaksi
+from app.models.kendaraan import Kendaraan
+from app.models.rekap import RekapHarian, RekapWatermark
+from app.models.arsip import TransaksiArsip
+
+logger = logging.getLogger(__name__)
+
+WATERMARK = 'rekap_harian'
+FINISHED_STATUSES = ('SELESAI', 'OVERDUE')
+
+
+def _minutes(start, end):
+    """Ride length in minutes as a SQL expression"""
+    if db.engine.dialect.name == 'postgresql':
+        return extract('epoch', end - start) / 60
+    return (func.julianday(end) - func.julianday(start)) * 24 * 60
+
+
+def _as_date(value):
+    # date() comes back as text on SQLite
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+
+def ride_source():
+    """Finished rides the rollup is computed from, hot and archived, as a
+    subquery with waktu_mulai, waktu_selesai, stasiun_ambil_id, kendaraan_id,
+    total_biaya and biaya_sewa columns"""
+    return union_all(*(
+        select(
+            model.waktu_mulai, model.waktu_selesai, model.stasiun_ambil_id,
+            model.kendaraan_id, model.total_biaya, model.biaya_sewa
+        ).where(
+            model.status_transaksi.in_(FINISHED_STATUSES),
+            model.waktu_selesai.isnot(None)
+        )
+        for model in (Transaksi, TransaksiArsip)
+    )).subquery()
+
+
+def rebuild_days(days, chunk_size=31):
+    """Recompute the rollup rows of the given days from the rides.
+
+    Each chunk of days is replaced with one DELETE and one INSERT ... SELECT
+    ... GROUP BY, restricted to the waktu_mulai range of the chunk so the
+    index is used. Does not commit. Returns the number of rollup rows written.
+    """
+    days = sorted(set(days))
+    written = 0
+    rides = ride_source()
+    day = func.date(rides.c.waktu_mulai)
+    # Ride revenue is the ride charge; rows without one count entirely as ride revenue
+    service_revenue = func.coalesce(rides.c.total_biaya, 0) - func.coalesce(rides.c.biaya_sewa, rides.c.total_biaya, 0)
+
+    for start in range(0, len(days), chunk_size):
+        chunk = days[start:start + chunk_size]
+        db.session.execute(delete(RekapHarian).where(RekapHarian.tanggal.in_(chunk)))
+
+        grouped = select(
+            day,
+            func.coalesce(rides.c.stasiun_ambil_id, 0),
+            func.coalesce(Kendaraan.tipe, ''),
+            func.count(),
+            func.coalesce(func.sum(_minutes(rides.c.waktu_mulai, rides.c.waktu_selesai)), 0),
+            func.coalesce(func.sum(rides.c.total_biaya), 0),
+            func.coalesce(func.sum(service_revenue), 0),
+            literal(datetime.utcnow())
+        ).select_from(rides).outerjoin(
+            Kendaraan, rides.c.kendaraan_id == Kendaraan.kendaraan_id
+        ).where(
+            rides.c.waktu_mulai >= datetime.combine(chunk[0], datetime.min.time()),
+            rides.c.waktu_mulai < datetime.combine(chunk[-1] + timedelta(days=1), datetime.min.time()),
+            day.in_(chunk)
+        ).group_by(
+            day, func.coalesce(rides.c.stasiun_ambil_id, 0), func.coalesce(Kendaraan.tipe, '')
+        )
+
+        result = db.session.execute(
+            insert(RekapHarian).from_select(
+                ['tanggal', 'stasiun_id', 'tipe', 'jumlah_perjalanan', 'total_menit',
+                 'pendapatan', 'pendapatan_layanan', 'updated_at'],
+                grouped
+            )
+        )
+        written += result.rowcount
+    return written
+
+
+def get_watermark():
+    return db.session.get(RekapWatermark, WATERMARK)
+
+
+def refresh_rollups(full=False, lag_seconds=120, now=None):
+    """Bring rekap_harian up to date with transaksi.
+
+    Only days that have a transaksi changed since the watermark are rebuilt.
+    The new watermark trails ``now`` by ``lag_seconds`` so rows updated just
+    before a slow commit are picked up by the next run. ``full`` rebuilds
+    every day. Commits and returns a report dict.
+    """
+    started = time.perf_counter()
+    high = (now or datetime.utcnow()) - timedelta(seconds=lag_seconds)
+    mark = get_watermark()
+    low = None if full or mark is None else mark.nilai
+
+    changed = select(func.date(Transaksi.waktu_mulai)).where(
+        Transaksi.waktu_diperbarui <= high,
+        Transaksi.waktu_mulai.isnot(None)
+    ).distinct()
+    if low is not None:
+        changed = changed.where(Transaksi.waktu_diperbarui > low)
+    else:
+        # Archived rows never change, but a full build must cover their days too
+        changed = changed.union(
+            select(func.date(TransaksiArsip.waktu_mulai)).where(TransaksiArsip.waktu_mulai.isnot(None))
+        )
+    days = {_as_date(value) for value in db.session.execute(changed).scalars()}
+
+    if full:
+        db.session.execute(delete(RekapHarian))
+    written = rebuild_days(days)
+
+    if mark is None:
+        db.session.add(RekapWatermark(nama=WATERMARK, nilai=high))
+    else:
+        mark.nilai = high
+    db.session.commit()
+
+    return {
+        'days_rebuilt': len(days),
+        'rows_written': written,
+        'watermark': high.isoformat(),
+        'elapsed_seconds': round(time.perf_counter() - started, 3)
+    }
+
+
+def start_rollup_job(app):
+    """Run refresh_rollups every ROLLUP_INTERVAL seconds in a daemon thread"""
+    interval = app.config.get('ROLLUP_INTERVAL')
+    if not interval:
+        return None
+
+    def loop():
+        while True:
+            time.sleep(interval)
+            with app.app_context():
+                try:
+                    report = refresh_rollups(lag_seconds=app.config['ROLLUP_LAG_SECONDS'])
+                    if report['days_rebuilt']:
+                        logger.info(f"Rollup job: {report}")
+                except Exception as e:
+                    logger.error(f"Rollup job failed: {str(e)}")
+                    db.session.rollback()
+                finally:
+                    db.session.remove()
+
+    thread = threading.Thread(target=loop, name='rollup-job', daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,184 @@
+import math
+import re
+import threading
+import time
+
+from sqlalchemy import func, literal_column
+
+from app import db
+from app.models.kendaraan import LogLaporan, laporan_tsvector
+
+# 'simple' keeps words as typed (lowercased, no stemming); PostgreSQL has no
+# Indonesian dictionary and "rem blong" must match literally anyway
+TS_CONFIG = 'simple'
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(text):
+    """Lowercased word tokens, matching what to_tsvector('simple', ...) produces"""
+    return TOKEN_RE.findall(text.lower()) if text else []
+
+
+def ts_config():
+    return literal_column(f"'{TS_CONFIG}'::regconfig")
+
+
+class LaporanIndex:
+    """In-process inverted index over LogLaporan.laporan.
+
+    Fallback for databases without full-text search (SQLite in tests and
+    local runs). Postings map each term to ``{log_laporan_id: term_count}``
+    and ``_docs`` keeps each report's length and terms for cheap removal.
+    Routes keep it current with ``add()``/``remove()`` after committing; it is
+    rebuilt from the database on first use or once ``ttl`` seconds have
+    passed, so other worker processes catch up eventually.
+    """
+
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self._postings = {}
+        self._docs = {}
+        self._built_at = None
+        self._lock = threading.RLock()
+
+    def invalidate(self):
+        self._built_at = None
+
+    def is_stale(self):
+        if self._built_at is None:
+            return True
+        return self.ttl is not None and time.monotonic() - self._built_at > self.ttl
+
+    def build(self, rows):
+        """Replace the index contents with ``(log_laporan_id, laporan)`` pairs"""
+        with self._lock:
+            self._postings = {}
+            self._docs = {}
+            for log_laporan_id, laporan in rows:
+                self._add(log_laporan_id, laporan)
+            self._built_at = time.monotonic()
+
+    def ensure_fresh(self):
+        if not self.is_stale():
+            return
+        with self._lock:
+            if not self.is_stale():
+                return
+            rows = db.session.query(LogLaporan.log_laporan_id, LogLaporan.laporan).yield_per(1000)
+            self.build(rows)
+
+    def _add(self, log_laporan_id, laporan):
+        tokens = tokenize(laporan)
+        counts = {}
+        for token in tokens:
+            counts[token] = counts.get(token, 0) + 1
+        for token, count in counts.items():
+            self._postings.setdefault(token, {})[log_laporan_id] = count
+        self._docs[log_laporan_id] = (len(tokens), tuple(counts))
+
+    def _remove(self, log_laporan_id):
+        doc = self._docs.pop(log_laporan_id, None)
+        if doc is None:
+            return
+        for token in doc[1]:
+            postings = self._postings[token]
+            del postings[log_laporan_id]
+            if not postings:
+                del self._postings[token]
+
+    def add(self, log_laporan_id, laporan):
+        """Index a created or updated report, replacing its previous text"""
+        if self._built_at is None:
+            return  # the next search builds from the database anyway
+        with self._lock:
+            self._remove(log_laporan_id)
+            self._add(log_laporan_id, laporan)
+
+    def remove(self, log_laporan_id):
+        if self._built_at is None:
+            return
+        with self._lock:
+            self._remove(log_laporan_id)
+
+    def search(self, query):
+        """Return ``[(log_laporan_id, score)]`` for reports containing every query term.
+
+        Scored with tf-idf normalised by report length, best first and newest
+        first on ties.
+        """
+        terms = set(tokenize(query))
+        if not terms:
+            return []
+        self.ensure_fresh()
+        with self._lock:
+            postings = [self._postings.get(term) for term in terms]
+            if not all(postings):
+                return []
+            postings.sort(key=len)
+            matches = set(postings[0]).intersection(*postings[1:])
+            n_docs = len(self._docs)
+            scores = []
+            for log_laporan_id in matches:
+                score = sum(
+                    (p[log_laporan_id] / self._docs[log_laporan_id][0]) * math.log(1 + n_docs / len(p))
+                    for p in postings
+                )
+                scores.append((log_laporan_id, score))
+        scores.sort(key=lambda item: (-item[1], -item[0]))
+        return scores
+
+
+laporan_index = LaporanIndex()
+
+
+def uses_postgres_fts():
+    return db.engine.dialect.name == 'postgresql'
+
+
+def search_laporan(query, status=None, kendaraan_id=None, page=1, per_page=20):
+    """Ranked full-text search over reports.
+
+    Returns ``(rows, has_more)`` where rows are ``(LogLaporan, score)`` pairs
+    for the requested page. On PostgreSQL this is one query using the GIN
+    index; elsewhere the in-process LaporanIndex ranks the matches.
+    """
+    offset = (page - 1) * per_page
+
+    if uses_postgres_fts():
+        tsquery = func.plainto_tsquery(ts_config(), query)
+        rank = func.ts_rank(laporan_tsvector(LogLaporan.laporan), tsquery).label('score')
+        q = db.session.query(LogLaporan, rank).filter(laporan_tsvector(LogLaporan.laporan).op('@@')(tsquery))
+        if status:
+            q = q.filter(LogLaporan.status == status)
+        if kendaraan_id:
+            q = q.filter(LogLaporan.kendaraan_id == kendaraan_id)
+        rows = q.order_by(rank.desc(), LogLaporan.log_laporan_id.desc()) \
+            .offset(offset).limit(per_page + 1).all()
+        return [(log, float(score)) for log, score in rows[:per_page]], len(rows) > per_page
+
+    ranked = laporan_index.search(query)
+    if status or kendaraan_id:
+        # Filters are applied in the database, in chunks to keep IN lists short
+        allowed = set()
+        ids = [log_laporan_id for log_laporan_id, _ in ranked]
+        for start in range(0, len(ids), 1000):
+            q = db.session.query(LogLaporan.log_laporan_id).filter(
+                LogLaporan.log_laporan_id.in_(ids[start:start + 1000])
+            )
+            if status:
+                q = q.filter(LogLaporan.status == status)
+            if kendaraan_id:
+                q = q.filter(LogLaporan.kendaraan_id == kendaraan_id)
+            allowed.update(log_laporan_id for log_laporan_id, in q)
+        ranked = [item for item in ranked if item[0] in allowed]
+
+    window = ranked[offset:offset + per_page + 1]
+    page_items = window[:per_page]
+    logs = {
+        log.log_laporan_id: log
+        for log in LogLaporan.query.filter(
+            LogLaporan.log_laporan_id.in_([log_laporan_id for log_laporan_id, _ in page_items])
+        )
+    } if page_items else {}
+    rows = [(logs[log_laporan_id], score) for log_laporan_id, score in page_items if log_laporan_id in logs]
+    return rows, len(window) > per_page
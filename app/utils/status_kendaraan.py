@@ -0,0 +1,57 @@
+from app.models.kendaraan import StatusKendaraan
+
+S = StatusKendaraan
+
+# Legal status moves. DISEWA is entered only through the rent flow and left
+# through return (TERSEDIA) or the overdue sweeper (KARANTINA/TERSEDIA).
+TRANSITIONS = {
+    S.TERSEDIA: {S.DISEWA, S.KARANTINA, S.RUSAK, S.PERBAIKAN},
+    S.DISEWA: {S.TERSEDIA, S.KARANTINA, S.RUSAK},
+    S.KARANTINA: {S.TERSEDIA, S.RUSAK, S.PERBAIKAN},
+    S.RUSAK: {S.PERBAIKAN, S.KARANTINA},
+    S.PERBAIKAN: {S.TERSEDIA, S.RUSAK},
+}
+
+# Targets an admin may set directly through the kendaraan endpoints
+MANUAL_TARGETS = {S.TERSEDIA, S.KARANTINA, S.RUSAK, S.PERBAIKAN}
+
+
+class IllegalTransition(ValueError):
+    """Raised when a status change is not allowed by TRANSITIONS"""
+
+
+def parse_status(value):
+    """StatusKendaraan for any accepted spelling; raises ValueError otherwise"""
+    return StatusKendaraan.parse(value)
+
+
+def check_transition(old, new, manual=False):
+    """Return the parsed target status or raise IllegalTransition.
+
+    ``manual=True`` is for changes made by admins rather than by the
+    rent/return flow: targets are limited to MANUAL_TARGETS and a rented
+    bike cannot be changed at all.
+    """
+    new = parse_status(new)
+    if old is None:
+        if manual and new not in MANUAL_TARGETS:
+            raise IllegalTransition(f'A new vehicle cannot start as {new.name}')
+        return new
+    old = parse_status(old)
+    if old == new:
+        return new
+    if manual and old == S.DISEWA:
+        raise IllegalTransition('Vehicle is rented; it changes status when the rental ends')
+    if new not in TRANSITIONS[old] or (manual and new not in MANUAL_TARGETS):
+        raise IllegalTransition(f'Cannot change status from {old.name} to {new.name}')
+    return new
+
+
+def check_move(status, old_stasiun_id, new_stasiun_id):
+    """Raise IllegalTransition if a rented bike would change station.
+
+    A rented bike's station is set by the return flow, so admins may not
+    move it while the rental is open.
+    """
+    if old_stasiun_id != new_stasiun_id and parse_status(status) == S.DISEWA:
+        raise IllegalTransition('Vehicle is rented; its station changes when the rental ends')
@@ -0,0 +1,145 @@
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update, bindparam
+
+from app import db
+from app.models.transaksi import Transaksi
+from app.models.kendaraan import Kendaraan, StatusKendaraan
+from app.utils.availability import record_availability_deltas
+from app.utils.pricing import get_pricing_engine, total_from_line_items
+
+logger = logging.getLogger(__name__)
+
+OVERDUE_STATUS = 'OVERDUE'
+BIKE_STATUS_BY_ACTION = {
+    'free': StatusKendaraan.TERSEDIA,
+    'quarantine': StatusKendaraan.KARANTINA,
+}
+
+
+def sweep_stale_rentals(max_hours, batch_size=1000, bike_action='quarantine', now=None):
+    """Close ONGOING rentals older than ``max_hours`` in bounded batches.
+
+    Each batch gets its ride charge from the tariff engine up to ``now`` and
+    is flagged as OVERDUE with one executemany UPDATE that also derives the
+    total from the service lines; its bikes are freed or quarantined with
+    one set-based UPDATE. Every batch commits on its own so
+    locks are held only briefly. Returns a small report dict.
+    """
+    if bike_action not in BIKE_STATUS_BY_ACTION:
+        raise ValueError(f"bike_action must be one of {', '.join(BIKE_STATUS_BY_ACTION)}")
+
+    started = time.perf_counter()
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(hours=max_hours)
+    new_bike_status = BIKE_STATUS_BY_ACTION[bike_action]
+    engine = get_pricing_engine()
+    transaksi_table = Transaksi.__table__
+
+    processed = 0
+    bikes_updated = 0
+    batches = 0
+
+    while True:
+        rows = db.session.execute(
+            select(
+                Transaksi.transaksi_id,
+                Transaksi.kendaraan_id,
+                Transaksi.waktu_mulai,
+                Kendaraan.tipe
+            ).outerjoin(
+                Kendaraan, Transaksi.kendaraan_id == Kendaraan.kendaraan_id
+            ).where(
+                Transaksi.status_transaksi == 'ONGOING',
+                Transaksi.waktu_mulai < cutoff
+            ).order_by(Transaksi.transaksi_id).limit(batch_size)
+            # Skip rows a concurrent return is holding; the next run gets them
+            .with_for_update(of=Transaksi, skip_locked=True)
+        ).all()
+        if not rows:
+            break
+        batches += 1
+
+        db.session.execute(
+            update(transaksi_table)
+            .where(transaksi_table.c.transaksi_id == bindparam('tid'))
+            .where(transaksi_table.c.status_transaksi == 'ONGOING')
+            .values(
+                status_transaksi=OVERDUE_STATUS,
+                waktu_selesai=now,
+                biaya_sewa=bindparam('sewa'),
+                # plus the service lines already on the rental
+                total_biaya=total_from_line_items(bindparam('sewa', type_=transaksi_table.c.biaya_sewa.type))
+            ),
+            [
+                {'tid': row.transaksi_id, 'sewa': engine.price_ride(row.tipe, row.waktu_mulai, now)}
+                for row in rows
+            ]
+        )
+
+        kendaraan_ids = [row.kendaraan_id for row in rows if row.kendaraan_id is not None]
+        if kendaraan_ids:
+            released = db.session.execute(
+                update(Kendaraan)
+                .where(Kendaraan.kendaraan_id.in_(kendaraan_ids))
+                .where(Kendaraan.status == StatusKendaraan.DISEWA)
+                .values(status=new_bike_status)
+                .returning(Kendaraan.stasiun_id)
+                .execution_options(synchronize_session=False)
+            ).all()
+            bikes_updated += len(released)
+
+            if bike_action == 'free':
+                deltas = {}
+                for (stasiun_id,) in released:
+                    if stasiun_id is not None:
+                        d_tersedia, _ = deltas.get(stasiun_id, (0, 0))
+                        deltas[stasiun_id] = (d_tersedia + 1, 0)
+                record_availability_deltas(deltas)
+
+        db.session.commit()
+        processed += len(rows)
+
+        if len(rows) < batch_size:
+            break
+
+    return {
+        'processed': processed,
+        'bikes_updated': bikes_updated,
+        'bike_action': bike_action,
+        'batches': batches,
+        'cutoff': cutoff.isoformat(),
+        'elapsed_seconds': round(time.perf_counter() - started, 3)
+    }
+
+
+def start_sweeper(app):
+    """Run sweep_stale_rentals every RENTAL_SWEEPER_INTERVAL seconds in a daemon thread"""
+    interval = app.config.get('RENTAL_SWEEPER_INTERVAL')
+    if not interval:
+        return None
+
+    def loop():
+        while True:
+            time.sleep(interval)
+            with app.app_context():
+                try:
+                    report = sweep_stale_rentals(
+                        app.config['RENTAL_MAX_DURATION_HOURS'],
+                        batch_size=app.config['RENTAL_SWEEPER_BATCH_SIZE'],
+                        bike_action=app.config['RENTAL_SWEEPER_BIKE_ACTION']
+                    )
+                    if report['processed']:
+                        logger.info(f"Rental sweeper: {report}")
+                except Exception as e:
+                    logger.error(f"Rental sweeper failed: {str(e)}")
+                    db.session.rollback()
+                finally:
+                    db.session.remove()
+
+    thread = threading.Thread(target=loop, name='rental-sweeper', daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,376 @@
+import atexit
+import json
+import logging
+import struct
+import threading
+import time
+from array import array
+from datetime import datetime
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.exc import DataError, IntegrityError
+
+from app import db
+from app.models.kendaraan import Kendaraan
+from app.models.telemetri import TelemetriKendaraan
+
+logger = logging.getLogger(__name__)
+
+# Compact binary frame: repeated little-endian records of kendaraan_id
+# (uint32), unix time in seconds (uint32), latitude and longitude (float32)
+# and battery percent (uint8, 255 = not reported); 17 bytes per ping
+FRAME = struct.Struct('<IIffB')
+NO_BATTERY = 255
+MAX_CLOCK_SKEW = 300  # seconds a ping may be ahead of the server clock
+
+
+def _is_int(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def _valid(kendaraan_id, ts, lat, lng, battery, now):
+    return (
+        _is_int(kendaraan_id) and 0 < kendaraan_id < 2 ** 63
+        and -90.0 <= lat <= 90.0 and -180.0 <= lng <= 180.0
+        and 0 < ts <= now + MAX_CLOCK_SKEW
+        and (battery is None or (_is_int(battery) and 0 <= battery <= 100))
+    )
+
+
+def _battery(value):
+    """Battery percent as an int (fractions rounded) or None; raises
+    TypeError for anything that is not a number"""
+    if value is None:
+        return None
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise TypeError('baterai must be a number')
+    return int(round(value))
+
+
+def parse_frames(data):
+    """Decode binary frames into ``(pings, rejected)``; pings are
+    ``(kendaraan_id, ts, lat, lng, battery)`` tuples"""
+    if len(data) % FRAME.size:
+        raise ValueError(f'Binary payload must be a multiple of {FRAME.size} bytes')
+    now = time.time()
+    pings = []
+    rejected = 0
+    for kendaraan_id, ts, lat, lng, battery in FRAME.iter_unpack(data):
+        battery = None if battery == NO_BATTERY else battery
+        if _valid(kendaraan_id, ts, lat, lng, battery, now):
+            # float32 carries ~1 m of precision; drop the conversion noise
+            pings.append((kendaraan_id, float(ts), round(lat, 6), round(lng, 6), battery))
+        else:
+            rejected += 1
+    return pings, rejected
+
+
+def parse_ndjson(data):
+    """Decode NDJSON lines like ``{"kendaraan_id": 7, "lat": -7.28, "lng": 112.79,
+    "ts": 1700000000, "baterai": 80}``; ``ts`` defaults to now"""
+    now = time.time()
+    pings = []
+    rejected = 0
+    for line in data.splitlines():
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+            ping = (
+                item['kendaraan_id'],
+                float(item.get('ts') or now),
+                float(item['lat']),
+                float(item['lng']),
+                _battery(item.get('baterai'))
+            )
+            valid = _valid(*ping, now)
+        except (ValueError, KeyError, TypeError, AttributeError, OverflowError):
+            valid = False
+        if valid:
+            pings.append(ping)
+        else:
+            rejected += 1
+    return pings, rejected
+
+
+class LatestPositions:
+    """Newest ping per kendaraan in parallel typed arrays.
+
+    ``_slots`` maps kendaraan_id to an index into the arrays, so a bike costs
+    a few dozen bytes instead of a dict per ping, and bounding-box reads scan
+    contiguous memory.
+    """
+
+    def __init__(self):
+        self._slots = {}
+        self._ids = array('q')
+        self._ts = array('d')
+        self._lat = array('d')
+        self._lng = array('d')
+        self._battery = array('h')
+        self._lock = threading.Lock()
+        self.warmed = False
+
+    def __len__(self):
+        return len(self._ids)
+
+    def update_many(self, pings):
+        """Keep each ping whose timestamp is newer than the stored one.
+
+        Values are converted to the array types before any array is touched,
+        so a ping that does not fit is skipped without leaving the parallel
+        arrays out of step. Returns the number of pings skipped.
+        """
+        skipped = 0
+        with self._lock:
+            slots = self._slots
+            for ping in pings:
+                try:
+                    kendaraan_id, ts, lat, lng, battery = ping
+                    kendaraan_id, ts, lat, lng = int(kendaraan_id), float(ts), float(lat), float(lng)
+                    battery = -1 if battery is None else int(battery)
+                    if not (-2 ** 63 <= kendaraan_id < 2 ** 63 and -1 <= battery <= 100):
+                        raise ValueError('Value out of range')
+                except (TypeError, ValueError, OverflowError):
+                    skipped += 1
+                    continue
+                slot = slots.get(kendaraan_id)
+                if slot is None:
+                    slots[kendaraan_id] = len(self._ids)
+                    self._ids.append(kendaraan_id)
+                    self._ts.append(ts)
+                    self._lat.append(lat)
+                    self._lng.append(lng)
+                    self._battery.append(battery)
+                elif ts > self._ts[slot]:
+                    self._ts[slot] = ts
+                    self._lat[slot] = lat
+                    self._lng[slot] = lng
+                    self._battery[slot] = battery
+        return skipped
+
+    def _to_dict(self, slot):
+        battery = self._battery[slot]
+        return {
+            'kendaraan_id': self._ids[slot],
+            'waktu': datetime.utcfromtimestamp(self._ts[slot]).isoformat(),
+            'latitude': self._lat[slot],
+            'longitude': self._lng[slot],
+            'baterai': None if battery < 0 else battery
+        }
+
+    def get(self, kendaraan_id):
+        # Readers take the lock too: update_many registers a slot before its
+        # values are appended, and changes a slot's fields one at a time
+        with self._lock:
+            slot = self._slots.get(kendaraan_id)
+            return None if slot is None else self._to_dict(slot)
+
+    def in_bbox(self, min_lat, min_lng, max_lat, max_lng, limit=None):
+        """Latest positions inside the box, most recent ping first"""
+        with self._lock:
+            lat, lng, ts = self._lat, self._lng, self._ts
+            hits = [
+                slot for slot in range(len(self._ids))
+                if min_lat <= lat[slot] <= max_lat and min_lng <= lng[slot] <= max_lng
+            ]
+            hits.sort(key=lambda slot: ts[slot], reverse=True)
+            if limit is not None:
+                hits = hits[:limit]
+            return [self._to_dict(slot) for slot in hits]
+
+
+class TelemetryIngest:
+    """Accepts ping batches, updates LatestPositions and buffers history.
+
+    History rows are written with multi-row INSERTs once ``flush_size`` rows
+    are pending, or every TELEMETRY_FLUSH_INTERVAL seconds by the background
+    flusher, so there is no commit per ping. If the database is unavailable
+    the buffer keeps at most ``max_buffer`` rows and drops the oldest.
+    Unknown kendaraan_ids are rejected against a set of known ids refreshed
+    every ``known_ttl`` seconds.
+    """
+
+    def __init__(self, flush_size=5000, max_buffer=200000, known_ttl=60):
+        self.flush_size = flush_size
+        self.max_buffer = max_buffer
+        self.known_ttl = known_ttl
+        self.latest = LatestPositions()
+        self._pending = []
+        self._pending_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._known = frozenset()
+        self._known_at = None
+
+    def configure(self, flush_size=None, max_buffer=None, known_ttl=None):
+        if flush_size:
+            self.flush_size = flush_size
+        if max_buffer:
+            self.max_buffer = max_buffer
+        if known_ttl is not None:
+            self.known_ttl = known_ttl
+
+    def _known_ids(self, force=False):
+        now = time.monotonic()
+        if force or self._known_at is None or now - self._known_at > self.known_ttl:
+            self._known = frozenset(db.session.execute(select(Kendaraan.kendaraan_id)).scalars())
+            self._known_at = now
+        return self._known
+
+    def ingest(self, pings):
+        """Returns ``(accepted, rejected)`` counts for known/unknown kendaraan_ids"""
+        known = self._known_ids()
+        if any(ping[0] not in known for ping in pings):
+            # A bike added since the last refresh; refresh at most once a second
+            if time.monotonic() - self._known_at > 1:
+                known = self._known_ids(force=True)
+        accepted = [ping for ping in pings if ping[0] in known]
+
+        self.latest.update_many(accepted)
+        with self._pending_lock:
+            self._pending.extend(accepted)
+            overflow = len(self._pending) - self.max_buffer
+            if overflow > 0:
+                del self._pending[:overflow]
+                logger.warning(f'Telemetry buffer full, dropped {overflow} oldest ping(s)')
+            should_flush = len(self._pending) >= self.flush_size
+
+        if should_flush:
+            try:
+                self.flush()
+            except Exception as e:
+                # Rows are back in the buffer; the next flush retries them
+                logger.error(f"Telemetry flush failed: {str(e)}")
+        return len(accepted), len(pings) - len(accepted)
+
+    def pending(self):
+        return len(self._pending)
+
+    @staticmethod
+    def _insert(rows):
+        db.session.execute(insert(TelemetriKendaraan.__table__), [
+            {
+                'kendaraan_id': kendaraan_id,
+                'waktu': datetime.utcfromtimestamp(ts),
+                'latitude': lat,
+                'longitude': lng,
+                'baterai': battery
+            }
+            for kendaraan_id, ts, lat, lng, battery in rows
+        ])
+
+    def _write(self, rows):
+        """Insert rows in flush_size chunks, each in a savepoint. A chunk the
+        database rejects for its data (e.g. a bike deleted since the ping) is
+        retried row by row and the rejected rows are dropped, so one bad row
+        cannot hold back the rest. Returns ``(written, dropped)``."""
+        written = dropped = 0
+        for start in range(0, len(rows), self.flush_size):
+            chunk = rows[start:start + self.flush_size]
+            try:
+                with db.session.begin_nested():
+                    self._insert(chunk)
+                written += len(chunk)
+                continue
+            except (IntegrityError, DataError):
+                pass
+            for row in chunk:
+                try:
+                    with db.session.begin_nested():
+                        self._insert([row])
+                    written += 1
+                except (IntegrityError, DataError):
+                    dropped += 1
+        return written, dropped
+
+    def flush(self):
+        """Write buffered pings to telemetri_kendaraan; returns the number written.
+
+        Rows the database rejects are dropped and logged. On any other error
+        (e.g. the database is down) every row goes back into the buffer.
+        """
+        if not self._flush_lock.acquire(blocking=False):
+            return 0  # another thread is already flushing
+        try:
+            with self._pending_lock:
+                rows, self._pending = self._pending, []
+            if not rows:
+                return 0
+            try:
+                written, dropped = self._write(rows)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                with self._pending_lock:
+                    self._pending[:0] = rows
+                    overflow = len(self._pending) - self.max_buffer
+                    if overflow > 0:
+                        del self._pending[:overflow]
+                raise
+            if dropped:
+                logger.warning(f'Telemetry flush dropped {dropped} ping(s) rejected by the database')
+                self._known_at = None  # likely a deleted bike; refresh the known ids
+            return written
+        finally:
+            self._flush_lock.release()
+
+    def warm(self):
+        """Load the newest stored ping per bike once, e.g. after a restart"""
+        if self.latest.warmed:
+            return
+        newest = select(
+            TelemetriKendaraan.kendaraan_id,
+            func.max(TelemetriKendaraan.waktu).label('waktu')
+        ).group_by(TelemetriKendaraan.kendaraan_id).subquery()
+        rows = db.session.execute(
+            select(
+                TelemetriKendaraan.kendaraan_id, TelemetriKendaraan.waktu, TelemetriKendaraan.latitude,
+                TelemetriKendaraan.longitude, TelemetriKendaraan.baterai
+            ).join(newest, (newest.c.kendaraan_id == TelemetriKendaraan.kendaraan_id)
+                   & (newest.c.waktu == TelemetriKendaraan.waktu))
+        )
+        epoch = datetime(1970, 1, 1)
+        self.latest.update_many(
+            (kendaraan_id, (waktu - epoch).total_seconds(), lat, lng, battery)
+            for kendaraan_id, waktu, lat, lng, battery in rows
+        )
+        self.latest.warmed = True
+
+
+telemetry = TelemetryIngest()
+
+
+def configure_telemetry(app):
+    telemetry.configure(
+        flush_size=app.config['TELEMETRY_FLUSH_SIZE'],
+        max_buffer=app.config['TELEMETRY_MAX_BUFFER'],
+        known_ttl=app.config['TELEMETRY_KNOWN_TTL']
+    )
+
+
+def start_telemetry_flusher(app):
+    """Flush buffered pings every TELEMETRY_FLUSH_INTERVAL seconds in a daemon thread"""
+    interval = app.config.get('TELEMETRY_FLUSH_INTERVAL')
+    if not interval:
+        return None
+
+    def flush():
+        with app.app_context():
+            try:
+                telemetry.flush()
+            except Exception as e:
+                logger.error(f"Telemetry flush failed: {str(e)}")
+            finally:
+                db.session.remove()
+
+    def loop():
+        while True:
+            time.sleep(interval)
+            flush()
+
+    # Write whatever is still buffered when the worker exits
+    atexit.register(flush)
+
+    thread = threading.Thread(target=loop, name='telemetry-flusher', daemon=True)
+    thread.start()
+    return thread
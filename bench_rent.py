@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Concurrency benchmark for POST /api/transaksi/rent
+Fires many simultaneous rent attempts at a small fleet and reports latency
+percentiles plus any bike that was rented more than once.
+
+Usage: python bench_rent.py --bikes 1,2,3 --station 1 --attempts 300 --workers 100
+Start the server with RATELIMIT_ENABLED=0, otherwise most attempts get 429.
+"""
+
+import argparse
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+
+BASE_URL = "http://127.0.0.1:5000"
+API_BASE = f"{BASE_URL}/api"
+
+
+def get_token(nrp):
+    """Register (if needed) and log in a benchmark user."""
+    user_data = {
+        "nrp": nrp,
+        "nama": f"Bench {nrp}",
+        "email": f"{nrp}@bench.example.com",
+        "password": "password123"
+    }
+    requests.post(f"{API_BASE}/auth/register", json=user_data)
+    response = requests.post(f"{API_BASE}/auth/login", json={"nrp": nrp, "password": "password123"})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bikes", required=True, help="Comma-separated kendaraan_id list (must be available)")
+    parser.add_argument("--station", type=int, required=True, help="stasiun_ambil_id / stasiun_kembali_id")
+    parser.add_argument("--attempts", type=int, default=300)
+    parser.add_argument("--workers", type=int, default=100)
+    parser.add_argument("--users", type=int, default=20)
+    args = parser.parse_args()
+
+    bikes = [int(b) for b in args.bikes.split(",")]
+    run_id = int(datetime.now().timestamp())
+    print(f"🔐 Preparing {args.users} users...")
+    tokens = [get_token(f"bench{run_id}_{i}") for i in range(args.users)]
+
+    def attempt(i):
+        headers = {"Authorization": f"Bearer {tokens[i % len(tokens)]}"}
+        payload = {"kendaraan_id": bikes[i % len(bikes)], "stasiun_ambil_id": args.station}
+        start = time.perf_counter()
+        response = requests.post(f"{API_BASE}/transaksi/rent", json=payload, headers=headers)
+        elapsed = (time.perf_counter() - start) * 1000
+        data = response.json() if response.status_code == 201 else None
+        return response.status_code, elapsed, data, headers
+
+    print(f"🔥 Firing {args.attempts} rent attempts at {len(bikes)} bike(s) with {args.workers} workers...")
+    with ThreadPoolExecutor(max_workers=args.workers) as pool:
+        results = list(pool.map(attempt, range(args.attempts)))
+
+    latencies = [elapsed for _, elapsed, _, _ in results]
+    statuses = Counter(status for status, _, _, _ in results)
+    rented = Counter(data["data"]["kendaraan_id"] for _, _, data, _ in results if data)
+    double_rentals = {bike: count for bike, count in rented.items() if count > 1}
+
+    print(f"📊 Status codes: {dict(statuses)}")
+    print(f"⏱️  p50={percentile(latencies, 50):.1f}ms p95={percentile(latencies, 95):.1f}ms p99={percentile(latencies, 99):.1f}ms")
+    if double_rentals:
+        print(f"❌ Double rentals detected: {double_rentals}")
+    else:
+        print("✅ No double rentals")
+
+    # Hand the bikes back so the benchmark can be re-run
+    for _, _, data, headers in results:
+        if data:
+            requests.post(f"{API_BASE}/transaksi/return", headers=headers, json={
+                "transaksi_id": data["data"]["transaksi_id"],
+                "stasiun_kembali_id": args.station
+            })
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""baseline schema
+
+The tables as they were before migrations were introduced. Tables that
+already exist (databases created with db.create_all()) are left alone, so
+`flask db upgrade` works on both empty and existing databases.
+
+Revision ID: 0b5e1f7a2c34
+Revises: 
+Create Date: 2026-10-18 08:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0b5e1f7a2c34'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+TABLES = ('user', 'stasiun', 'layanan', 'kendaraan', 'log_laporan', 'transaksi', 'transaksi_layanan')
+
+
+def upgrade():
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if 'user' not in existing:
+        op.create_table(
+            'user',
+            sa.Column('nrp', sa.String(length=50), nullable=False),
+            sa.Column('nama', sa.String(length=100), nullable=False),
+            sa.Column('email', sa.String(length=100), nullable=False),
+            sa.Column('password', sa.String(length=255), nullable=False),
+            sa.Column('no_hp', sa.String(length=20), nullable=True),
+            sa.Column('role', sa.String(length=50), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint('nrp'),
+            sa.UniqueConstraint('email')
+        )
+
+    if 'stasiun' not in existing:
+        op.create_table(
+            'stasiun',
+            sa.Column('stasiun_id', sa.Integer(), nullable=False),
+            sa.Column('nama_stasiun', sa.String(length=100), nullable=False),
+            sa.Column('alamat', sa.String(length=255), nullable=True),
+            sa.Column('status', sa.String(length=50), nullable=True),
+            sa.Column('latitude', sa.Integer(), nullable=True),
+            sa.Column('longtitude', sa.Integer(), nullable=True),
+            sa.PrimaryKeyConstraint('stasiun_id')
+        )
+
+    if 'layanan' not in existing:
+        op.create_table(
+            'layanan',
+            sa.Column('layanan_id', sa.Integer(), nullable=False),
+            sa.Column('nama_layanan', sa.String(length=100), nullable=False),
+            sa.Column('deskripsi', sa.Text(), nullable=True),
+            sa.Column('biaya_dasar', sa.Numeric(precision=10, scale=2), nullable=True),
+            sa.Column('status', sa.Boolean(), nullable=True),
+            sa.PrimaryKeyConstraint('layanan_id')
+        )
+
+    if 'kendaraan' not in existing:
+        op.create_table(
+            'kendaraan',
+            sa.Column('kendaraan_id', sa.Integer(), nullable=False),
+            sa.Column('merk', sa.String(length=50), nullable=True),
+            sa.Column('tipe', sa.String(length=50), nullable=True),
+            sa.Column('status', sa.String(length=50), nullable=True),
+            sa.Column('stasiun_id', sa.Integer(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['stasiun_id'], ['stasiun.stasiun_id']),
+            sa.PrimaryKeyConstraint('kendaraan_id')
+        )
+
+    if 'log_laporan' not in existing:
+        op.create_table(
+            'log_laporan',
+            sa.Column('log_laporan_id', sa.Integer(), nullable=False),
+            sa.Column('kendaraan_id', sa.Integer(), nullable=False),
+            sa.Column('nrp', sa.String(length=50), nullable=False),
+            sa.Column('tanggal_laporan', sa.DateTime(), nullable=True),
+            sa.Column('laporan', sa.Text(), nullable=True),
+            sa.Column('tanggal_pemeliharaan', sa.DateTime(), nullable=True),
+            sa.Column('status', sa.String(length=50), nullable=True),
+            sa.ForeignKeyConstraint(['kendaraan_id'], ['kendaraan.kendaraan_id']),
+            sa.ForeignKeyConstraint(['nrp'], ['user.nrp']),
+            sa.PrimaryKeyConstraint('log_laporan_id')
+        )
+
+    if 'transaksi' not in existing:
+        op.create_table(
+            'transaksi',
+            sa.Column('transaksi_id', sa.Integer(), nullable=False),
+            sa.Column('user_nrp', sa.String(length=50), nullable=False),
+            sa.Column('kendaraan_id', sa.Integer(), nullable=True),
+            sa.Column('stasiun_ambil_id', sa.Integer(), nullable=True),
+            sa.Column('stasiun_kembali_id', sa.Integer(), nullable=True),
+            sa.Column('waktu_mulai', sa.DateTime(), nullable=True),
+            sa.Column('waktu_selesai', sa.DateTime(), nullable=True),
+            sa.Column('waktu_pembayaran', sa.DateTime(), nullable=True),
+            sa.Column('status_transaksi', sa.String(length=50), nullable=True),
+            sa.Column('payment_gateway_ref', sa.String(length=100), nullable=True),
+            sa.Column('total_biaya', sa.Numeric(precision=10, scale=2), nullable=True),
+            sa.Column('deposit_dipegang', sa.Numeric(precision=10, scale=2), nullable=True),
+            sa.ForeignKeyConstraint(['kendaraan_id'], ['kendaraan.kendaraan_id']),
+            sa.ForeignKeyConstraint(['stasiun_ambil_id'], ['stasiun.stasiun_id']),
+            sa.ForeignKeyConstraint(['stasiun_kembali_id'], ['stasiun.stasiun_id']),
+            sa.ForeignKeyConstraint(['user_nrp'], ['user.nrp']),
+            sa.PrimaryKeyConstraint('transaksi_id')
+        )
+
+    if 'transaksi_layanan' not in existing:
+        op.create_table(
+            'transaksi_layanan',
+            sa.Column('transaksi_layanan_id', sa.Integer(), nullable=False),
+            sa.Column('transaksi_id', sa.Integer(), nullable=False),
+            sa.Column('layanan_id', sa.Integer(), nullable=False),
+            sa.ForeignKeyConstraint(['layanan_id'], ['layanan.layanan_id']),
+            sa.ForeignKeyConstraint(['transaksi_id'], ['transaksi.transaksi_id']),
+            sa.PrimaryKeyConstraint('transaksi_layanan_id')
+        )
+
+
+def downgrade():
+    for table in reversed(TABLES):
+        op.drop_table(table)
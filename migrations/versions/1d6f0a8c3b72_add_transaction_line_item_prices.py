@@ -0,0 +1,56 @@
+"""add line-item prices for transaction totals
+
+transaksi.biaya_sewa holds the ride charge and transaksi_layanan.harga the
+price of each service when it was added. Existing service lines get their
+service's biaya_dasar, so rentals still ONGOING at deploy time keep their
+services, and finished rides get total_biaya minus those lines as their ride
+charge. Run `flask recompute-totals` afterwards to price whatever is left
+with the configured tariffs and rebuild the totals.
+
+Revision ID: 1d6f0a8c3b72
+Revises: e5a93b7c2d18
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1d6f0a8c3b72'
+down_revision = 'e5a93b7c2d18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('transaksi', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('biaya_sewa', sa.Numeric(precision=10, scale=2), nullable=True))
+
+    with op.batch_alter_table('transaksi_layanan', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('harga', sa.Numeric(precision=10, scale=2), nullable=True))
+
+    op.create_index('ix_transaksi_layanan_transaksi_id', 'transaksi_layanan', ['transaksi_id'], unique=False)
+
+    op.execute(
+        "UPDATE transaksi_layanan SET harga = ("
+        " SELECT l.biaya_dasar FROM layanan l WHERE l.layanan_id = transaksi_layanan.layanan_id"
+        ") WHERE harga IS NULL"
+    )
+    op.execute(
+        "UPDATE transaksi SET biaya_sewa = ("
+        " SELECT CASE WHEN transaksi.total_biaya - COALESCE(SUM(tl.harga), 0) > 0"
+        " THEN transaksi.total_biaya - COALESCE(SUM(tl.harga), 0) ELSE 0 END"
+        " FROM transaksi_layanan tl WHERE tl.transaksi_id = transaksi.transaksi_id"
+        ") WHERE biaya_sewa IS NULL AND waktu_selesai IS NOT NULL AND total_biaya IS NOT NULL"
+    )
+
+
+def downgrade():
+    op.drop_index('ix_transaksi_layanan_transaksi_id', table_name='transaksi_layanan')
+
+    with op.batch_alter_table('transaksi_layanan', schema=None) as batch_op:
+        batch_op.drop_column('harga')
+
+    with op.batch_alter_table('transaksi', schema=None) as batch_op:
+        batch_op.drop_column('biaya_sewa')
@@ -0,0 +1,30 @@
+"""store stasiun coordinates as floats
+
+Integer columns truncated every coordinate to whole degrees.
+
+Revision ID: 2c9d4a6e8f10
+Revises: 0b5e1f7a2c34
+Create Date: 2026-10-18 08:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2c9d4a6e8f10'
+down_revision = '0b5e1f7a2c34'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('stasiun', schema=None) as batch_op:
+        batch_op.alter_column('latitude', existing_type=sa.Integer(), type_=sa.Float(), existing_nullable=True)
+        batch_op.alter_column('longtitude', existing_type=sa.Integer(), type_=sa.Float(), existing_nullable=True)
+
+
+def downgrade():
+    with op.batch_alter_table('stasiun', schema=None) as batch_op:
+        batch_op.alter_column('longtitude', existing_type=sa.Float(), type_=sa.Integer(), existing_nullable=True)
+        batch_op.alter_column('latitude', existing_type=sa.Float(), type_=sa.Integer(), existing_nullable=True)
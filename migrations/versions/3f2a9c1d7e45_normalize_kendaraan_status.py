@@ -0,0 +1,68 @@
+"""normalize kendaraan status to small-int codes
+
+Existing free-text values are mapped in any casing (TERSEDIA=1, DISEWA=2,
+KARANTINA=3, RUSAK=4, PERBAIKAN=5). Anything else, including NULL, becomes
+KARANTINA so the bike is reviewed before it is rented again. Databases
+created with db.create_all() on this version already have the new schema:
+run `flask db stamp head` on them instead of upgrading.
+
+Revision ID: 3f2a9c1d7e45
+Revises: 7d2b9e4f6c81
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f2a9c1d7e45'
+down_revision = '7d2b9e4f6c81'
+branch_labels = None
+depends_on = None
+
+STATUS_CODES = [
+    ('TERSEDIA', 1),
+    ('DISEWA', 2),
+    ('KARANTINA', 3),
+    ('RUSAK', 4),
+    ('PERBAIKAN', 5),
+]
+FALLBACK_CODE = 3
+
+
+def upgrade():
+    with op.batch_alter_table('kendaraan') as batch_op:
+        batch_op.add_column(sa.Column('status_code', sa.SmallInteger(), nullable=True))
+
+    kendaraan = sa.table('kendaraan', sa.column('status', sa.String), sa.column('status_code', sa.SmallInteger))
+    op.execute(
+        kendaraan.update().values(status_code=sa.case(
+            *[(sa.func.upper(sa.func.trim(kendaraan.c.status)) == name, code) for name, code in STATUS_CODES],
+            else_=FALLBACK_CODE
+        ))
+    )
+
+    with op.batch_alter_table('kendaraan') as batch_op:
+        batch_op.drop_column('status')
+        batch_op.alter_column('status_code', new_column_name='status', existing_type=sa.SmallInteger(),
+                              nullable=False, server_default='1')
+
+    op.create_index('ix_kendaraan_stasiun_status', 'kendaraan', ['stasiun_id', 'status'])
+
+
+def downgrade():
+    op.drop_index('ix_kendaraan_stasiun_status', table_name='kendaraan')
+    with op.batch_alter_table('kendaraan') as batch_op:
+        batch_op.add_column(sa.Column('status_text', sa.String(length=50), nullable=True))
+
+    kendaraan = sa.table('kendaraan', sa.column('status', sa.SmallInteger), sa.column('status_text', sa.String))
+    op.execute(
+        kendaraan.update().values(status_text=sa.case(
+            *[(kendaraan.c.status == code, name) for name, code in STATUS_CODES]
+        ))
+    )
+
+    with op.batch_alter_table('kendaraan') as batch_op:
+        batch_op.drop_column('status')
+        batch_op.alter_column('status_text', new_column_name='status', existing_type=sa.String(length=50))
@@ -0,0 +1,45 @@
+"""add ketersediaan_stasiun availability counters
+
+Every existing station gets a counter row computed from the kendaraan
+table, so reads do not depend on `flask reconcile-availability`.
+
+Revision ID: 4e7a1b3c9d52
+Revises: 2c9d4a6e8f10
+Create Date: 2026-10-18 08:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4e7a1b3c9d52'
+down_revision = '2c9d4a6e8f10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'ketersediaan_stasiun',
+        sa.Column('stasiun_id', sa.Integer(), nullable=False),
+        sa.Column('tersedia', sa.Integer(), nullable=False),
+        sa.Column('total', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['stasiun_id'], ['stasiun.stasiun_id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('stasiun_id')
+    )
+
+    # kendaraan.status is still free text at this revision
+    op.execute(
+        "INSERT INTO ketersediaan_stasiun (stasiun_id, tersedia, total, updated_at) "
+        "SELECT s.stasiun_id, "
+        "COUNT(CASE WHEN UPPER(TRIM(k.status)) = 'TERSEDIA' THEN k.kendaraan_id END), "
+        "COUNT(k.kendaraan_id), CURRENT_TIMESTAMP "
+        "FROM stasiun s LEFT JOIN kendaraan k ON k.stasiun_id = s.stasiun_id "
+        "GROUP BY s.stasiun_id"
+    )
+
+
+def downgrade():
+    op.drop_table('ketersediaan_stasiun')
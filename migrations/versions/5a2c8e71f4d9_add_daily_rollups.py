@@ -0,0 +1,59 @@
+"""add daily rollup tables and transaksi change tracking
+
+Fill the rollup afterwards with `flask refresh-rollups --full`.
+
+Revision ID: 5a2c8e71f4d9
+Revises: 1d6f0a8c3b72
+Create Date: 2026-10-18 16:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5a2c8e71f4d9'
+down_revision = '1d6f0a8c3b72'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('transaksi', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('waktu_diperbarui', sa.DateTime(), nullable=True))
+
+    op.execute('UPDATE transaksi SET waktu_diperbarui = COALESCE(waktu_selesai, waktu_mulai)')
+    op.create_index('ix_transaksi_waktu_mulai', 'transaksi', ['waktu_mulai'], unique=False)
+    op.create_index('ix_transaksi_waktu_diperbarui', 'transaksi', ['waktu_diperbarui'], unique=False)
+
+    op.create_table(
+        'rekap_harian',
+        sa.Column('tanggal', sa.Date(), nullable=False),
+        sa.Column('stasiun_id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('tipe', sa.String(length=50), nullable=False),
+        sa.Column('jumlah_perjalanan', sa.Integer(), nullable=False),
+        sa.Column('total_menit', sa.Float(), nullable=False),
+        sa.Column('pendapatan', sa.Numeric(precision=14, scale=2), nullable=False),
+        sa.Column('pendapatan_layanan', sa.Numeric(precision=14, scale=2), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('tanggal', 'stasiun_id', 'tipe')
+    )
+    op.create_index('ix_rekap_harian_stasiun_tanggal', 'rekap_harian', ['stasiun_id', 'tanggal'], unique=False)
+
+    op.create_table(
+        'rekap_watermark',
+        sa.Column('nama', sa.String(length=50), nullable=False),
+        sa.Column('nilai', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('nama')
+    )
+
+
+def downgrade():
+    op.drop_table('rekap_watermark')
+    op.drop_index('ix_rekap_harian_stasiun_tanggal', table_name='rekap_harian')
+    op.drop_table('rekap_harian')
+
+    op.drop_index('ix_transaksi_waktu_diperbarui', table_name='transaksi')
+    op.drop_index('ix_transaksi_waktu_mulai', table_name='transaksi')
+    with op.batch_alter_table('transaksi', schema=None) as batch_op:
+        batch_op.drop_column('waktu_diperbarui')
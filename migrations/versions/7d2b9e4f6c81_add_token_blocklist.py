@@ -0,0 +1,41 @@
+"""add token_blocklist for revoked JWTs
+
+Revision ID: 7d2b9e4f6c81
+Revises: 6a3f8c2e1b74
+Create Date: 2026-10-18 08:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7d2b9e4f6c81'
+down_revision = '6a3f8c2e1b74'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'token_blocklist',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('jti', sa.String(length=36), nullable=False),
+        sa.Column('token_type', sa.String(length=10), nullable=False),
+        sa.Column('nrp', sa.String(length=50), nullable=True),
+        sa.Column('expires_at', sa.DateTime(), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['nrp'], ['user.nrp']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('jti')
+    )
+    op.create_index('ix_token_blocklist_nrp', 'token_blocklist', ['nrp'], unique=False)
+    op.create_index('ix_token_blocklist_expires_at', 'token_blocklist', ['expires_at'], unique=False)
+    op.create_index('ix_token_blocklist_created_at', 'token_blocklist', ['created_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_token_blocklist_created_at', table_name='token_blocklist')
+    op.drop_index('ix_token_blocklist_expires_at', table_name='token_blocklist')
+    op.drop_index('ix_token_blocklist_nrp', table_name='token_blocklist')
+    op.drop_table('token_blocklist')
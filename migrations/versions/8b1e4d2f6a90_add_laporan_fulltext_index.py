@@ -0,0 +1,35 @@
+"""add full-text GIN index on log_laporan.laporan
+
+PostgreSQL only; on other databases report search uses the in-process
+inverted index and this revision does nothing.
+
+Revision ID: 8b1e4d2f6a90
+Revises: 3f2a9c1d7e45
+Create Date: 2026-10-18 10:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b1e4d2f6a90'
+down_revision = '3f2a9c1d7e45'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.create_index(
+        'ix_log_laporan_fts', 'log_laporan',
+        [sa.text("to_tsvector('simple'::regconfig, coalesce(laporan, ''))")],
+        postgresql_using='gin'
+    )
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.drop_index('ix_log_laporan_fts', table_name='log_laporan')
@@ -0,0 +1,63 @@
+"""add transaksi archive tables
+
+Old SELESAI rows are moved here by `flask archive-transactions`.
+
+Revision ID: 9e47b1c05a6d
+Revises: 5a2c8e71f4d9
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9e47b1c05a6d'
+down_revision = '5a2c8e71f4d9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_transaksi_user_waktu', 'transaksi', ['user_nrp', 'waktu_mulai'], unique=False)
+
+    op.create_table(
+        'transaksi_arsip',
+        sa.Column('transaksi_id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('user_nrp', sa.String(length=50), nullable=False),
+        sa.Column('kendaraan_id', sa.Integer(), nullable=True),
+        sa.Column('stasiun_ambil_id', sa.Integer(), nullable=True),
+        sa.Column('stasiun_kembali_id', sa.Integer(), nullable=True),
+        sa.Column('waktu_mulai', sa.DateTime(), nullable=True),
+        sa.Column('waktu_selesai', sa.DateTime(), nullable=True),
+        sa.Column('waktu_pembayaran', sa.DateTime(), nullable=True),
+        sa.Column('status_transaksi', sa.String(length=50), nullable=True),
+        sa.Column('payment_gateway_ref', sa.String(length=100), nullable=True),
+        sa.Column('biaya_sewa', sa.Numeric(precision=10, scale=2), nullable=True),
+        sa.Column('total_biaya', sa.Numeric(precision=10, scale=2), nullable=True),
+        sa.Column('deposit_dipegang', sa.Numeric(precision=10, scale=2), nullable=True),
+        sa.Column('waktu_diperbarui', sa.DateTime(), nullable=True),
+        sa.Column('diarsipkan_pada', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('transaksi_id')
+    )
+    op.create_index('ix_transaksi_arsip_user_waktu', 'transaksi_arsip', ['user_nrp', 'waktu_mulai'], unique=False)
+    op.create_index('ix_transaksi_arsip_waktu_mulai', 'transaksi_arsip', ['waktu_mulai'], unique=False)
+
+    op.create_table(
+        'transaksi_layanan_arsip',
+        sa.Column('transaksi_layanan_id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('transaksi_id', sa.Integer(), nullable=False),
+        sa.Column('layanan_id', sa.Integer(), nullable=False),
+        sa.Column('harga', sa.Numeric(precision=10, scale=2), nullable=True),
+        sa.PrimaryKeyConstraint('transaksi_layanan_id')
+    )
+    op.create_index('ix_transaksi_layanan_arsip_transaksi_id', 'transaksi_layanan_arsip', ['transaksi_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_transaksi_layanan_arsip_transaksi_id', table_name='transaksi_layanan_arsip')
+    op.drop_table('transaksi_layanan_arsip')
+    op.drop_index('ix_transaksi_arsip_waktu_mulai', table_name='transaksi_arsip')
+    op.drop_index('ix_transaksi_arsip_user_waktu', table_name='transaksi_arsip')
+    op.drop_table('transaksi_arsip')
+    op.drop_index('ix_transaksi_user_waktu', table_name='transaksi')
@@ -0,0 +1,26 @@
+"""index transaksi.kendaraan_id
+
+The maintenance score counts rides per kendaraan.
+
+Revision ID: b8f3d6a2e917
+Revises: 9e47b1c05a6d
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8f3d6a2e917'
+down_revision = '9e47b1c05a6d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_transaksi_kendaraan_id', 'transaksi', ['kendaraan_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_transaksi_kendaraan_id', table_name='transaksi')
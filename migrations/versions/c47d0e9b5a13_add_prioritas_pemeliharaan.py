@@ -0,0 +1,39 @@
+"""add prioritas_pemeliharaan maintenance queue table
+
+Fill it afterwards with `flask rebuild-maintenance-queue`.
+
+Revision ID: c47d0e9b5a13
+Revises: 8b1e4d2f6a90
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c47d0e9b5a13'
+down_revision = '8b1e4d2f6a90'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'prioritas_pemeliharaan',
+        sa.Column('kendaraan_id', sa.Integer(), nullable=False),
+        sa.Column('skor', sa.Float(), nullable=False),
+        sa.Column('laporan_terbuka', sa.Integer(), nullable=False),
+        sa.Column('laporan_tertua', sa.DateTime(), nullable=True),
+        sa.Column('perjalanan_terakhir', sa.Integer(), nullable=False),
+        sa.Column('pemeliharaan_terakhir', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['kendaraan_id'], ['kendaraan.kendaraan_id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('kendaraan_id')
+    )
+    op.create_index('ix_prioritas_pemeliharaan_skor', 'prioritas_pemeliharaan', ['skor'])
+
+
+def downgrade():
+    op.drop_index('ix_prioritas_pemeliharaan_skor', table_name='prioritas_pemeliharaan')
+    op.drop_table('prioritas_pemeliharaan')
@@ -0,0 +1,36 @@
+"""add telemetri_kendaraan position history
+
+Revision ID: e5a93b7c2d18
+Revises: c47d0e9b5a13
+Create Date: 2026-10-18 13:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a93b7c2d18'
+down_revision = 'c47d0e9b5a13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'telemetri_kendaraan',
+        sa.Column('telemetri_id', sa.BigInteger().with_variant(sa.Integer(), 'sqlite'), nullable=False),
+        sa.Column('kendaraan_id', sa.Integer(), nullable=False),
+        sa.Column('waktu', sa.DateTime(), nullable=False),
+        sa.Column('latitude', sa.Float(), nullable=False),
+        sa.Column('longitude', sa.Float(), nullable=False),
+        sa.Column('baterai', sa.SmallInteger(), nullable=True),
+        sa.ForeignKeyConstraint(['kendaraan_id'], ['kendaraan.kendaraan_id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('telemetri_id')
+    )
+    op.create_index('ix_telemetri_kendaraan_waktu', 'telemetri_kendaraan', ['kendaraan_id', 'waktu'])
+
+
+def downgrade():
+    op.drop_index('ix_telemetri_kendaraan_waktu', table_name='telemetri_kendaraan')
+    op.drop_table('telemetri_kendaraan')
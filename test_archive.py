@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Regression test for `flask archive-transactions` on SQLite.
+
+SQLite hands out max(rowid) + 1 for tables without AUTOINCREMENT, so moving
+the newest transaksi or transaksi_layanan row would let its id be reused and
+the next archive run would collide with the archived copy.
+
+Usage: python test_archive.py (or pytest test_archive.py)
+"""
+
+import os
+from datetime import datetime, timedelta
+
+os.environ['DATABASE_URL'] = 'sqlite:///:memory:'
+
+from app import create_app, db
+from app.models.user import User
+from app.models.kendaraan import Kendaraan
+from app.models.layanan import Layanan, TransaksiLayanan
+from app.models.transaksi import Transaksi
+from app.models.arsip import TransaksiArsip, TransaksiLayananArsip
+from app.utils.archive import archive_transactions
+
+
+def add_ride(status, layanan_ids, started):
+    transaksi = Transaksi(user_nrp='arsip', kendaraan_id=1, status_transaksi=status, waktu_mulai=started)
+    db.session.add(transaksi)
+    db.session.flush()
+    for layanan_id in layanan_ids:
+        db.session.add(TransaksiLayanan(transaksi_id=transaksi.transaksi_id, layanan_id=layanan_id, harga=1000))
+    db.session.commit()
+    return transaksi.transaksi_id
+
+
+def test_archived_line_ids_are_not_reused():
+    app = create_app('default')
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(nrp='arsip', nama='Arsip', email='arsip@example.com', password='x'))
+        db.session.add(Kendaraan(kendaraan_id=1, merk='test'))
+        db.session.add(Layanan(layanan_id=1, nama_layanan='helm', biaya_dasar=1000))
+        db.session.commit()
+
+        old = datetime.utcnow() - timedelta(days=400)
+        add_ride('SELESAI', [1, 1], old)
+        add_ride('SELESAI', [], old)
+
+        # Ride 1 owns the newest line and ride 2 is the newest ride: nothing moves
+        assert archive_transactions(30)['archived'] == 0
+
+        add_ride('ONGOING', [1], datetime.utcnow())
+        report = archive_transactions(30)
+        assert report['archived'] == 2 and report['service_lines'] == 2
+
+        # A new line must not reuse an archived id, and later runs must not collide
+        line_id = add_ride('ONGOING', [1], datetime.utcnow())
+        new_line = TransaksiLayanan.query.filter_by(transaksi_id=line_id).one()
+        archived_lines = {row.transaksi_layanan_id for row in TransaksiLayananArsip.query}
+        assert new_line.transaksi_layanan_id not in archived_lines
+
+        Transaksi.query.update({'status_transaksi': 'SELESAI', 'waktu_mulai': old})
+        db.session.commit()
+        archive_transactions(30)
+        archive_transactions(30)
+        assert TransaksiArsip.query.count() == 3
+        db.session.remove()
+        db.drop_all()
+
+
+if __name__ == "__main__":
+    test_archived_line_ids_are_not_reused()
+    print("✅ Archive keeps transaksi_layanan ids unique")